@@ -0,0 +1,203 @@
+"""
+Benchmark de los endpoints de la API sobre un conjunto de datos sembrado.
+
+Las peticiones pasan por las rutas reales de restaurant_api/urls.py, con sus
+middlewares y autenticación JWT. Ver benchmarks/README.md.
+
+    python -m benchmarks.api --escala small --peticiones 50
+    python -m benchmarks.api --escala tiny --check benchmarks/baseline.json
+    python -m benchmarks.api --escala small --solo combos pedidos --encoding gzip
+"""
+import argparse
+import json
+import sys
+import time
+
+from benchmarks.common import preparar_base, percentil
+
+# Margen de latencia antes de considerar una regresión: relativo y absoluto,
+# para que el ruido en endpoints de menos de un milisegundo no falle en CI
+TOLERANCIA_LATENCIA = 0.5
+TOLERANCIA_LATENCIA_MS = 2.0
+
+
+class Escenario:
+    def __init__(self, nombre, url, metodo='get', datos=None, autenticado=False, antes=None):
+        self.nombre = nombre
+        self.url = url
+        self.metodo = metodo
+        self.datos = datos
+        self.autenticado = autenticado
+        self.antes = antes
+
+
+def crear_escenarios(principal):
+    from django.core.cache import cache
+    from django.urls import reverse
+    from orders.models import Carrito, CarritoItem
+    from products.models import Ingrediente, Producto
+    from reviews.models import ResumenCalificacion
+
+    popular = ResumenCalificacion.objects.order_by('-total_reviews').values_list('producto_id', flat=True).first()
+    productos_carrito = list(Producto.objects.order_by('id')[:3])
+    ingredientes = list(Ingrediente.objects.order_by('id').values_list('id', flat=True)[:5])
+
+    def llenar_carrito():
+        carrito, _ = Carrito.objects.get_or_create(usuario=principal)
+        CarritoItem.objects.bulk_create([
+            CarritoItem(carrito=carrito, producto=producto, cantidad=2, precio_total=producto.precio * 2)
+            for producto in productos_carrito
+        ])
+
+    return [
+        Escenario('productos', reverse('producto-list')),
+        Escenario('productos_sin_cache', reverse('producto-list'), antes=cache.clear),
+        Escenario('combos', reverse('combo-list')),
+        Escenario('combos_sin_cache', reverse('combo-list'), antes=cache.clear),
+        Escenario('ingredientes', reverse('ingrediente-list')),
+        Escenario('buscar_productos', f"{reverse('producto-buscar')}?q=ingrediente+frescos&precio_max=20"),
+        Escenario('reviews_producto', f"{reverse('review-list')}?producto={popular}"),
+        Escenario('estadisticas_producto', f"{reverse('review-estadisticas-producto')}?producto={popular}"),
+        Escenario('pedidos', reverse('pedido-list'), autenticado=True),
+        Escenario('pedidos_expandidos', f"{reverse('pedido-list')}?expand=items.producto,items.combo",
+                  autenticado=True),
+        Escenario('pedidos_resumen', f"{reverse('pedido-list')}?fields=id,total,estado_descripcion,creado",
+                  autenticado=True),
+        Escenario('pedidos_estadisticas', reverse('pedido-estadisticas'), autenticado=True),
+        Escenario('carrito', reverse('view_cart'), autenticado=True),
+        Escenario('agregar_carrito', reverse('add_to_cart'), metodo='post', autenticado=True,
+                  datos={'items': [
+                      {'producto_id': producto.id, 'ingredientes': ingredientes, 'cantidad': 2}
+                      for producto in productos_carrito
+                  ]}),
+        Escenario('checkout', reverse('pedido-list'), metodo='post', autenticado=True, antes=llenar_carrito,
+                  datos={'direccion': 'Calle Falsa 123', 'telefono_contacto': '5551234'}),
+        Escenario('notificaciones', reverse('notification-list'), autenticado=True),
+        Escenario('notificaciones_no_leidas', reverse('notification-no-leidas'), autenticado=True),
+        Escenario('notificaciones_contador', reverse('notification-contador'), autenticado=True),
+    ]
+
+
+def medir(escenario, client, cabeceras, peticiones, calentamiento, comunes=None):
+    """Ejecutar un escenario y devolver sus métricas (``bytes`` es el tamaño transmitido)"""
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    latencias, consultas, tamanos, errores = [], [], [], 0
+    llamar = getattr(client, escenario.metodo)
+    extra = {**(comunes or {}), **(cabeceras if escenario.autenticado else {})}
+    for i in range(calentamiento + peticiones):
+        if escenario.antes:
+            escenario.antes()
+        with CaptureQueriesContext(connection) as ctx:
+            inicio = time.perf_counter()
+            response = llamar(escenario.url, escenario.datos, format='json', **extra)
+            duracion = time.perf_counter() - inicio
+        if i < calentamiento:
+            continue
+        if response.status_code >= 400:
+            errores += 1
+        latencias.append(duracion)
+        consultas.append(len(ctx.captured_queries))
+        tamanos.append(len(response.content))
+
+    latencias.sort()
+    return {
+        'peticiones': peticiones,
+        'p50_ms': round(percentil(latencias, 50) * 1000, 3),
+        'p95_ms': round(percentil(latencias, 95) * 1000, 3),
+        'p99_ms': round(percentil(latencias, 99) * 1000, 3),
+        'rps': round(peticiones / sum(latencias), 1) if latencias else 0,
+        'consultas': max(consultas) if consultas else 0,
+        'bytes': round(sum(tamanos) / len(tamanos)) if tamanos else 0,
+        'errores': errores,
+    }
+
+
+def ejecutar(principal, peticiones=50, calentamiento=3, solo=None, encoding=None):
+    from rest_framework.test import APIClient
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    client = APIClient()
+    cabeceras = {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(principal).access_token}'}
+    comunes = {'HTTP_ACCEPT_ENCODING': encoding} if encoding else {}
+    resultados = {}
+    for escenario in crear_escenarios(principal):
+        if solo and escenario.nombre not in solo:
+            continue
+        resultados[escenario.nombre] = medir(escenario, client, cabeceras, peticiones, calentamiento, comunes)
+    return resultados
+
+
+def comparar(resultados, baseline):
+    """Devolver la lista de regresiones respecto a ``baseline``"""
+    regresiones = []
+    for nombre, actual in resultados.items():
+        base = baseline.get(nombre)
+        if base is None:
+            continue
+        if actual['consultas'] > base['consultas']:
+            regresiones.append(f"{nombre}: {actual['consultas']} consultas por petición (baseline {base['consultas']})")
+        if actual['errores'] > base['errores']:
+            regresiones.append(f"{nombre}: {actual['errores']} errores (baseline {base['errores']})")
+        limite = max(base['p50_ms'] * (1 + TOLERANCIA_LATENCIA), base['p50_ms'] + TOLERANCIA_LATENCIA_MS)
+        if actual['p50_ms'] > limite:
+            regresiones.append(f"{nombre}: p50 {actual['p50_ms']:.2f} ms (baseline {base['p50_ms']:.2f} ms)")
+    return regresiones
+
+
+def imprimir(resultados):
+    print(f"{'endpoint':<26} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'req/s':>8} {'queries':>8} {'bytes':>9} {'errores':>8}")
+    for nombre, r in resultados.items():
+        print(f"{nombre:<26} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} {r['p99_ms']:>8.2f} "
+              f"{r['rps']:>8.1f} {r['consultas']:>8} {r['bytes']:>9} {r['errores']:>8}")
+
+
+def parse_args():
+    from benchmarks.seed import ESCALAS
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--escala', choices=sorted(ESCALAS), default='small')
+    parser.add_argument('--peticiones', type=int, default=50)
+    parser.add_argument('--calentamiento', type=int, default=3)
+    parser.add_argument('--solo', nargs='+', help='Ejecutar solo estos escenarios')
+    parser.add_argument('--encoding', help='Cabecera Accept-Encoding de las peticiones (p. ej. "gzip" o "br, gzip")')
+    parser.add_argument('--output', help='Guardar los resultados en este archivo JSON')
+    parser.add_argument('--check', metavar='BASELINE', help='Salir con error si hay regresiones frente a este JSON')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    preparar_base()
+
+    # Admite el host 'testserver' del cliente de pruebas en ALLOWED_HOSTS
+    from django.test.utils import setup_test_environment
+    setup_test_environment()
+
+    from benchmarks.seed import sembrar
+    inicio = time.perf_counter()
+    principal = sembrar(args.escala)
+    print(f"Datos '{args.escala}' sembrados en {time.perf_counter() - inicio:.1f} s")
+
+    resultados = ejecutar(principal, args.peticiones, args.calentamiento, args.solo, args.encoding)
+    imprimir(resultados)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'escala': args.escala, 'resultados': resultados}, f, indent=2, sort_keys=True)
+
+    if args.check:
+        with open(args.check) as f:
+            baseline = json.load(f)
+        if baseline.get('escala') != args.escala:
+            print(f"La baseline es de escala '{baseline.get('escala')}', no '{args.escala}'")
+            return 2
+        regresiones = comparar(resultados, baseline['resultados'])
+        for regresion in regresiones:
+            print(f'REGRESIÓN {regresion}')
+        return 1 if regresiones else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
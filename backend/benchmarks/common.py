@@ -0,0 +1,32 @@
+import os
+import tempfile
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'restaurant_api.settings')
+
+
+def preparar_base():
+    """
+    Configurar Django y migrar la base del benchmark.
+
+    Con SQLite y sin DB_NAME se usa un archivo temporal, nunca db.sqlite3.
+    """
+    # El log por petición distorsionaría las mediciones
+    os.environ.setdefault('REQUEST_METRICS_LOG_LEVEL', 'WARNING')
+    # Todas las peticiones llegan desde la misma IP: se mide el costo, no los límites
+    os.environ.setdefault('THROTTLE_ENABLED', 'False')
+    # Las notificaciones las crea el worker, como en producción, no cada petición
+    os.environ.setdefault('NOTIFICATIONS_INLINE', 'False')
+    if os.environ.get('DB_ENGINE', 'sqlite') == 'sqlite' and 'DB_NAME' not in os.environ:
+        os.environ['DB_NAME'] = os.path.join(tempfile.mkdtemp(prefix='bench-db-'), 'bench.sqlite3')
+
+    import django
+    django.setup()
+    from django.core.management import call_command
+    call_command('migrate', verbosity=0)
+
+
+def percentil(valores_ordenados, p):
+    if not valores_ordenados:
+        return 0
+    indice = min(len(valores_ordenados) - 1, max(0, round(p / 100 * len(valores_ordenados)) - 1))
+    return valores_ordenados[indice]
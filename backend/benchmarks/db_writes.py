@@ -0,0 +1,106 @@
+"""
+Rendimiento de escrituras concurrentes contra la base de datos configurada.
+
+Cada operación replica las escrituras de un checkout: un pedido y su
+notificación dentro de una transacción. Ver benchmarks/README.md.
+
+    python -m benchmarks.db_writes --threads 1 4 8 --seconds 5
+"""
+import argparse
+import statistics
+import sys
+import threading
+import time
+from decimal import Decimal
+
+from benchmarks.common import preparar_base, percentil
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 4, 8])
+    parser.add_argument('--seconds', type=float, default=5.0)
+    return parser.parse_args()
+
+
+def trabajador(user_id, estado_id, hasta, resultados):
+    from django.db import connection, transaction, DatabaseError
+    from notifications.models import Notificacion
+    from orders.models import Pedido
+
+    latencias, errores = [], 0
+    while time.perf_counter() < hasta:
+        inicio = time.perf_counter()
+        try:
+            with transaction.atomic():
+                pedido = Pedido.objects.create(
+                    usuario_id=user_id, estado_id=estado_id, total=Decimal('25.50'),
+                    direccion='Calle Benchmark 1', telefono_contacto='555'
+                )
+                Notificacion.objects.create(
+                    usuario_id=user_id, estado_id=estado_id,
+                    mensaje=f'Tu pedido #{pedido.id} ha sido creado.'
+                )
+        except DatabaseError:
+            errores += 1
+        else:
+            latencias.append(time.perf_counter() - inicio)
+    connection.close()
+    resultados.append((latencias, errores))
+
+
+def ejecutar(hilos, segundos, user_id, estado_id):
+    resultados = []
+    hasta = time.perf_counter() + segundos
+    threads = [
+        threading.Thread(target=trabajador, args=(user_id, estado_id, hasta, resultados))
+        for _ in range(hilos)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    latencias = sorted(l for parcial, _ in resultados for l in parcial)
+    errores = sum(e for _, e in resultados)
+    if not latencias:
+        return {'hilos': hilos, 'ops': 0, 'ops_s': 0, 'p50_ms': 0, 'p95_ms': 0, 'errores': errores}
+    return {
+        'hilos': hilos,
+        'ops': len(latencias),
+        'ops_s': len(latencias) / segundos,
+        'p50_ms': statistics.median(latencias) * 1000,
+        'p95_ms': percentil(latencias, 95) * 1000,
+        'errores': errores,
+    }
+
+
+def main():
+    args = parse_args()
+    preparar_base()
+
+    from django.conf import settings
+    from django.contrib.auth import get_user_model
+    from orders.models import Estado
+
+    db = settings.DATABASES['default']
+    print(f"Motor: {db['ENGINE']}  Base: {db['NAME']}  Opciones: {db.get('OPTIONS', {})}")
+
+    User = get_user_model()
+    User.objects.filter(email='bench-writes@example.com').delete()
+    user = User.objects.create_user(username='bench-writes', email='bench-writes@example.com', password='x')
+    estado, _ = Estado.objects.get_or_create(descripcion='Enviado')
+
+    print(f"{'hilos':>6} {'ops':>8} {'ops/s':>10} {'p50 ms':>8} {'p95 ms':>8} {'errores':>8}")
+    try:
+        for hilos in args.threads:
+            r = ejecutar(hilos, args.seconds, user.id, estado.id)
+            print(f"{r['hilos']:>6} {r['ops']:>8} {r['ops_s']:>10.1f} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} {r['errores']:>8}")
+    finally:
+        # Borra en cascada los pedidos y notificaciones del benchmark
+        user.delete()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
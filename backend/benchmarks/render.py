@@ -0,0 +1,108 @@
+"""
+CPU de serialización JSON y compresión de las respuestas grandes.
+
+Construye una vez los datos del menú (productos y combos) y de la primera
+página del historial de pedidos, y mide por separado lo que cuesta convertirlos en bytes
+con el JSONRenderer de DRF y con orjson, y comprimirlos con gzip y brotli.
+Ver benchmarks/README.md.
+
+    python -m benchmarks.render --escala small --repeticiones 200
+"""
+import argparse
+import statistics
+import sys
+import time
+
+from benchmarks.common import preparar_base
+
+
+def cargas(principal):
+    """``{nombre: data}`` tal como lo devuelven las vistas, antes de renderizar"""
+    from django.test import RequestFactory
+    from rest_framework.request import Request
+    from orders.views import PedidoViewSet
+    from products.serializers import ComboSerializer, ProductoSerializer
+    from products.views import ComboViewSet, ProductoViewSet
+
+    request = Request(RequestFactory().get('/'))
+    request.user = principal
+    contexto = {'request': request}
+    pedidos = PedidoViewSet(request=request, action='list', format_kwarg=None)
+    pagina = pedidos.get_queryset().order_by('-creado', '-id')[:20]
+    return {
+        'productos': ProductoSerializer(ProductoViewSet.queryset.all(), many=True, context=contexto).data,
+        'combos': ComboSerializer(ComboViewSet.queryset.all(), many=True, context=contexto).data,
+        'pedidos': pedidos.get_serializer(pagina, many=True).data,
+    }
+
+
+def cronometrar(funcion, repeticiones):
+    """Mediana en milisegundos de ``repeticiones`` llamadas"""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return round(statistics.median(tiempos) * 1000, 3)
+
+
+def medir(data, repeticiones):
+    from django.test import override_settings
+    from rest_framework.renderers import JSONRenderer
+    from restaurant_api import compresion
+    from restaurant_api.renderers import RapidoJSONRenderer, orjson
+
+    contenido = JSONRenderer().render(data)
+    resultado = {
+        'bytes': len(contenido),
+        'drf_ms': cronometrar(lambda: JSONRenderer().render(data), repeticiones),
+        'orjson_ms': None,
+    }
+    if orjson is not None:
+        with override_settings(FAST_JSON=True):
+            resultado['orjson_ms'] = cronometrar(lambda: RapidoJSONRenderer().render(data), repeticiones)
+    for codificacion in ('gzip', 'br'):
+        if codificacion == 'br' and compresion.brotli is None:
+            resultado.update({'br_bytes': None, 'br_ms': None})
+            continue
+        resultado[f'{codificacion}_bytes'] = len(compresion.comprimir(contenido, codificacion))
+        resultado[f'{codificacion}_ms'] = cronometrar(
+            lambda: compresion.comprimir(contenido, codificacion), repeticiones
+        )
+    return resultado
+
+
+def imprimir(resultados):
+    def celda(valor, ancho, decimales=None):
+        if valor is None:
+            return '-'.rjust(ancho)
+        return f'{valor:>{ancho}.{decimales}f}' if decimales is not None else f'{valor:>{ancho}}'
+
+    print(f"{'carga':<10} {'bytes':>9} {'drf ms':>8} {'orjson ms':>10} {'gzip B':>8} {'gzip ms':>8} "
+          f"{'br B':>8} {'br ms':>7}")
+    for nombre, r in resultados.items():
+        print(f"{nombre:<10} {r['bytes']:>9} {r['drf_ms']:>8.3f} {celda(r['orjson_ms'], 10, 3)} "
+              f"{r['gzip_bytes']:>8} {r['gzip_ms']:>8.3f} {celda(r['br_bytes'], 8)} {celda(r['br_ms'], 7, 3)}")
+
+
+def parse_args():
+    from benchmarks.seed import ESCALAS
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--escala', choices=sorted(ESCALAS), default='small')
+    parser.add_argument('--repeticiones', type=int, default=100)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    preparar_base()
+
+    from benchmarks.seed import sembrar
+    principal = sembrar(args.escala)
+    resultados = {nombre: medir(data, args.repeticiones) for nombre, data in cargas(principal).items()}
+    imprimir(resultados)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
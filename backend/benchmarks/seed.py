@@ -0,0 +1,123 @@
+"""
+Datos de prueba realistas para los benchmarks.
+
+Todo se inserta con bulk_create; al final se reconstruyen los resúmenes de
+calificaciones (bulk_create no dispara señales) y se invalida el catálogo.
+"""
+import random
+from decimal import Decimal
+
+ESCALAS = {
+    'tiny': {
+        'ingredientes': 20, 'productos': 30, 'combos': 5, 'usuarios': 5,
+        'pedidos': 40, 'reviews': 60, 'notificaciones': 80,
+        'pedidos_usuario_principal': 15, 'notificaciones_usuario_principal': 25,
+    },
+    'small': {
+        'ingredientes': 100, 'productos': 500, 'combos': 100, 'usuarios': 100,
+        'pedidos': 2000, 'reviews': 5000, 'notificaciones': 5000,
+        'pedidos_usuario_principal': 200, 'notificaciones_usuario_principal': 500,
+    },
+    'large': {
+        'ingredientes': 300, 'productos': 3000, 'combos': 500, 'usuarios': 1000,
+        'pedidos': 20000, 'reviews': 30000, 'notificaciones': 50000,
+        'pedidos_usuario_principal': 2000, 'notificaciones_usuario_principal': 5000,
+    },
+}
+
+EMAIL_PRINCIPAL = 'bench@example.com'
+PASSWORD = 'bench-password-123'
+
+
+def _precio(rng, minimo, maximo):
+    return Decimal(rng.randint(minimo * 100, maximo * 100)) / 100
+
+
+def sembrar(escala='small', semilla=42):
+    """Crear el conjunto de datos y devolver el usuario principal del benchmark"""
+    from django.contrib.auth import get_user_model
+    from django.contrib.auth.hashers import make_password
+    from notifications.models import Notificacion
+    from orders import estados
+    from orders.models import Pedido, PedidoItem
+    from products.cache import bump_catalog_version
+    from products.models import Combo, ComboProducto, Ingrediente, Producto, ProductoIngrediente
+    from reviews.models import Review
+    from reviews.resumen import reconstruir_resumenes
+
+    n = ESCALAS[escala]
+    rng = random.Random(semilla)
+    User = get_user_model()
+
+    ingredientes = Ingrediente.objects.bulk_create([
+        Ingrediente(nombre=f'Ingrediente {i}', costos_extras=_precio(rng, 0, 3))
+        for i in range(n['ingredientes'])
+    ])
+    productos = Producto.objects.bulk_create([
+        Producto(
+            nombre=f'Producto {i}',
+            descripcion='Preparado al momento con ingredientes frescos de temporada. ' * 3,
+            precio=_precio(rng, 3, 25),
+            es_personalizable=rng.random() < 0.6,
+        )
+        for i in range(n['productos'])
+    ])
+    ProductoIngrediente.objects.bulk_create([
+        ProductoIngrediente(producto=producto, ingrediente=ingrediente)
+        for producto in productos
+        for ingrediente in rng.sample(ingredientes, min(len(ingredientes), rng.randint(3, 8)))
+    ], batch_size=1000)
+    combos = Combo.objects.bulk_create([
+        Combo(nombre=f'Combo {i}', descripcion='Combo de la casa', precio_total=_precio(rng, 15, 45))
+        for i in range(n['combos'])
+    ])
+    ComboProducto.objects.bulk_create([
+        ComboProducto(combo=combo, producto=producto, cantidad=rng.randint(1, 2))
+        for combo in combos
+        for producto in rng.sample(productos, min(len(productos), rng.randint(2, 4)))
+    ], batch_size=1000)
+
+    password = make_password(PASSWORD)
+    usuarios = User.objects.bulk_create([
+        User(username=f'bench{i}', email=f'bench{i}@example.com', password=password)
+        for i in range(n['usuarios'])
+    ])
+    principal = User.objects.create(username='bench', email=EMAIL_PRINCIPAL, password=password)
+
+    estado_enviado = estados.get_estado(estados.ENVIADO)
+    estado_no_leido = estados.get_estado(estados.NO_LEIDO)
+    estado_leido = estados.get_estado(estados.LEIDO)
+
+    duenos_pedidos = [principal] * n['pedidos_usuario_principal'] + [
+        rng.choice(usuarios) for _ in range(n['pedidos'])
+    ]
+    pedidos = Pedido.objects.bulk_create([
+        Pedido(usuario=usuario, estado=estado_enviado, total=_precio(rng, 10, 80),
+               direccion='Calle Falsa 123', telefono_contacto='5551234')
+        for usuario in duenos_pedidos
+    ], batch_size=1000)
+    PedidoItem.objects.bulk_create([
+        PedidoItem(pedido=pedido, producto=rng.choice(productos), cantidad=rng.randint(1, 3),
+                   precio_unitario=_precio(rng, 3, 25))
+        for pedido in pedidos
+        for _ in range(rng.randint(1, 4))
+    ], batch_size=1000)
+
+    Review.objects.bulk_create([
+        Review(usuario=rng.choice(usuarios), producto=rng.choice(productos[:max(1, len(productos) // 10)]),
+               texto='Muy rico, volvería a pedirlo.', calificacion=rng.randint(1, 5))
+        for _ in range(n['reviews'])
+    ], batch_size=1000)
+
+    duenos_notificaciones = [principal] * n['notificaciones_usuario_principal'] + [
+        rng.choice(usuarios) for _ in range(n['notificaciones'])
+    ]
+    Notificacion.objects.bulk_create([
+        Notificacion(usuario=usuario, mensaje='Tu pedido ha cambiado de estado.',
+                     estado=estado_no_leido if rng.random() < 0.4 else estado_leido)
+        for usuario in duenos_notificaciones
+    ], batch_size=1000)
+
+    reconstruir_resumenes()
+    bump_catalog_version()
+    return principal
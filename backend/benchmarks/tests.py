@@ -0,0 +1,22 @@
+from django.test import TestCase
+
+from .api import comparar, ejecutar
+from .seed import sembrar
+
+
+class BenchmarkApiTests(TestCase):
+    """El benchmark debe poder ejecutarse completo sobre datos mínimos"""
+
+    def test_ejecuta_todos_los_escenarios_sin_errores(self):
+        principal = sembrar('tiny')
+        resultados = ejecutar(principal, peticiones=2, calentamiento=0)
+        self.assertIn('checkout', resultados)
+        for nombre, r in resultados.items():
+            self.assertEqual(r['errores'], 0, nombre)
+            self.assertEqual(r['peticiones'], 2)
+
+    def test_comparar_detecta_regresiones(self):
+        base = {'pedidos': {'consultas': 3, 'errores': 0, 'p50_ms': 10.0}}
+        self.assertEqual(comparar({'pedidos': {'consultas': 3, 'errores': 0, 'p50_ms': 14.0}}, base), [])
+        regresiones = comparar({'pedidos': {'consultas': 5, 'errores': 1, 'p50_ms': 30.0}}, base)
+        self.assertEqual(len(regresiones), 3)
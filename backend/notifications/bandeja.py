@@ -0,0 +1,119 @@
+"""
+Bandeja de salida de notificaciones.
+
+Las vistas solo insertan una fila en ``NotificacionPendiente`` dentro de su
+transacción; si la transacción se revierte, la notificación tampoco existe.
+El comando ``procesar_notificaciones`` vacía la bandeja por lotes y crea las
+``Notificacion`` con bulk_create, fuera del camino de la petición. Los
+clientes conectados por SSE reciben el aviso, con el id de la notificación,
+cuando se confirma la transacción que la crea.
+"""
+from collections import Counter
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from orders import estados
+from restaurant_api.eventos import emitir, grupo_usuario
+from . import contadores
+from .models import Notificacion, NotificacionPendiente
+
+
+def encolar(usuario, mensaje, estado=estados.NO_LEIDO):
+    """Registrar una notificación para ``usuario`` (instancia o id)"""
+    usuario_id = getattr(usuario, 'pk', usuario)
+    pendiente = NotificacionPendiente.objects.create(usuario_id=usuario_id, mensaje=mensaje, estado=estado)
+    _procesar_inline()
+    return pendiente
+
+
+def difundir(mensaje, estado=estados.INFORMACION):
+    """Registrar una notificación para todos los usuarios activos"""
+    pendiente = NotificacionPendiente.objects.create(usuario=None, mensaje=mensaje, estado=estado)
+    _procesar_inline()
+    return pendiente
+
+
+def _procesar_inline():
+    if settings.NOTIFICATIONS_INLINE:
+        transaction.on_commit(procesar_pendientes)
+
+
+def _avisar(notificaciones):
+    """Publicar por SSE las notificaciones recién creadas, al confirmar"""
+    for notificacion in notificaciones:
+        emitir(
+            grupo_usuario(notificacion.usuario_id), 'notificacion',
+            id=notificacion.id, mensaje=notificacion.mensaje, estado=notificacion.estado.descripcion,
+        )
+
+
+def _lotes(iterable, tamano):
+    iterador = iter(iterable)
+    while lote := list(islice(iterador, tamano)):
+        yield lote
+
+
+def _crear_difusion(pendiente, estado, tamano):
+    usuarios = (
+        get_user_model().objects.filter(is_active=True)
+        .order_by('id').values_list('id', flat=True).iterator(chunk_size=tamano)
+    )
+    total = 0
+    for ids in _lotes(usuarios, tamano):
+        creadas = Notificacion.objects.bulk_create([
+            Notificacion(usuario_id=usuario_id, mensaje=pendiente.mensaje, estado=estado)
+            for usuario_id in ids
+        ])
+        if estado.descripcion == estados.NO_LEIDO:
+            contadores.invalidar(ids)
+        _avisar(creadas)
+        total += len(ids)
+    return total
+
+
+def procesar_lote(tamano=None):
+    """
+    Crear las notificaciones de hasta ``tamano`` filas pendientes.
+
+    Devuelve ``(filas procesadas, notificaciones creadas)``. Con PostgreSQL
+    varios workers pueden trabajar a la vez: cada uno salta las filas que otro
+    tiene bloqueadas.
+    """
+    tamano = tamano or settings.NOTIFICATIONS_BATCH_SIZE
+    with transaction.atomic():
+        pendientes = list(
+            NotificacionPendiente.objects.select_for_update(skip_locked=True).order_by('id')[:tamano]
+        )
+        if not pendientes:
+            return 0, 0
+        por_descripcion = {descripcion: estados.get_estado(descripcion) for descripcion in {p.estado for p in pendientes}}
+        individuales = [
+            Notificacion(usuario_id=p.usuario_id, mensaje=p.mensaje, estado=por_descripcion[p.estado])
+            for p in pendientes if p.usuario_id
+        ]
+        Notificacion.objects.bulk_create(individuales)
+        nuevas_no_leidas = Counter(
+            n.usuario_id for n in individuales if n.estado.descripcion == estados.NO_LEIDO
+        )
+        for usuario_id, cantidad in nuevas_no_leidas.items():
+            contadores.ajustar(usuario_id, cantidad)
+        _avisar(individuales)
+        creadas = len(individuales)
+        for pendiente in pendientes:
+            if pendiente.usuario_id is None:
+                creadas += _crear_difusion(pendiente, por_descripcion[pendiente.estado], tamano)
+        NotificacionPendiente.objects.filter(pk__in=[p.pk for p in pendientes]).delete()
+    return len(pendientes), creadas
+
+
+def procesar_pendientes(tamano=None):
+    """Vaciar la bandeja; devuelve el número de notificaciones creadas"""
+    total = 0
+    while True:
+        procesadas, creadas = procesar_lote(tamano)
+        total += creadas
+        if not procesadas:
+            return total
@@ -0,0 +1,38 @@
+"""
+Comprobaciones de configuración (``manage.py check``).
+
+Los contadores de no leídas (``notifications/contadores.py``) se ajustan desde
+los workers web y desde ``procesar_notificaciones``: con la caché por defecto
+en la memoria de cada proceso, cada uno ve su propio contador. Sin
+``NOTIFICATIONS_INLINE`` el worker es siempre otro proceso, así que esa
+combinación es un error; con varios workers web, un aviso de ``--deploy``.
+"""
+from django.conf import settings
+from django.core.checks import Error, Tags, Warning, register
+
+LOCMEM = 'django.core.cache.backends.locmem.LocMemCache'
+
+
+@register(Tags.caches)
+def comprobar_cache_del_worker(app_configs, **kwargs):
+    if settings.NOTIFICATIONS_INLINE or settings.CACHES['default']['BACKEND'] != LOCMEM:
+        return []
+    return [Error(
+        'Las notificaciones las crea procesar_notificaciones, pero la caché por defecto '
+        'vive en la memoria de cada proceso: los contadores de no leídas de los workers '
+        'web nunca verían las notificaciones que crea.',
+        hint='Use CACHE_BACKEND=redis, o NOTIFICATIONS_INLINE=True para crearlas sin worker.',
+        id='notifications.E001',
+    )]
+
+
+@register(Tags.caches, deploy=True)
+def comprobar_cache_compartida(app_configs, **kwargs):
+    if not settings.NOTIFICATIONS_INLINE or settings.CACHES['default']['BACKEND'] != LOCMEM:
+        return []
+    return [Warning(
+        'La caché por defecto vive en la memoria de cada proceso: los contadores de '
+        'notificaciones no ven los cambios de otros workers.',
+        hint='Use CACHE_BACKEND=redis si hay más de un proceso.',
+        id='notifications.W001',
+    )]
@@ -0,0 +1,71 @@
+"""
+Contador de notificaciones no leídas por usuario, en caché.
+
+Se calcula con un COUNT la primera vez que se pide y después se ajusta al
+confirmarse cada cambio hecho desde la API o la bandeja de salida. Los
+cambios hechos por otras vías (admin, borrados en cascada) se corrigen al
+expirar la clave tras ``NOTIFICATIONS_COUNTER_TIMEOUT`` segundos.
+
+Los ajustes llegan desde los workers web y desde el proceso de
+``procesar_notificaciones``, así que la caché por defecto debe ser compartida
+(``CACHE_BACKEND=redis``). ``notifications/checks.py`` da un error si el
+worker está activo (``NOTIFICATIONS_INLINE=False``) con la caché en memoria de
+cada proceso, y solo un aviso de ``--deploy`` en modo inline, donde los
+contadores son exactos con un único proceso y con varios tardan hasta
+``NOTIFICATIONS_COUNTER_TIMEOUT`` en corregirse.
+Quien llama a ``ajustar`` debe pasar el número de filas que su UPDATE o
+DELETE cambió de verdad, para que dos peticiones simultáneas no descuenten dos veces.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from orders import estados
+from .models import Notificacion
+
+
+def _key(usuario_id):
+    return f'notificaciones:no_leidas:{usuario_id}'
+
+
+def no_leidas(usuario_id):
+    key = _key(usuario_id)
+    valor = cache.get(key)
+    if valor is None:
+        valor = Notificacion.objects.filter(
+            usuario_id=usuario_id, estado=estados.get_estado(estados.NO_LEIDO)
+        ).count()
+        # add() no pisa un valor que otra petición haya ajustado mientras tanto
+        cache.add(key, valor, timeout=settings.NOTIFICATIONS_COUNTER_TIMEOUT)
+    return valor
+
+
+def es_no_leida(estado_id):
+    return estado_id is not None and estado_id == estados.get_estado(estados.NO_LEIDO).id
+
+
+def ajustar(usuario_id, delta):
+    """Sumar ``delta`` al contador al confirmar la transacción"""
+    if not delta:
+        return
+
+    def aplicar():
+        try:
+            valor = cache.incr(_key(usuario_id), delta)
+        except ValueError:
+            return  # No está en caché: se calculará al pedirlo
+        if valor < 0:
+            cache.delete(_key(usuario_id))
+
+    transaction.on_commit(aplicar)
+
+
+def reiniciar(usuario_id):
+    """El usuario no tiene notificaciones sin leer"""
+    transaction.on_commit(lambda: cache.set(_key(usuario_id), 0, timeout=settings.NOTIFICATIONS_COUNTER_TIMEOUT))
+
+
+def invalidar(usuario_ids):
+    """Descartar los contadores para que se recalculen (difusiones masivas)"""
+    keys = [_key(usuario_id) for usuario_id in usuario_ids]
+    transaction.on_commit(lambda: cache.delete_many(keys))
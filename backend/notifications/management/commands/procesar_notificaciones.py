@@ -0,0 +1,42 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from notifications.bandeja import procesar_lote
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Crea por lotes las notificaciones pendientes de la bandeja de salida'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, help='Filas de la bandeja por transacción')
+        parser.add_argument('--intervalo', type=float, default=1.0,
+                            help='Segundos de espera cuando la bandeja está vacía')
+        parser.add_argument('--una-vez', action='store_true',
+                            help='Vaciar la bandeja y terminar en lugar de seguir esperando')
+
+    def handle(self, *args, **options):
+        total = 0
+        try:
+            while True:
+                close_old_connections()
+                try:
+                    procesadas, creadas = procesar_lote(options['lote'])
+                except Exception:
+                    if options['una_vez']:
+                        raise
+                    logger.exception('Error procesando la bandeja de notificaciones')
+                    procesadas, creadas = 0, 0
+                total += creadas
+                if procesadas:
+                    continue
+                if options['una_vez']:
+                    break
+                time.sleep(options['intervalo'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f'Se crearon {total} notificaciones'))
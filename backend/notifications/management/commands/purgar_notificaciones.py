@@ -0,0 +1,36 @@
+from contextlib import nullcontext
+
+from django.core.management.base import BaseCommand
+
+from notifications.retencion import abrir_archivo, purgar
+
+
+class Command(BaseCommand):
+    help = 'Borra por lotes las notificaciones más antiguas que la política de retención'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias-leidas', type=int,
+                            help='Conservar las leídas estos días (por defecto NOTIFICATIONS_RETENTION_READ_DAYS)')
+        parser.add_argument('--dias', type=int,
+                            help='Conservar el resto estos días (por defecto NOTIFICATIONS_RETENTION_DAYS)')
+        parser.add_argument('--lote', type=int, help='Filas por DELETE')
+        parser.add_argument('--pausa', type=float, default=0,
+                            help='Segundos de espera entre lotes para no saturar la base')
+        parser.add_argument('--archivo', help='Guardar las filas borradas en este JSON Lines (.gz comprime)')
+        parser.add_argument('--simular', action='store_true', help='Solo contar lo que se borraría')
+
+    def handle(self, *args, **options):
+        archivo = abrir_archivo(options['archivo']) if options['archivo'] and not options['simular'] else nullcontext()
+        with archivo as destino:
+            resultado = purgar(
+                dias_leidas=options['dias_leidas'],
+                dias=options['dias'],
+                lote=options['lote'],
+                pausa=options['pausa'],
+                archivo=destino,
+                simular=options['simular'],
+            )
+        verbo = 'Se borrarían' if options['simular'] else 'Se borraron'
+        self.stdout.write(self.style.SUCCESS(
+            f"{verbo} {resultado['leidas']} notificaciones leídas y {resultado['antiguas']} antiguas"
+        ))
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.6 on 2026-10-18 13:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0002_initial'),
+        ('orders', '0003_estado_rename_telefono_pedido_telefono_contacto_and_more'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='notificacion',
+            name='leido',
+        ),
+        migrations.AddField(
+            model_name='notificacion',
+            name='estado',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='orders.estado'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:05
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0003_remove_notificacion_leido_notificacion_estado'),
+        ('orders', '0005_indices_consultas'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notificacion',
+            index=models.Index(fields=['usuario', 'creado'], name='notif_usuario_creado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notificacion',
+            index=models.Index(fields=['usuario', 'estado', 'creado'], name='notif_usuario_estado_idx'),
+        ),
+    ]
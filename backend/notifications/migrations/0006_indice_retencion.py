@@ -0,0 +1,20 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:28
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0005_bandeja_salida'),
+        ('orders', '0005_indices_consultas'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notificacion',
+            index=models.Index(fields=['estado', 'creado'], name='notif_estado_creado_idx'),
+        ),
+    ]
@@ -8,5 +8,28 @@ class Notificacion(models.Model):
     estado = models.ForeignKey(Estado, on_delete=models.SET_NULL, null=True, blank=True)
     creado = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['usuario', 'creado'], name='notif_usuario_creado_idx'),
+            models.Index(fields=['usuario', 'estado', 'creado'], name='notif_usuario_estado_idx'),
+            # Purga por antigüedad de notifications/retencion.py
+            models.Index(fields=['estado', 'creado'], name='notif_estado_creado_idx'),
+        ]
+
+    def __str__(self):
+        return f"Notificacion para {self.usuario.email}: {self.mensaje[:30]}"
+
+class NotificacionPendiente(models.Model):
+    """
+    Bandeja de salida: notificaciones registradas en la misma transacción que
+    el cambio que las origina y creadas después por ``procesar_notificaciones``.
+    Sin ``usuario`` es una difusión a todos los usuarios activos.
+    """
+    usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, blank=True)
+    mensaje = models.CharField(max_length=500)
+    estado = models.CharField(max_length=50)
+    creado = models.DateTimeField(auto_now_add=True)
+
     def __str__(self):
-        return f"Notificacion para {self.usuario.email}: {self.mensaje[:30]}"
\ No newline at end of file
+        destino = self.usuario_id or 'todos'
+        return f"Pendiente para {destino}: {self.mensaje[:30]}"
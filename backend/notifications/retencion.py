@@ -0,0 +1,99 @@
+"""
+Política de retención de notificaciones.
+
+Las notificaciones leídas se conservan ``NOTIFICATIONS_RETENTION_READ_DAYS``
+días y el resto ``NOTIFICATIONS_RETENTION_DAYS``. El borrado avanza por
+lotes de ``NOTIFICATIONS_PURGE_BATCH_SIZE`` filas, cada uno en su propia
+transacción corta y recorriendo el índice (estado, creado).
+"""
+import gzip
+import json
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+from orders import estados
+from orders.models import Estado
+from . import contadores
+from .models import Notificacion
+
+CAMPOS_ARCHIVO = ('id', 'usuario_id', 'mensaje', 'estado_id', 'creado')
+
+
+def abrir_archivo(ruta):
+    """Archivo JSON Lines donde se guardan las filas antes de borrarlas (.gz comprime)"""
+    if str(ruta).endswith('.gz'):
+        return gzip.open(ruta, 'at', encoding='utf-8')
+    return open(ruta, 'a', encoding='utf-8')
+
+
+def borrar_por_lotes(queryset, lote=None, pausa=0, archivo=None, no_leidas=False):
+    """
+    Borrar las filas de ``queryset`` por lotes y devolver cuántas se borraron.
+
+    Cada lote se borra con un único DELETE por clave primaria: Notificacion
+    no tiene dependientes ni señales de borrado, así que el collector de
+    Django no hace más consultas. ``archivo`` recibe cada fila antes de borrarla.
+    Con ``no_leidas`` se invalidan los contadores de los usuarios afectados.
+    """
+    lote = lote or settings.NOTIFICATIONS_PURGE_BATCH_SIZE
+    campos = CAMPOS_ARCHIVO if archivo else ('id', 'usuario_id')
+    total = 0
+    while True:
+        filas = list(queryset.order_by('creado').values(*campos)[:lote])
+        if not filas:
+            return total
+        if archivo:
+            for fila in filas:
+                archivo.write(json.dumps(fila, cls=DjangoJSONEncoder) + '\n')
+            archivo.flush()
+        with transaction.atomic(using=queryset.db):
+            borradas, _ = Notificacion.objects.using(queryset.db).filter(pk__in=[fila['id'] for fila in filas]).delete()
+            total += borradas
+            if no_leidas:
+                contadores.invalidar({fila['usuario_id'] for fila in filas})
+        if len(filas) < lote:
+            return total
+        if pausa:
+            time.sleep(pausa)
+
+
+def _por_estado(estado_id, limite):
+    if estado_id is None:
+        return Notificacion.objects.filter(estado__isnull=True, creado__lt=limite)
+    return Notificacion.objects.filter(estado_id=estado_id, creado__lt=limite)
+
+
+def purgar(dias_leidas=None, dias=None, lote=None, pausa=0, archivo=None, simular=False):
+    """
+    Aplicar la política de retención. Devuelve ``{'leidas': n, 'antiguas': m}``.
+
+    La purga general recorre cada estado por separado para usar el índice
+    (estado, creado) en lugar de recorrer la tabla entera.
+    """
+    dias_leidas = settings.NOTIFICATIONS_RETENTION_READ_DAYS if dias_leidas is None else dias_leidas
+    dias = settings.NOTIFICATIONS_RETENTION_DAYS if dias is None else dias
+    ahora = timezone.now()
+    leido = estados.get_estado(estados.LEIDO)
+    no_leido = estados.get_estado(estados.NO_LEIDO)
+    resultado = {'leidas': 0, 'antiguas': 0}
+
+    def aplicar(clave, queryset, **kwargs):
+        if simular:
+            resultado[clave] += queryset.count()
+        else:
+            resultado[clave] += borrar_por_lotes(queryset, lote, pausa, archivo, **kwargs)
+
+    if dias_leidas:
+        aplicar('leidas', _por_estado(leido.id, ahora - timedelta(days=dias_leidas)))
+    if dias:
+        limite = ahora - timedelta(days=dias)
+        for estado_id in [*Estado.objects.values_list('id', flat=True), None]:
+            if estado_id == leido.id and dias_leidas and dias_leidas <= dias:
+                continue  # Ya cubiertas por la purga de leídas
+            aplicar('antiguas', _por_estado(estado_id, limite), no_leidas=estado_id == no_leido.id)
+    return resultado
@@ -1,8 +1,10 @@
 from rest_framework import serializers
+from restaurant_api.campos import CamposDinamicosMixin
+from restaurant_api.instrumentation import MetricasSerializerMixin
 from .models import Notificacion
 from orders.models import Estado
 
-class NotificacionSerializer(serializers.ModelSerializer):
+class NotificacionSerializer(CamposDinamicosMixin, MetricasSerializerMixin, serializers.ModelSerializer):
     usuario_email = serializers.CharField(source='usuario.email', read_only=True)
     estado_descripcion = serializers.CharField(source='estado.descripcion', read_only=True)
 
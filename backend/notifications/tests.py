@@ -1,3 +1,334 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import json
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient, APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from orders import estados
+from restaurant_api.eventos import GRUPO_TODOS, get_canal, grupo_usuario
+from . import contadores
+from .checks import comprobar_cache_compartida, comprobar_cache_del_worker
+from .bandeja import difundir, encolar, procesar_lote
+from .models import Notificacion, NotificacionPendiente
+from .retencion import borrar_por_lotes, purgar
+from .views import NotificacionViewSet
+
+User = get_user_model()
+
+
+def crear_usuario(i, **kwargs):
+    return User.objects.create_user(username=f'u{i}', email=f'u{i}@example.com', password='clave-segura-123', **kwargs)
+
+
+@override_settings(NOTIFICATIONS_INLINE=False)
+class BandejaSalidaTests(TestCase):
+    """Notificaciones encoladas y creadas por el worker"""
+
+    def setUp(self):
+        # El registro de estados sobrevive al rollback de cada test
+        self.addCleanup(estados.limpiar_registro)
+        self.usuario = crear_usuario(0)
+
+    def test_encolar_no_crea_la_notificacion(self):
+        encolar(self.usuario, 'Hola')
+        self.assertFalse(Notificacion.objects.exists())
+        self.assertEqual(procesar_lote(), (1, 1))
+        notificacion = Notificacion.objects.get()
+        self.assertEqual(notificacion.usuario, self.usuario)
+        self.assertEqual(notificacion.estado.descripcion, estados.NO_LEIDO)
+        self.assertFalse(NotificacionPendiente.objects.exists())
+
+    def test_transaccion_revertida_no_deja_pendientes(self):
+        try:
+            with transaction.atomic():
+                encolar(self.usuario, 'Hola')
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        self.assertFalse(NotificacionPendiente.objects.exists())
+
+    def test_difusion_a_usuarios_activos(self):
+        for i in range(1, 6):
+            crear_usuario(i)
+        crear_usuario(6, is_active=False)
+        difundir('Nuevo menú')
+        with override_settings(NOTIFICATIONS_BATCH_SIZE=2):
+            self.assertEqual(procesar_lote(), (1, 6))
+        self.assertEqual(Notificacion.objects.filter(mensaje='Nuevo menú').count(), 6)
+        self.assertFalse(Notificacion.objects.filter(usuario__is_active=False).exists())
+
+    def test_lote_en_consultas_constantes(self):
+        for i in range(1, 4):
+            encolar(crear_usuario(i), 'Aviso')
+        with self.captureOnCommitCallbacks(execute=True):
+            estados.get_estado(estados.NO_LEIDO)
+        with self.assertNumQueries(5):
+            # SAVEPOINT, SELECT de la bandeja, INSERT, DELETE, RELEASE
+            procesar_lote()
+        self.assertEqual(Notificacion.objects.count(), 3)
+
+    def test_comando_vacia_la_bandeja(self):
+        for i in range(3):
+            encolar(self.usuario, f'Aviso {i}')
+        salida = StringIO()
+        # Dentro de la transacción del test cerraría la conexión, como el cliente
+        # de pruebas con la señal request_finished
+        with mock.patch('notifications.management.commands.procesar_notificaciones.close_old_connections'):
+            call_command('procesar_notificaciones', '--una-vez', '--lote', '2', stdout=salida)
+        self.assertIn('Se crearon 3 notificaciones', salida.getvalue())
+        self.assertEqual(Notificacion.objects.count(), 3)
+
+    def test_avisa_por_el_canal_al_crear_la_notificacion(self):
+        with mock.patch.object(get_canal(), 'publicar') as publicar:
+            with self.captureOnCommitCallbacks(execute=True):
+                encolar(self.usuario, 'Hola')
+            publicar.assert_not_called()
+            with self.captureOnCommitCallbacks(execute=True):
+                procesar_lote()
+        notificacion = Notificacion.objects.get()
+        publicar.assert_called_once_with(grupo_usuario(self.usuario.id), {
+            'tipo': 'notificacion', 'id': notificacion.id, 'mensaje': 'Hola', 'estado': estados.NO_LEIDO,
+        })
+
+    @override_settings(NOTIFICATIONS_INLINE=True)
+    def test_modo_inline(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            encolar(self.usuario, 'Hola')
+        self.assertTrue(Notificacion.objects.filter(mensaje='Hola').exists())
+
+
+class EventosSSETests(TestCase):
+    """Flujo Server-Sent Events por usuario"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = crear_usuario(7)
+        cls.otro = crear_usuario(8)
+
+    def setUp(self):
+        cache.clear()
+
+    async def conectar(self, usuario=None):
+        token = AccessToken.for_user(usuario or self.usuario)
+        response = await self.async_client.get(reverse('eventos'), headers={'Authorization': f'Bearer {token}'})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        flujo = aiter(response.streaming_content)
+        self.assertTrue((await anext(flujo)).startswith(b'retry:'))
+        return flujo
+
+    async def desconectar(self, flujo):
+        # Al desconectarse el cliente, el servidor ASGI cancela la tarea que lee el flujo
+        tarea = asyncio.ensure_future(anext(flujo))
+        await asyncio.sleep(0)
+        tarea.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await tarea
+
+    async def test_sin_token(self):
+        response = await self.async_client.get(reverse('eventos'))
+        self.assertEqual(response.status_code, 401)
+        response = await self.async_client.get(reverse('eventos') + '?token=invalido')
+        self.assertEqual(response.status_code, 401)
+
+    async def test_usuario_inactivo_o_borrado(self):
+        token = AccessToken.for_user(self.otro)
+        self.otro.is_active = False
+        await self.otro.asave()
+        response = await self.async_client.get(reverse('eventos'), headers={'Authorization': f'Bearer {token}'})
+        self.assertEqual(response.status_code, 401)
+        await self.otro.adelete()
+        response = await self.async_client.get(reverse('eventos') + f'?token={token}')
+        self.assertEqual(response.status_code, 401)
+
+    async def test_recibe_solo_sus_eventos_y_difusiones(self):
+        flujo = await self.conectar()
+        canal = get_canal()
+        canal.publicar(grupo_usuario(self.otro.id), {'tipo': 'pedido', 'id': 2, 'estado': 'Enviado'})
+        canal.publicar(grupo_usuario(self.usuario.id), {'tipo': 'pedido', 'id': 1, 'estado': 'Enviado'})
+        canal.publicar(GRUPO_TODOS, {'tipo': 'notificacion', 'mensaje': 'Nuevo menú'})
+        self.assertEqual(
+            await anext(flujo),
+            b'event: pedido\ndata: {"tipo": "pedido", "id": 1, "estado": "Enviado"}\n\n',
+        )
+        self.assertIn(b'Nuevo men', await anext(flujo))
+        await self.desconectar(flujo)
+        self.assertFalse(canal._suscripciones)
+
+    @override_settings(EVENTS_KEEPALIVE=0.01)
+    async def test_keepalive(self):
+        flujo = await self.conectar()
+        self.assertEqual(await anext(flujo), b': ping\n\n')
+        await self.desconectar(flujo)
+
+
+class ContadorNoLeidasTests(APITestCase):
+    """Contador de no leídas en caché, ajustado con cada cambio"""
+
+    def setUp(self):
+        self.addCleanup(estados.limpiar_registro)
+        cache.clear()
+        self.usuario = crear_usuario(0)
+        self.client.force_authenticate(self.usuario)
+        self.no_leido = estados.get_estado(estados.NO_LEIDO)
+        self.leido = estados.get_estado(estados.LEIDO)
+        self.notificaciones = [
+            Notificacion.objects.create(usuario=self.usuario, mensaje=f'Aviso {i}', estado=self.no_leido)
+            for i in range(3)
+        ]
+        Notificacion.objects.create(usuario=self.usuario, mensaje='Vieja', estado=self.leido)
+
+    def contador(self):
+        return self.client.get(reverse('notification-contador')).data['no_leidas']
+
+    def test_contador_cacheado(self):
+        self.assertEqual(self.contador(), 3)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.contador(), 3)
+        self.assertEqual(self.client.get(reverse('notification-no-leidas')).data['count'], 3)
+
+    def test_nuevas_notificaciones_del_worker(self):
+        self.assertEqual(self.contador(), 3)
+        encolar(self.usuario, 'Nuevo')
+        with self.captureOnCommitCallbacks(execute=True):
+            procesar_lote()
+        self.assertEqual(self.contador(), 4)
+
+    def test_marcar_leida_y_borrar(self):
+        self.assertEqual(self.contador(), 3)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(reverse('notification-marcar-leida', args=[self.notificaciones[0].id]))
+            # Marcarla otra vez no descuenta de nuevo
+            self.client.patch(reverse('notification-marcar-leida', args=[self.notificaciones[0].id]))
+            self.client.delete(reverse('notification-detail', args=[self.notificaciones[1].id]))
+        self.assertEqual(self.contador(), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(reverse('notification-detail', args=[self.notificaciones[0].id]),
+                              {'estado': self.no_leido.id}, format='json')
+        self.assertEqual(self.contador(), 2)
+
+    def test_peticiones_simultaneas_descuentan_una_vez(self):
+        for i in range(3):
+            Notificacion.objects.create(usuario=self.usuario, mensaje=f'Otro {i}', estado=self.no_leido)
+        self.assertEqual(self.contador(), 6)
+        # La segunda petición leyó la notificación antes de que la primera confirmara su cambio
+        borrada, leida = (Notificacion.objects.get(pk=n.pk) for n in self.notificaciones[:2])
+        for url, peticion, instancia, esperado in (
+            (reverse('notification-detail', args=[borrada.id]), self.client.delete, borrada, 5),
+            (reverse('notification-marcar-leida', args=[leida.id]), self.client.patch, leida, 4),
+        ):
+            with self.captureOnCommitCallbacks(execute=True):
+                peticion(url)
+            with mock.patch.object(NotificacionViewSet, 'get_object', return_value=instancia):
+                with self.captureOnCommitCallbacks(execute=True):
+                    self.assertLess(peticion(url).status_code, 300)
+            self.assertEqual(self.contador(), esperado)
+
+    def test_marcar_todas_leidas(self):
+        self.assertEqual(self.contador(), 3)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(reverse('notification-marcar-todas-leidas'))
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual(self.contador(), 0)
+
+
+class ComprobacionesTests(TestCase):
+    """Caché compartida para los contadores con el worker de la bandeja"""
+
+    def ids(self, inline, backend='django.core.cache.backends.locmem.LocMemCache'):
+        caches_config = {**settings.CACHES, 'default': {'BACKEND': backend}}
+        with override_settings(NOTIFICATIONS_INLINE=inline, CACHES=caches_config):
+            return {e.id for e in comprobar_cache_del_worker(None) + comprobar_cache_compartida(None)}
+
+    def test_worker_requiere_cache_compartida(self):
+        self.assertEqual(self.ids(inline=False), {'notifications.E001'})
+        self.assertEqual(self.ids(inline=False, backend='django.core.cache.backends.redis.RedisCache'), set())
+
+    def test_inline_con_cache_en_memoria_solo_avisa(self):
+        self.assertEqual(self.ids(inline=True), {'notifications.W001'})
+
+
+class RetencionTests(TestCase):
+    """Purga por lotes según la política de retención"""
+
+    def setUp(self):
+        self.addCleanup(estados.limpiar_registro)
+        cache.clear()
+        self.usuario = crear_usuario(0)
+        self.leido = estados.get_estado(estados.LEIDO)
+        self.no_leido = estados.get_estado(estados.NO_LEIDO)
+
+    def crear(self, dias, estado, n=1):
+        notificaciones = Notificacion.objects.bulk_create([
+            Notificacion(usuario=self.usuario, mensaje=f'Hace {dias} días', estado=estado) for _ in range(n)
+        ])
+        Notificacion.objects.filter(pk__in=[n.pk for n in notificaciones]).update(
+            creado=timezone.now() - timedelta(days=dias)
+        )
+
+    def test_purgar_por_lotes(self):
+        self.crear(40, self.leido, n=5)
+        self.crear(10, self.leido)
+        self.crear(200, self.no_leido, n=2)
+        self.crear(200, None)
+        self.crear(40, self.no_leido)
+        salida = StringIO()
+        call_command('purgar_notificaciones', '--lote', '2', stdout=salida)
+        self.assertIn('Se borraron 5 notificaciones leídas y 3 antiguas', salida.getvalue())
+        self.assertEqual(
+            sorted(Notificacion.objects.values_list('mensaje', flat=True)), ['Hace 10 días', 'Hace 40 días']
+        )
+
+    def test_un_delete_por_lote(self):
+        self.crear(40, self.leido, n=3)
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(borrar_por_lotes(Notificacion.objects.all(), lote=2), 3)
+        self.assertEqual(sum(q['sql'].startswith('DELETE') for q in ctx.captured_queries), 2)
+
+    def test_simular_no_borra(self):
+        self.crear(40, self.leido, n=3)
+        salida = StringIO()
+        call_command('purgar_notificaciones', '--simular', stdout=salida)
+        self.assertIn('Se borrarían 3 notificaciones leídas', salida.getvalue())
+        self.assertEqual(Notificacion.objects.count(), 3)
+
+    def test_archivar_antes_de_borrar(self):
+        self.crear(400, self.no_leido, n=2)
+        with tempfile.TemporaryDirectory() as directorio:
+            ruta = os.path.join(directorio, 'notificaciones.jsonl.gz')
+            call_command('purgar_notificaciones', '--archivo', ruta, stdout=StringIO())
+            with gzip.open(ruta, 'rt') as archivo:
+                filas = [json.loads(linea) for linea in archivo]
+        self.assertEqual(len(filas), 2)
+        self.assertEqual(filas[0]['mensaje'], 'Hace 400 días')
+        self.assertFalse(Notificacion.objects.exists())
+
+    def test_purga_invalida_contador(self):
+        self.crear(200, self.no_leido, n=2)
+        self.assertEqual(contadores.no_leidas(self.usuario.id), 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            purgar()
+        self.assertEqual(contadores.no_leidas(self.usuario.id), 0)
+
+    def test_limpiar_leidas(self):
+        self.crear(1, self.leido, n=3)
+        self.crear(1, self.no_leido)
+        client = APIClient()
+        client.force_authenticate(self.usuario)
+        response = client.delete(reverse('notification-limpiar-leidas'))
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual(Notificacion.objects.count(), 1)
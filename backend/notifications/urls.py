@@ -1,10 +1,11 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import NotificacionViewSet
+from .views import NotificacionViewSet, eventos
 
 router = DefaultRouter()
 router.register(r'notifications', NotificacionViewSet, basename='notification')
 
 urlpatterns = [
+    path('eventos/', eventos, name='eventos'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
@@ -1,10 +1,23 @@
+import json
+import time
+
+from asgiref.sync import sync_to_async
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.exceptions import AuthenticationFailed
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
 from django.utils import timezone
+from django.views.decorators.http import require_GET
+from restaurant_api.autenticacion import JWTAuthenticationCacheada
+from restaurant_api.eventos import GRUPO_TODOS, get_canal, grupo_usuario
+from . import contadores
+from .retencion import borrar_por_lotes
 from .models import Notificacion
 from .serializers import NotificacionSerializer, NotificacionCreateSerializer, NotificacionUpdateSerializer
-from orders.models import Estado
+from orders import estados
 
 class NotificacionViewSet(viewsets.ModelViewSet):
     serializer_class = NotificacionSerializer
@@ -12,7 +25,7 @@ class NotificacionViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         # Solo mostrar notificaciones del usuario autenticado
-        return Notificacion.objects.filter(usuario=self.request.user).order_by('-creado')
+        return Notificacion.objects.filter(usuario=self.request.user).select_related('usuario', 'estado').order_by('-creado')
 
     def get_serializer_class(self):
         if self.action == 'create':
@@ -22,27 +35,40 @@ class NotificacionViewSet(viewsets.ModelViewSet):
         return NotificacionSerializer
 
     def perform_create(self, serializer):
-        serializer.save(usuario=self.request.user)
+        notificacion = serializer.save(usuario=self.request.user)
+        contadores.ajustar(notificacion.usuario_id, contadores.es_no_leida(notificacion.estado_id))
+
+    def perform_update(self, serializer):
+        antes = contadores.es_no_leida(serializer.instance.estado_id)
+        notificacion = serializer.save()
+        contadores.ajustar(notificacion.usuario_id, contadores.es_no_leida(notificacion.estado_id) - antes)
+
+    def perform_destroy(self, instance):
+        no_leida = contadores.es_no_leida(instance.estado_id)
+        # Si otra petición la borró antes, no se descuenta otra vez
+        borradas, _ = Notificacion.objects.filter(pk=instance.pk).delete()
+        contadores.ajustar(instance.usuario_id, -min(no_leida, borradas))
+
+    @action(detail=False, methods=['get'])
+    def contador(self, request):
+        """Número de notificaciones no leídas, para el indicador de la cabecera"""
+        return Response({'no_leidas': contadores.no_leidas(request.user.id)})
 
     @action(detail=False, methods=['get'])
     def no_leidas(self, request):
         """Obtener solo las notificaciones no leídas"""
         try:
-            estado_no_leido = Estado.objects.filter(descripcion__icontains='no leido').first()
-            if not estado_no_leido:
-                # Si no existe, crear el estado
-                estado_no_leido = Estado.objects.create(descripcion='No Leído')
-            
+            estado_no_leido = estados.get_estado(estados.NO_LEIDO)
             notificaciones = Notificacion.objects.filter(
                 usuario=request.user,
                 estado=estado_no_leido
-            ).order_by('-creado')
+            ).select_related('usuario', 'estado').order_by('-creado')
             
-            serializer = self.get_serializer(notificaciones, many=True)
-            return Response({
-                'count': notificaciones.count(),
-                'results': serializer.data
-            })
+            page = self.paginate_queryset(notificaciones)
+            serializer = self.get_serializer(page, many=True)
+            response = self.get_paginated_response(serializer.data)
+            response.data['count'] = contadores.no_leidas(request.user.id)
+            return response
         except Exception as e:
             return Response({'error': str(e)}, status=500)
 
@@ -55,12 +81,15 @@ class NotificacionViewSet(viewsets.ModelViewSet):
                 return Response({'error': 'No tienes permiso para modificar esta notificación'}, 
                               status=status.HTTP_403_FORBIDDEN)
             
-            estado_leido = Estado.objects.filter(descripcion__icontains='leido').first()
-            if not estado_leido:
-                estado_leido = Estado.objects.create(descripcion='Leído')
-            
-            notificacion.estado = estado_leido
-            notificacion.save()
+            # UPDATE condicional: con dos peticiones simultáneas solo una
+            # pasa la fila de no leída a leída y descuenta el contador
+            leido = estados.get_estado(estados.LEIDO)
+            fila = Notificacion.objects.filter(pk=notificacion.pk)
+            cambiadas = fila.filter(estado=estados.get_estado(estados.NO_LEIDO)).update(estado=leido)
+            if not cambiadas:
+                fila.update(estado=leido)
+            notificacion.estado = leido
+            contadores.ajustar(notificacion.usuario_id, -cambiadas)
             
             serializer = self.get_serializer(notificacion)
             return Response(serializer.data)
@@ -71,12 +100,10 @@ class NotificacionViewSet(viewsets.ModelViewSet):
     def marcar_todas_leidas(self, request):
         """Marcar todas las notificaciones del usuario como leídas"""
         try:
-            estado_leido = Estado.objects.filter(descripcion__icontains='leido').first()
-            if not estado_leido:
-                estado_leido = Estado.objects.create(descripcion='Leído')
-            
-            notificaciones = Notificacion.objects.filter(usuario=request.user)
+            estado_leido = estados.get_estado(estados.LEIDO)
+            notificaciones = Notificacion.objects.filter(usuario=request.user).exclude(estado=estado_leido)
             count = notificaciones.update(estado=estado_leido)
+            contadores.reiniciar(request.user.id)
             
             return Response({
                 'message': f'Se marcaron {count} notificaciones como leídas',
@@ -89,17 +116,61 @@ class NotificacionViewSet(viewsets.ModelViewSet):
     def limpiar_leidas(self, request):
         """Eliminar todas las notificaciones leídas del usuario"""
         try:
-            estado_leido = Estado.objects.filter(descripcion__icontains='leido').first()
-            if estado_leido:
-                count, _ = Notificacion.objects.filter(
-                    usuario=request.user,
-                    estado=estado_leido
-                ).delete()
-                return Response({
-                    'message': f'Se eliminaron {count} notificaciones leídas',
-                    'count': count
-                })
-            else:
-                return Response({'message': 'No hay notificaciones leídas para eliminar'})
+            count = borrar_por_lotes(Notificacion.objects.filter(
+                usuario=request.user,
+                estado=estados.get_estado(estados.LEIDO)
+            ))
+            return Response({
+                'message': f'Se eliminaron {count} notificaciones leídas',
+                'count': count
+            })
         except Exception as e:
             return Response({'error': str(e)}, status=500)
+
+
+def _token_de(request):
+    """Token JWT de la cabecera Authorization o de ?token= (EventSource no envía cabeceras)"""
+    cabecera = request.headers.get('Authorization', '')
+    if cabecera.startswith('Bearer '):
+        return cabecera[len('Bearer '):]
+    return request.GET.get('token')
+
+
+async def _flujo_eventos(usuario_id, expira):
+    suscripcion = get_canal().suscribir([grupo_usuario(usuario_id), GRUPO_TODOS])
+    try:
+        yield f'retry: {settings.EVENTS_RETRY_MS}\n\n'
+        # Al caducar el token se cierra el flujo y el cliente reconecta con uno nuevo
+        while time.time() < expira:
+            evento = await suscripcion.recibir(min(settings.EVENTS_KEEPALIVE, max(expira - time.time(), 0)))
+            if evento is None:
+                yield ': ping\n\n'
+            else:
+                yield f"event: {evento['tipo']}\ndata: {json.dumps(evento, cls=DjangoJSONEncoder)}\n\n"
+    finally:
+        suscripcion.cerrar()
+
+
+@require_GET
+async def eventos(request):
+    """
+    Server-Sent Events con los cambios de estado de los pedidos y las
+    notificaciones nuevas del usuario. Requiere un servidor ASGI
+    (restaurant_api/asgi.py); reemplaza el sondeo de ``no_leidas``.
+    """
+    # Igual que en el resto de la API: el usuario debe existir y estar activo
+    autenticacion = JWTAuthenticationCacheada()
+    crudo = _token_de(request)
+    try:
+        if not crudo:
+            raise AuthenticationFailed()
+        token = autenticacion.get_validated_token(crudo)
+        usuario = await sync_to_async(autenticacion.get_user)(token)
+    except AuthenticationFailed:
+        return JsonResponse({'detail': 'Token inválido o ausente'}, status=status.HTTP_401_UNAUTHORIZED)
+
+    response = StreamingHttpResponse(_flujo_eventos(usuario.pk, token['exp']), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Evitar que nginx acumule el flujo en su búfer
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class OrdersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'orders'
+
+    def ready(self):
+        from django.db.models.signals import post_save, post_delete
+        from . import checks  # noqa: F401
+        from .estados import limpiar_registro
+        from .models import Estado
+        post_save.connect(limpiar_registro, sender=Estado, dispatch_uid='estados_registro_save')
+        post_delete.connect(limpiar_registro, sender=Estado, dispatch_uid='estados_registro_delete')
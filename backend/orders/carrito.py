@@ -0,0 +1,306 @@
+"""
+Almacenamiento del carrito.
+
+``CART_BACKEND = 'db'`` escribe cada cambio en ``Carrito``/``CarritoItem``.
+``CART_BACKEND = 'cache'`` mantiene los carritos activos en la caché
+``CART_CACHE_ALIAS`` y solo los persiste en la base de datos al hacer
+checkout, al agregar items cuando pasaron ``CART_FLUSH_INTERVAL`` segundos
+desde la última escritura en base, o con el comando ``persistir_carritos``.
+Nada más los persiste: un carrito que no vuelve a cambiar espera al comando,
+que debe programarse (cron) con ese backend.
+
+La caché guarda cambios que aún no están en la base, así que debe ser
+compartida por todos los procesos y no desalojar entradas (ver
+``orders/checks.py``); las entradas con cambios pendientes no expiran. Qué
+carritos tienen cambios pendientes se marca en la base (``Carrito.pendiente``),
+no en la caché.
+"""
+import time
+import uuid
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Prefetch
+
+from restaurant_api.campos import campos_solicitados, expandido, podar
+
+from products.models import Combo, Producto
+from products.precios import tasar
+from .models import Carrito, CarritoItem
+
+
+def obtener_carrito(user):
+    """Carrito más antiguo del usuario, creándolo si no tiene ninguno"""
+    return Carrito.objects.filter(usuario=user).order_by('id').first() or Carrito.objects.create(usuario=user)
+
+
+def carrito_con_items(user, expandir=(), ingredientes=False):
+    """
+    Como ``obtener_carrito`` pero con los items precargados.
+
+    ``expandir`` (``'producto'``, ``'combo'``) precarga también lo que usan sus
+    representaciones completas.
+    """
+    prefetch = [Prefetch('items', queryset=CarritoItem.objects.select_related('producto', 'combo'))]
+    if ingredientes:
+        prefetch.append('items__ingredientes')
+    if 'producto' in expandir:
+        prefetch += ['items__producto__ingredientes', 'items__producto__resumen_calificacion']
+    if 'combo' in expandir:
+        prefetch += ['items__combo__productos__ingredientes', 'items__combo__productos__resumen_calificacion']
+    carrito = Carrito.objects.filter(usuario=user).order_by('id').prefetch_related(*prefetch).first()
+    return carrito or Carrito.objects.create(usuario=user)
+
+
+def preparar_items(items, productos_qs=None, combos_qs=None):
+    """
+    Validar y tasar ``items`` (dicts de ``AgregarCarritoItemSerializer``).
+
+    Los precios salen de ``products.precios`` sin consultar la base. Devuelve
+    ``CarritoItem`` sin guardar junto con los productos y combos de
+    ``productos_qs``/``combos_qs`` (una consulta por cada uno, solo si se pasan).
+    """
+    precios = tasar(items)
+    productos = combos = {}
+    if productos_qs is not None:
+        productos = productos_qs.in_bulk({i['producto_id'] for i in items if i.get('producto_id')})
+    if combos_qs is not None:
+        combos = combos_qs.in_bulk({i['combo_id'] for i in items if i.get('combo_id')})
+
+    nuevos = [
+        CarritoItem(
+            producto_id=item.get('producto_id'),
+            combo_id=item.get('combo_id'),
+            cantidad=item['cantidad'],
+            precio_total=precio_total,
+        )
+        for item, (_, precio_total) in zip(items, precios)
+    ]
+    return nuevos, productos, combos
+
+
+def _insertar_items(carrito, nuevos, ingredientes_por_item):
+    for nuevo in nuevos:
+        nuevo.carrito = carrito
+    CarritoItem.objects.bulk_create(nuevos)
+    CarritoItem.ingredientes.through.objects.bulk_create([
+        CarritoItem.ingredientes.through(carritoitem_id=nuevo.pk, ingrediente_id=ing)
+        for nuevo, ingredientes in zip(nuevos, ingredientes_por_item)
+        for ing in ingredientes
+    ])
+
+
+class CarritoDB:
+    """Cada cambio se escribe directamente en la base de datos"""
+
+    def agregar(self, user, items):
+        nuevos, _, _ = preparar_items(items)
+        with transaction.atomic():
+            _insertar_items(obtener_carrito(user), nuevos, [item['ingredientes'] for item in items])
+        return [nuevo.pk for nuevo in nuevos]
+
+    def representar(self, user, request=None):
+        from .serializers import CarritoSerializer
+        expandir = [campo for campo in ('producto', 'combo') if expandido(request, f'items.{campo}')]
+        return CarritoSerializer(carrito_con_items(user, expandir), context={'request': request}).data
+
+    @contextmanager
+    def checkout(self, user):
+        yield
+
+    def persistir(self, user_id):
+        pass
+
+
+class CarritoCache:
+    """
+    Carritos activos en la caché, persistidos en la base de datos de forma diferida.
+
+    Cada entrada guarda los items ya tasados y la representación serializada
+    de su producto o combo, así que ver el carrito no consulta la base.
+    """
+    @property
+    def cache(self):
+        return caches[settings.CART_CACHE_ALIAS]
+
+    def _key(self, user_id):
+        return f'carrito:{user_id}'
+
+    @contextmanager
+    def _bloqueo(self, user_id, espera=5.0):
+        """Exclusión mutua entre peticiones sobre el mismo carrito"""
+        key = f'carrito:{user_id}:lock'
+        limite = time.monotonic() + espera
+        while not self.cache.add(key, 1, timeout=30):
+            if time.monotonic() > limite:
+                raise TimeoutError(f'Carrito {user_id} bloqueado')
+            time.sleep(0.01)
+        try:
+            yield
+        finally:
+            self.cache.delete(key)
+
+    def _entrada_desde_db(self, user):
+        from .serializers import CarritoSerializer
+        carrito = carrito_con_items(user, expandir=('producto', 'combo'), ingredientes=True)
+        # Se guarda la representación completa; representar() la recorta
+        data = CarritoSerializer(carrito, context={'expand': {'items.producto', 'items.combo'}}).data
+        representaciones = {item['id']: item for item in data['items']}
+        return {
+            'id': carrito.id,
+            'usuario': user.id,
+            'creado': data['creado'],
+            'items': [
+                {
+                    **representaciones[item.id],
+                    'producto_id': item.producto_id,
+                    'combo_id': item.combo_id,
+                    'ingredientes': [ing.id for ing in item.ingredientes.all()],
+                }
+                for item in carrito.items.all()
+            ],
+            'sucio': False,
+            'persistido': time.time(),
+            'actualizado': time.time(),
+        }
+
+    def _leer(self, user):
+        entrada = self.cache.get(self._key(user.id))
+        if entrada is None:
+            entrada = self._entrada_desde_db(user)
+            self._guardar(user.id, entrada)
+        return entrada
+
+    def _guardar(self, user_id, entrada):
+        # Lo que aún no está en la base no puede expirar
+        timeout = None if entrada['sucio'] else settings.CART_CACHE_TIMEOUT
+        self.cache.set(self._key(user_id), entrada, timeout=timeout)
+
+    def agregar(self, user, items):
+        from products.serializers import ComboSerializer, ProductoSerializer
+        nuevos, productos, combos = preparar_items(
+            items,
+            productos_qs=Producto.objects.select_related('resumen_calificacion').prefetch_related('ingredientes'),
+            combos_qs=Combo.objects.prefetch_related('productos__ingredientes'),
+        )
+        with self._bloqueo(user.id):
+            entrada = self._leer(user)
+            estaba_sucio = entrada['sucio']
+            for nuevo, item in zip(nuevos, items):
+                producto = productos.get(nuevo.producto_id)
+                combo = combos.get(nuevo.combo_id)
+                entrada['items'].append({
+                    # Id provisional hasta que el item se persista
+                    'id': f'tmp-{uuid.uuid4().hex[:12]}',
+                    'producto': ProductoSerializer(producto).data if producto else None,
+                    'combo': ComboSerializer(combo).data if combo else None,
+                    'cantidad': nuevo.cantidad,
+                    'precio_total': str(nuevo.precio_total.quantize(Decimal('0.01'))),
+                    'producto_id': nuevo.producto_id,
+                    'combo_id': nuevo.combo_id,
+                    'ingredientes': item['ingredientes'],
+                })
+            entrada['sucio'] = True
+            entrada['actualizado'] = time.time()
+            if time.time() - entrada['persistido'] >= settings.CART_FLUSH_INTERVAL:
+                self._persistir_entrada(entrada)
+            elif not estaba_sucio:
+                # Una escritura por intervalo, al pasar de persistido a sucio
+                Carrito.objects.filter(pk=entrada['id']).update(pendiente=True)
+            self._guardar(user.id, entrada)
+        return [item['id'] for item in entrada['items'][-len(nuevos):]]
+
+    def representar(self, user, request=None):
+        from products.serializers import ComboResumenSerializer, ProductoResumenSerializer
+
+        def anidado(data, campo, resumen):
+            if data is None or expandido(request, f'items.{campo}'):
+                return data
+            return {nombre: data[nombre] for nombre in resumen.Meta.fields}
+
+        entrada = self._leer(user)
+        items = [
+            {
+                'id': item['id'],
+                'producto': anidado(item['producto'], 'producto', ProductoResumenSerializer),
+                'combo': anidado(item['combo'], 'combo', ComboResumenSerializer),
+                'cantidad': item['cantidad'],
+                'precio_total': item['precio_total'],
+            }
+            for item in entrada['items']
+        ]
+        return podar({
+            'id': entrada['id'],
+            'usuario': entrada['usuario'],
+            'creado': entrada['creado'],
+            'items': items,
+            'total_carrito': sum((Decimal(item['precio_total']) for item in items), Decimal('0')),
+        }, campos_solicitados(request))
+
+    def _persistir_entrada(self, entrada):
+        """Reemplazar los items del carrito en la base por los de la caché"""
+        with transaction.atomic():
+            CarritoItem.objects.filter(carrito_id=entrada['id']).delete()
+            nuevos = [
+                CarritoItem(
+                    producto_id=item['producto_id'],
+                    combo_id=item['combo_id'],
+                    cantidad=item['cantidad'],
+                    precio_total=Decimal(item['precio_total']),
+                )
+                for item in entrada['items']
+            ]
+            _insertar_items(Carrito(pk=entrada['id']), nuevos, [item['ingredientes'] for item in entrada['items']])
+            Carrito.objects.filter(pk=entrada['id'], pendiente=True).update(pendiente=False)
+        for item, nuevo in zip(entrada['items'], nuevos):
+            item['id'] = nuevo.pk
+        entrada['sucio'] = False
+        entrada['persistido'] = time.time()
+
+    def persistir(self, user_id):
+        """Escribir en la base un carrito con cambios pendientes"""
+        with self._bloqueo(user_id):
+            entrada = self.cache.get(self._key(user_id))
+            if entrada and entrada['sucio']:
+                self._persistir_entrada(entrada)
+                self._guardar(user_id, entrada)
+            else:
+                # Nada que escribir (p. ej. la caché en memoria se vació al reiniciar)
+                Carrito.objects.filter(usuario_id=user_id, pendiente=True).update(pendiente=False)
+
+    def persistir_pendientes(self, inactivos_desde=0):
+        """Persistir los carritos sin cambios en los últimos ``inactivos_desde`` segundos"""
+        persistidos = 0
+        for user_id in Carrito.objects.filter(pendiente=True).values_list('usuario_id', flat=True).distinct():
+            entrada = self.cache.get(self._key(user_id))
+            if entrada and entrada['sucio'] and time.time() - entrada['actualizado'] < inactivos_desde:
+                continue
+            self.persistir(user_id)
+            persistidos += 1
+        return persistidos
+
+    @contextmanager
+    def checkout(self, user):
+        """Persistir antes del checkout y descartar la entrada después"""
+        with self._bloqueo(user.id):
+            entrada = self.cache.get(self._key(user.id))
+            if entrada and entrada['sucio']:
+                self._persistir_entrada(entrada)
+            yield
+            # La próxima lectura recarga desde la base lo que quede en el carrito
+            self.cache.delete(self._key(user.id))
+
+
+BACKENDS = {'db': CarritoDB, 'cache': CarritoCache}
+
+
+def get_backend():
+    return BACKENDS[settings.CART_BACKEND]()
+
+
+def agregar_items(user, items):
+    """Agregar varias líneas al carrito del usuario y devolver sus ids"""
+    return get_backend().agregar(user, items)
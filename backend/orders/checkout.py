@@ -0,0 +1,85 @@
+from collections import defaultdict
+
+from django.db import transaction
+
+from products import precios
+from restaurant_api.eventos import emitir, grupo_usuario
+from . import estados
+from .carrito import get_backend
+from .models import Carrito, CarritoItem, Pedido, PedidoItem
+
+
+class CarritoVacio(Exception):
+    pass
+
+
+def realizar_checkout(user, **datos_pedido):
+    """
+    Convertir el carrito del usuario en un pedido de forma atómica.
+
+    El carrito se bloquea durante la transacción, así dos checkouts simultáneos
+    del mismo usuario no pueden enviar los mismos items dos veces. Las consultas
+    no dependen del número de items del carrito. Los precios se leen de la base
+    (``TablaPrecios.desde_base``), no de la tabla en caché, así el pedido usa
+    los del catálogo actual aunque otro proceso lo haya cambiado. Con ``CART_BACKEND = 'cache'``
+    el carrito se persiste antes de leerlo. La notificación solo se encola
+    (ver ``notifications.bandeja``).
+    """
+    estado_enviado = estados.get_estado(estados.ENVIADO)
+
+    with get_backend().checkout(user):
+        with transaction.atomic():
+            carrito = (
+                Carrito.objects.select_for_update()
+                .filter(usuario=user)
+                .order_by('id')
+                .first()
+            )
+            items = list(carrito.items.all()) if carrito else []
+            if not items:
+                raise CarritoVacio()
+
+            extras = defaultdict(list)
+            for item_id, ingrediente_id in CarritoItem.ingredientes.through.objects.filter(
+                carritoitem_id__in=[item.pk for item in items]
+            ).values_list('carritoitem_id', 'ingrediente_id'):
+                extras[item_id].append(ingrediente_id)
+            lineas = [
+                {
+                    'producto_id': item.producto_id,
+                    'combo_id': item.combo_id,
+                    'ingredientes': extras[item.pk],
+                    'cantidad': item.cantidad,
+                }
+                for item in items
+            ]
+            lineas = precios.TablaPrecios.desde_base(lineas).tasar(lineas)
+
+            pedido = Pedido.objects.create(
+                usuario=user,
+                estado=estado_enviado,
+                total=sum((total for _, total in lineas), precios.CERO),
+                **datos_pedido
+            )
+            PedidoItem.objects.bulk_create([
+                PedidoItem(
+                    pedido=pedido,
+                    producto_id=item.producto_id,
+                    combo_id=item.combo_id,
+                    cantidad=item.cantidad,
+                    precio_unitario=unitario,
+                )
+                for item, (unitario, _) in zip(items, lineas)
+            ])
+            # Solo se borran los items copiados: lo que se agregue al carrito
+            # mientras tanto se conserva para el siguiente pedido
+            CarritoItem.objects.filter(pk__in=[item.pk for item in items]).delete()
+            emitir(grupo_usuario(user.id), 'pedido', id=pedido.id, estado=estado_enviado.descripcion)
+
+            try:
+                from notifications.bandeja import encolar
+                encolar(user, f"Tu pedido #{pedido.id} ha sido creado y está siendo procesado.")
+            except ImportError:
+                pass  # Si no existe la app de notificaciones
+
+    return pedido
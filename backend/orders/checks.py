@@ -0,0 +1,45 @@
+"""
+Comprobaciones de configuración (``manage.py check``).
+
+Con ``CART_BACKEND = 'cache'`` la caché ``CART_CACHE_ALIAS`` guarda cambios
+del carrito que todavía no están en la base: si desaloja una entrada, esos
+items se pierden. Los backends de Django que recortan entradas al llegar a
+``MAX_ENTRIES`` necesitan un límite que nunca se alcance, y uno en memoria
+solo es válido con un único proceso. En Redis o Memcached la política de
+memoria del servidor debe impedir el desalojo (``maxmemory-policy noeviction``).
+"""
+import sys
+
+from django.conf import settings
+from django.core.checks import Error, Tags, Warning, register
+
+# Backends que borran entradas al superar MAX_ENTRIES (300 por defecto)
+BACKENDS_CON_RECORTE = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.filebased.FileBasedCache',
+    'django.core.cache.backends.db.DatabaseCache',
+)
+
+
+@register(Tags.caches)
+def comprobar_cache_carritos(app_configs, **kwargs):
+    if settings.CART_BACKEND != 'cache':
+        return []
+    config = settings.CACHES.get(settings.CART_CACHE_ALIAS, {})
+    backend = config.get('BACKEND')
+    errores = []
+    if backend in BACKENDS_CON_RECORTE and config.get('OPTIONS', {}).get('MAX_ENTRIES', 300) < sys.maxsize:
+        errores.append(Error(
+            f"La caché '{settings.CART_CACHE_ALIAS}' desaloja entradas al llegar a MAX_ENTRIES "
+            "y perdería carritos sin persistir.",
+            hint="Use OPTIONS={'MAX_ENTRIES': sys.maxsize} o un backend compartido sin desalojo.",
+            id='orders.E001',
+        ))
+    if backend == 'django.core.cache.backends.locmem.LocMemCache':
+        errores.append(Warning(
+            f"La caché '{settings.CART_CACHE_ALIAS}' vive en la memoria de cada proceso: "
+            "con varios workers cada uno ve un carrito distinto.",
+            hint='Use CART_CACHE_BACKEND=file o una caché compartida si hay más de un proceso.',
+            id='orders.W001',
+        ))
+    return errores
@@ -0,0 +1,37 @@
+from django.db import transaction
+
+from .models import Estado
+
+ENVIADO = 'Enviado'
+NO_LEIDO = 'No Leído'
+LEIDO = 'Leído'
+INFORMACION = 'Información'
+
+# {descripcion: id}
+_registro = {}
+
+
+def get_estado(descripcion):
+    """
+    Devolver el ``Estado`` con esa descripción, creándolo si no existe.
+
+    Se resuelve una sola vez por proceso y se guarda solo el id: cada llamada
+    devuelve una instancia nueva, así nadie comparte una instancia modificada.
+    Solo se registra cuando la fila está confirmada, para no retener ids de
+    una transacción revertida.
+
+    Las señales de ``OrdersConfig`` vacían el registro del proceso que cambia
+    un ``Estado``; los demás procesos (otros workers, el de
+    ``procesar_notificaciones``) conservan el id anterior hasta reiniciarse.
+    Los estados conocidos no deben borrarse ni recrearse con la aplicación en marcha.
+    """
+    estado_id = _registro.get(descripcion)
+    if estado_id is not None:
+        return Estado(id=estado_id, descripcion=descripcion)
+    estado, _ = Estado.objects.get_or_create(descripcion=descripcion)
+    transaction.on_commit(lambda: _registro.setdefault(descripcion, estado.id))
+    return estado
+
+
+def limpiar_registro(**kwargs):
+    _registro.clear()
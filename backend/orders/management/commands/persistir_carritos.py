@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from orders.carrito import CarritoCache
+
+
+class Command(BaseCommand):
+    help = 'Escribe en la base de datos los carritos en caché con cambios pendientes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--inactivos', type=int, default=0,
+            help='Solo los carritos sin cambios en los últimos N segundos',
+        )
+
+    def handle(self, *args, **options):
+        total = CarritoCache().persistir_pendientes(inactivos_desde=options['inactivos'])
+        self.stdout.write(self.style.SUCCESS(f'Se persistieron {total} carritos'))
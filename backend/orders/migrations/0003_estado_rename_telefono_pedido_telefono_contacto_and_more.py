@@ -0,0 +1,51 @@
+# Generated by Django 5.2.6 on 2026-10-18 13:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0002_initial'),
+        ('products', '0002_rename_precio_combo_precio_total_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Estado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('descripcion', models.CharField(max_length=50, unique=True)),
+            ],
+        ),
+        migrations.RenameField(
+            model_name='pedido',
+            old_name='telefono',
+            new_name='telefono_contacto',
+        ),
+        migrations.RemoveField(
+            model_name='pedido',
+            name='items',
+        ),
+        migrations.RemoveField(
+            model_name='pedido',
+            name='estado',
+        ),
+        migrations.AddField(
+            model_name='pedido',
+            name='estado',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='orders.estado'),
+        ),
+        migrations.CreateModel(
+            name='PedidoItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cantidad', models.PositiveIntegerField()),
+                ('precio_unitario', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('combo', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='products.combo')),
+                ('pedido', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='orders.pedido')),
+                ('producto', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='products.producto')),
+            ],
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:03
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0003_estado_rename_telefono_pedido_telefono_contacto_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(fields=['usuario', 'creado'], name='pedido_usuario_creado_idx'),
+        ),
+    ]
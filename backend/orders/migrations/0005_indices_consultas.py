@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:05
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0004_pedido_usuario_creado_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='carrito',
+            index=models.Index(fields=['usuario', 'id'], name='carrito_usuario_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:59
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0005_indices_consultas'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='carrito',
+            name='pendiente',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name='carrito',
+            index=models.Index(condition=models.Q(('pendiente', True)), fields=['id'], name='carrito_pendiente_idx'),
+        ),
+    ]
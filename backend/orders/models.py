@@ -11,6 +11,14 @@ class Estado(models.Model):
 class Carrito(models.Model):
     usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     creado = models.DateTimeField(auto_now_add=True)
+    # Con CART_BACKEND='cache': tiene cambios en la caché que aún no están en la base
+    pendiente = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['usuario', 'id'], name='carrito_usuario_idx'),
+            models.Index(fields=['id'], condition=models.Q(pendiente=True), name='carrito_pendiente_idx'),
+        ]
 
 class CarritoItem(models.Model):
     carrito = models.ForeignKey(Carrito, related_name='items', on_delete=models.CASCADE)
@@ -29,6 +37,11 @@ class Pedido(models.Model):
     metodo_pago = models.CharField(max_length=50, default='SIMULADO')
     creado = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['usuario', 'creado'], name='pedido_usuario_creado_idx'),
+        ]
+
     def __str__(self):
         return f"Pedido {self.id} de {self.usuario.email}"
 
@@ -1,21 +1,26 @@
 from rest_framework import serializers
+from restaurant_api.campos import CamposDinamicosMixin
+from restaurant_api.instrumentation import MetricasSerializerMixin
 from .models import Pedido, PedidoItem, CarritoItem, Carrito, Estado
-from products.serializers import ProductoSerializer, ComboSerializer
+from products.serializers import (
+    ProductoSerializer, ComboSerializer, ProductoResumenSerializer, ComboResumenSerializer
+)
 
-class EstadoSerializer(serializers.ModelSerializer):
+class EstadoSerializer(MetricasSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Estado
         fields = ['id', 'descripcion']
 
-class PedidoItemSerializer(serializers.ModelSerializer):
-    producto = ProductoSerializer(read_only=True)
-    combo = ComboSerializer(read_only=True)
+class PedidoItemSerializer(CamposDinamicosMixin, MetricasSerializerMixin, serializers.ModelSerializer):
+    producto = ProductoResumenSerializer(read_only=True)
+    combo = ComboResumenSerializer(read_only=True)
     
     class Meta:
         model = PedidoItem
         fields = ['id', 'producto', 'combo', 'cantidad', 'precio_unitario']
+        expandibles = {'producto': ProductoSerializer, 'combo': ComboSerializer}
 
-class PedidoSerializer(serializers.ModelSerializer):
+class PedidoSerializer(CamposDinamicosMixin, MetricasSerializerMixin, serializers.ModelSerializer):
     usuario_email = serializers.CharField(source='usuario.email', read_only=True)
     estado_descripcion = serializers.CharField(source='estado.descripcion', read_only=True)
     items = PedidoItemSerializer(many=True, read_only=True)
@@ -34,15 +39,16 @@ class PedidoCreateSerializer(serializers.ModelSerializer):
         model = Pedido
         fields = ['direccion', 'telefono_contacto', 'metodo_pago']
 
-class CarritoItemSerializer(serializers.ModelSerializer):
-    producto = ProductoSerializer(read_only=True)
-    combo = ComboSerializer(read_only=True)
+class CarritoItemSerializer(CamposDinamicosMixin, MetricasSerializerMixin, serializers.ModelSerializer):
+    producto = ProductoResumenSerializer(read_only=True)
+    combo = ComboResumenSerializer(read_only=True)
     
     class Meta:
         model = CarritoItem
         fields = ['id', 'producto', 'combo', 'cantidad', 'precio_total']
+        expandibles = {'producto': ProductoSerializer, 'combo': ComboSerializer}
 
-class CarritoSerializer(serializers.ModelSerializer):
+class CarritoSerializer(CamposDinamicosMixin, MetricasSerializerMixin, serializers.ModelSerializer):
     items = CarritoItemSerializer(many=True, read_only=True)
     total_carrito = serializers.SerializerMethodField()
     
@@ -51,4 +57,20 @@ class CarritoSerializer(serializers.ModelSerializer):
         fields = ['id', 'usuario', 'creado', 'items', 'total_carrito']
     
     def get_total_carrito(self, obj):
-        return sum(item.precio_total for item in obj.items.all())
\ No newline at end of file
+        return sum(item.precio_total for item in obj.items.all())
+
+class AgregarCarritoItemSerializer(serializers.Serializer):
+    producto_id = serializers.IntegerField(required=False, allow_null=True)
+    combo_id = serializers.IntegerField(required=False, allow_null=True)
+    ingredientes = serializers.ListField(child=serializers.IntegerField(), required=False, default=list)
+    cantidad = serializers.IntegerField(min_value=1, default=1)
+
+    def validate(self, attrs):
+        if bool(attrs.get('producto_id')) == bool(attrs.get('combo_id')):
+            raise serializers.ValidationError("Cada item debe indicar un producto_id o un combo_id.")
+        # Un ingrediente repetido no se cobra dos veces
+        attrs['ingredientes'] = list(dict.fromkeys(attrs['ingredientes']))
+        return attrs
+
+class AgregarCarritoSerializer(serializers.Serializer):
+    items = AgregarCarritoItemSerializer(many=True, allow_empty=False)
@@ -1,3 +1,494 @@
-from django.test import TestCase
+import threading
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection, connections
+from django.test import TransactionTestCase, override_settings, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from restaurant_api.campos import campos_desconocidos, expansiones_validas
+from restaurant_api.pagination import CreadoCursorPagination
+from products import precios
+from products.models import Combo, Ingrediente, Producto
+from . import estados
+from .carrito import CarritoCache, obtener_carrito
+from .checkout import CarritoVacio, realizar_checkout
+from .checks import comprobar_cache_carritos
+from .models import Carrito, CarritoItem, Estado, Pedido, PedidoItem
+from .serializers import PedidoSerializer
+
+User = get_user_model()
+
+
+def crear_usuario(email='cliente@example.com', **kwargs):
+    return User.objects.create_user(username=email.split('@')[0], email=email, password='clave-segura-123', **kwargs)
+
+
+class PedidoPaginacionTests(APITestCase):
+    """Listado de pedidos paginado por cursor"""
+
+    def setUp(self):
+        self.user = crear_usuario()
+        self.client.force_authenticate(self.user)
+        for i in range(25):
+            Pedido.objects.create(usuario=self.user, total=Decimal('10.00'), direccion='Calle 1', telefono_contacto='555')
+
+    def test_recorrer_paginas_sin_repetir(self):
+        url = reverse('pedido-list')
+        vistos = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            vistos.extend(p['id'] for p in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(len(vistos), 25)
+        self.assertEqual(vistos, sorted(vistos, reverse=True))
+
+    def test_page_size_limitado(self):
+        with mock.patch.object(CreadoCursorPagination, 'max_page_size', 10):
+            response = self.client.get(reverse('pedido-list'), {'page_size': 1000})
+        self.assertEqual(len(response.data['results']), 10)
+        response = self.client.get(reverse('pedido-list'), {'page_size': 5})
+        self.assertEqual(len(response.data['results']), 5)
+
+
+class CheckoutTests(APITestCase):
+    """Checkout atómico desde el carrito"""
+
+    def setUp(self):
+        self.user = crear_usuario()
+        self.client.force_authenticate(self.user)
+        self.carrito = Carrito.objects.create(usuario=self.user)
+        self.producto = Producto.objects.create(nombre='Hamburguesa', precio=Decimal('8.00'))
+        self.datos = {'direccion': 'Calle 1', 'telefono_contacto': '555'}
+        Estado.objects.create(descripcion='Enviado')
+        Estado.objects.create(descripcion='No Leído')
+
+    def llenar_carrito(self, n):
+        CarritoItem.objects.bulk_create([
+            CarritoItem(carrito=self.carrito, producto=self.producto, cantidad=2, precio_total=Decimal('16.00'))
+            for _ in range(n)
+        ])
+
+    def checkout_consultas(self):
+        with CaptureQueriesContext(connection) as ctx:
+            realizar_checkout(self.user, **self.datos)
+        return len(ctx.captured_queries)
+
+    def test_checkout_crea_pedido_y_vacia_carrito(self):
+        self.llenar_carrito(3)
+        response = self.client.post(reverse('pedido-list'), self.datos)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Decimal(response.data['total']), Decimal('48.00'))
+        self.assertEqual(len(response.data['items']), 3)
+        self.assertEqual(response.data['items'][0]['precio_unitario'], '8.00')
+        self.assertFalse(CarritoItem.objects.filter(carrito=self.carrito).exists())
+
+    def test_consultas_no_dependen_del_tamano_del_carrito(self):
+        self.llenar_carrito(1)
+        precios.get_tabla()  # La tabla de precios se construye una vez por versión del catálogo
+        pocos = self.checkout_consultas()
+        self.llenar_carrito(30)
+        muchos = self.checkout_consultas()
+        self.assertEqual(pocos, muchos)
+        self.assertEqual(PedidoItem.objects.count(), 31)
+
+    def test_checkout_usa_los_precios_actuales(self):
+        extra = Ingrediente.objects.create(nombre='Queso', costos_extras=Decimal('1.00'))
+        self.llenar_carrito(1)
+        CarritoItem.objects.get().ingredientes.add(extra)
+        self.producto.precio = Decimal('9.00')
+        self.producto.save()
+        pedido = realizar_checkout(self.user, **self.datos)
+        self.assertEqual(pedido.total, Decimal('20.00'))
+        self.assertEqual(pedido.items.get().precio_unitario, Decimal('10.00'))
+
+    def test_checkout_no_usa_una_tabla_de_precios_desactualizada(self):
+        self.llenar_carrito(1)
+        precios.get_tabla()
+        # Como un cambio hecho en otro proceso: la versión de esta caché no cambia
+        Producto.objects.filter(pk=self.producto.pk).update(precio=Decimal('9.50'))
+        pedido = realizar_checkout(self.user, **self.datos)
+        self.assertEqual(pedido.total, Decimal('19.00'))
+
+    def test_segundo_checkout_no_duplica_pedido(self):
+        self.llenar_carrito(2)
+        self.assertEqual(self.client.post(reverse('pedido-list'), self.datos).status_code, 201)
+        response = self.client.post(reverse('pedido-list'), self.datos)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Pedido.objects.count(), 1)
+
+    def test_endpoint_anterior_usa_el_mismo_checkout(self):
+        self.llenar_carrito(2)
+        response = self.client.post(reverse('create_order'), {'direccion': 'Calle 1', 'telefono': '555'})
+        self.assertEqual(response.status_code, 200)
+        pedido = Pedido.objects.get(pk=response.data['pedido_id'])
+        self.assertEqual(pedido.items.count(), 2)
+
+
+class CheckoutConcurrenteTests(TransactionTestCase):
+    """
+    Dos checkouts simultáneos del mismo carrito.
+
+    En PostgreSQL los serializa SELECT ... FOR UPDATE y en SQLite las
+    transacciones IMMEDIATE, sobre la base de pruebas en archivo.
+    """
+
+    def setUp(self):
+        estados.limpiar_registro()
+        self.user = crear_usuario()
+        carrito = Carrito.objects.create(usuario=self.user)
+        producto = Producto.objects.create(nombre='Hamburguesa', precio=Decimal('8.00'))
+        CarritoItem.objects.bulk_create([
+            CarritoItem(carrito=carrito, producto=producto, cantidad=1, precio_total=Decimal('8.00'))
+            for _ in range(3)
+        ])
+        Estado.objects.create(descripcion=estados.ENVIADO)
+        Estado.objects.create(descripcion=estados.NO_LEIDO)
+
+    def test_solo_un_pedido(self):
+        barrera = threading.Barrier(2)
+        resultados = []
+
+        def checkout():
+            try:
+                barrera.wait()
+                resultados.append(realizar_checkout(self.user, direccion='Calle 1', telefono_contacto='555'))
+            except CarritoVacio:
+                resultados.append(None)
+            except Exception as exc:
+                resultados.append(exc)
+            finally:
+                connections.close_all()
+
+        hilos = [threading.Thread(target=checkout) for _ in range(2)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        self.assertEqual(len(resultados), 2)
+        pedidos = [r for r in resultados if isinstance(r, Pedido)]
+        self.assertEqual(len(pedidos), 1, resultados)
+        self.assertIn(None, resultados)
+        self.assertEqual(Pedido.objects.count(), 1)
+        self.assertEqual(PedidoItem.objects.count(), 3)
+        self.assertFalse(CarritoItem.objects.exists())
+
+
+class ActualizarEstadoTests(APITestCase):
+    """Cambio de estado de un pedido y su notificación"""
+
+    def setUp(self):
+        self.staff = crear_usuario('staff@example.com', is_staff=True)
+        self.client.force_authenticate(self.staff)
+        self.enviado = Estado.objects.create(descripcion='Enviado')
+        self.entregado = Estado.objects.create(descripcion='Entregado')
+        self.pedido = Pedido.objects.create(
+            usuario=self.staff, estado=self.enviado, total=Decimal('10.00'), direccion='Calle 1', telefono_contacto='555'
+        )
+
+    def test_fallo_al_encolar_revierte_el_cambio(self):
+        url = reverse('pedido-actualizar-estado', args=[self.pedido.pk])
+        with mock.patch('notifications.bandeja.encolar', side_effect=RuntimeError('caído')):
+            with self.assertRaises(RuntimeError):
+                self.client.patch(url, {'estado_id': self.entregado.pk}, format='json')
+        self.pedido.refresh_from_db()
+        self.assertEqual(self.pedido.estado, self.enviado)
+
+
+class EstadoRegistroTests(APITestCase):
+    """Registro en proceso de los estados conocidos"""
+
+    def setUp(self):
+        estados.limpiar_registro()
+
+    def test_resuelve_una_sola_vez(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            estado = estados.get_estado(estados.LEIDO)
+        with self.assertNumQueries(0):
+            registrado = estados.get_estado(estados.LEIDO)
+        self.assertEqual((registrado.pk, registrado.descripcion), (estado.pk, estados.LEIDO))
+        self.assertIsNot(estados.get_estado(estados.LEIDO), registrado)
+
+    def test_cambio_en_estado_invalida_registro(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            estado = estados.get_estado(estados.ENVIADO)
+        estado.delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            nuevo = estados.get_estado(estados.ENVIADO)
+        self.assertTrue(Estado.objects.filter(pk=nuevo.pk).exists())
+
+    def test_no_registra_estados_sin_confirmar(self):
+        estados.get_estado(estados.INFORMACION)
+        with self.assertNumQueries(1):
+            estados.get_estado(estados.INFORMACION)
+
+
+class PedidoEstadisticasTests(APITestCase):
+    """Estadísticas de pedidos calculadas en la base de datos"""
+
+    def setUp(self):
+        self.user = crear_usuario()
+        self.client.force_authenticate(self.user)
+        enviado = Estado.objects.create(descripcion='Enviado')
+        entregado = Estado.objects.create(descripcion='Entregado')
+        for i, estado in enumerate([enviado, enviado, entregado, None]):
+            Pedido.objects.create(usuario=self.user, estado=estado, total=Decimal(10 * (i + 1)),
+                                  direccion='Calle 1', telefono_contacto='555')
+        # Pedido antiguo y pedido de otro usuario
+        antiguo = Pedido.objects.create(usuario=self.user, estado=enviado, total=Decimal('100.00'),
+                                        direccion='Calle 1', telefono_contacto='555')
+        Pedido.objects.filter(pk=antiguo.pk).update(creado=datetime(2020, 1, 15, tzinfo=dt_timezone.utc))
+        Pedido.objects.create(usuario=crear_usuario('otro@example.com'), total=Decimal('999.00'),
+                              direccion='Calle 2', telefono_contacto='555')
+
+    def test_totales_y_agrupacion_por_estado(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('pedido-estadisticas'))
+        self.assertEqual(response.data['total_pedidos'], 5)
+        self.assertEqual(response.data['total_gastado'], 200.0)
+        self.assertEqual(response.data['promedio_por_pedido'], 40.0)
+        self.assertEqual(response.data['pedidos_por_estado'], {'Enviado': 3, 'Entregado': 1, 'Sin estado': 1})
+
+    def test_filtro_por_rango_de_fechas(self):
+        response = self.client.get(reverse('pedido-estadisticas'), {'desde': '2020-01-01', 'hasta': '2020-01-15'})
+        self.assertEqual(response.data['total_pedidos'], 1)
+        self.assertEqual(response.data['total_gastado'], 100.0)
+        response = self.client.get(reverse('pedido-estadisticas'), {'desde': '2021-01-01'})
+        self.assertEqual(response.data['total_pedidos'], 4)
+
+    def test_fecha_invalida(self):
+        response = self.client.get(reverse('pedido-estadisticas'), {'desde': 'ayer'})
+        self.assertEqual(response.status_code, 400)
+
+
+class AgregarCarritoTests(APITestCase):
+    """Alta de items en el carrito en bloque"""
+
+    def setUp(self):
+        self.user = crear_usuario()
+        self.client.force_authenticate(self.user)
+        self.producto = Producto.objects.create(nombre='Hamburguesa', precio=Decimal('8.00'))
+        self.combo = Combo.objects.create(nombre='Combo', precio_total=Decimal('20.00'))
+        self.extras = [
+            Ingrediente.objects.create(nombre=f'Extra {i}', costos_extras=Decimal('0.50'))
+            for i in range(10)
+        ]
+
+    def agregar(self, items):
+        return self.client.post(reverse('add_to_cart'), {'items': items}, format='json')
+
+    def test_precio_con_extras(self):
+        response = self.client.post(reverse('add_to_cart'), {
+            'producto_id': self.producto.id,
+            'ingredientes': [self.extras[0].id, self.extras[1].id, self.extras[1].id],
+            'cantidad': 2,
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        item = CarritoItem.objects.get(pk=response.data['item_id'])
+        self.assertEqual(item.precio_total, Decimal('18.00'))
+        self.assertEqual(item.ingredientes.count(), 2)
+
+    def test_varios_items_en_consultas_constantes(self):
+        obtener_carrito(self.user)
+        precios.get_tabla()
+        ids = [e.id for e in self.extras]
+        with CaptureQueriesContext(connection) as pocos:
+            self.agregar([{'producto_id': self.producto.id, 'ingredientes': ids[:1]}, {'combo_id': self.combo.id}])
+        with CaptureQueriesContext(connection) as muchos:
+            response = self.agregar(
+                [{'producto_id': self.producto.id, 'ingredientes': ids, 'cantidad': 3} for _ in range(5)]
+                + [{'combo_id': self.combo.id}]
+            )
+        self.assertEqual(len(pocos.captured_queries), len(muchos.captured_queries))
+        self.assertEqual(len(response.data['item_ids']), 6)
+        combo_item = CarritoItem.objects.get(pk=response.data['item_ids'][-1])
+        self.assertEqual(combo_item.precio_total, Decimal('20.00'))
+        self.assertEqual(CarritoItem.objects.filter(precio_total=Decimal('39.00')).count(), 5)
+
+    def test_ids_inexistentes(self):
+        response = self.agregar([{'producto_id': self.producto.id, 'ingredientes': [9999]}])
+        self.assertEqual(response.status_code, 400)
+        response = self.agregar([{'producto_id': 9999}])
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(CarritoItem.objects.exists())
+
+    def test_producto_nuevo_con_tabla_desactualizada(self):
+        precios.get_tabla()
+        # Creado en otro proceso: la tabla de este no lo conoce
+        nuevo, = Producto.objects.bulk_create([Producto(nombre='Pizza', precio=Decimal('12.00'))])
+        response = self.agregar([{'producto_id': nuevo.id, 'cantidad': 2}])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(CarritoItem.objects.get().precio_total, Decimal('24.00'))
+
+    def test_item_sin_producto_ni_combo(self):
+        response = self.agregar([{'cantidad': 1}])
+        self.assertEqual(response.status_code, 400)
+
+
+class PedidoCamposTests(APITestCase):
+    """Representación compacta de los items y selección con ?fields= / ?expand="""
+
+    def setUp(self):
+        self.user = crear_usuario()
+        self.client.force_authenticate(self.user)
+        producto = Producto.objects.create(nombre='Hamburguesa', descripcion='Larga', precio=Decimal('8.00'))
+        producto.ingredientes.add(Ingrediente.objects.create(nombre='Queso'))
+        estado = Estado.objects.create(descripcion=estados.ENVIADO)
+        for _ in range(3):
+            pedido = Pedido.objects.create(usuario=self.user, estado=estado, total=Decimal('8.00'),
+                                           direccion='Calle 1', telefono_contacto='555')
+            PedidoItem.objects.create(pedido=pedido, producto=producto, cantidad=1, precio_unitario=Decimal('8.00'))
+
+    def listar(self, query=''):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('pedido-list') + query)
+        self.assertEqual(response.status_code, 200)
+        return response.data['results'], len(ctx.captured_queries)
+
+    def test_items_compactos_por_defecto(self):
+        pedidos, consultas = self.listar()
+        self.assertEqual(set(pedidos[0]['items'][0]['producto']), {'id', 'nombre', 'precio', 'imagen', 'imagen_variantes'})
+        self.assertEqual(consultas, 2)
+
+    def test_expand_producto(self):
+        pedidos, _ = self.listar('?expand=items.producto')
+        producto = pedidos[0]['items'][0]['producto']
+        self.assertEqual(producto['descripcion'], 'Larga')
+        self.assertEqual(producto['ingredientes'][0]['nombre'], 'Queso')
+
+    def test_fields(self):
+        pedidos, consultas = self.listar('?fields=id,total')
+        self.assertEqual(set(pedidos[0]), {'id', 'total'})
+        self.assertEqual(consultas, 1)
+        pedidos, _ = self.listar('?fields=id,items.cantidad')
+        self.assertEqual(pedidos[0]['items'], [{'cantidad': 1}])
+
+    def test_rutas_validas(self):
+        serializer = PedidoSerializer()
+        self.assertEqual(
+            expansiones_validas(serializer, {'items.producto', 'items.cantidad', 'items.nada', 'items'}),
+            {'items.producto'},
+        )
+        rutas = {'total', 'items.producto.descripcion', 'items.nada'}
+        self.assertEqual(campos_desconocidos(serializer, rutas), {'items.producto.descripcion', 'items.nada'})
+        self.assertEqual(campos_desconocidos(serializer, rutas, expand={'items.producto'}), {'items.nada'})
+
+    def test_fields_en_producto_compacto(self):
+        pedidos, _ = self.listar('?fields=id,items.producto.nombre')
+        self.assertEqual(pedidos[0]['items'], [{'producto': {'nombre': 'Hamburguesa'}}])
+
+    def test_carrito_respeta_fields_y_expand_con_ambos_backends(self):
+        producto = Producto.objects.get()
+        for backend in ('db', 'cache'):
+            with self.subTest(backend=backend), override_settings(CART_BACKEND=backend):
+                caches['carritos'].clear()
+                CarritoItem.objects.all().delete()
+                self.client.post(reverse('add_to_cart'), {'producto_id': producto.id}, format='json')
+                compacto = self.client.get(reverse('view_cart')).data
+                completo = self.client.get(reverse('view_cart') + '?expand=items.producto').data
+                recortado = self.client.get(reverse('view_cart') + '?fields=items.producto.nombre').data
+                self.assertNotIn('descripcion', compacto['items'][0]['producto'])
+                self.assertEqual(completo['items'][0]['producto']['descripcion'], 'Larga')
+                self.assertEqual(recortado, {'items': [{'producto': {'nombre': 'Hamburguesa'}}]})
+
+
+@override_settings(CART_BACKEND='cache', CART_FLUSH_INTERVAL=300)
+class CarritoCacheTests(APITestCase):
+    """Carrito en caché con persistencia diferida"""
+
+    def setUp(self):
+        caches['carritos'].clear()
+        self.user = crear_usuario()
+        self.client.force_authenticate(self.user)
+        self.producto = Producto.objects.create(nombre='Hamburguesa', precio=Decimal('8.00'))
+        self.extra = Ingrediente.objects.create(nombre='Queso', costos_extras=Decimal('1.00'))
+        Estado.objects.create(descripcion=estados.ENVIADO)
+        Estado.objects.create(descripcion=estados.NO_LEIDO)
+
+    def agregar(self, cantidad=1):
+        return self.client.post(reverse('add_to_cart'), {'items': [
+            {'producto_id': self.producto.id, 'ingredientes': [self.extra.id], 'cantidad': cantidad},
+        ]}, format='json')
+
+    def test_agregar_no_escribe_items_en_base(self):
+        self.agregar()
+        response = self.agregar(2)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(str(response.data['item_id']).startswith('tmp-'))
+        self.assertFalse(CarritoItem.objects.exists())
+
+    def test_ver_carrito_sin_consultas(self):
+        self.agregar(2)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('view_cart'))
+        self.assertEqual(len(ctx.captured_queries), 0)
+        self.assertEqual(len(response.data['items']), 1)
+        self.assertEqual(response.data['items'][0]['producto']['nombre'], 'Hamburguesa')
+        self.assertEqual(response.data['total_carrito'], Decimal('18.00'))
+
+    def test_checkout_persiste_el_carrito(self):
+        self.agregar()
+        self.agregar(3)
+        response = self.client.post(reverse('pedido-list'), {
+            'direccion': 'Calle Falsa 123', 'telefono_contacto': '5551234',
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        pedido = Pedido.objects.get(usuario=self.user)
+        self.assertEqual(pedido.total, Decimal('36.00'))
+        self.assertEqual(pedido.items.count(), 2)
+        self.assertFalse(CarritoItem.objects.exists())
+        self.assertEqual(self.client.get(reverse('view_cart')).data['items'], [])
+
+    def test_persistir_tras_intervalo(self):
+        with override_settings(CART_FLUSH_INTERVAL=0):
+            response = self.agregar(2)
+        item = CarritoItem.objects.get()
+        self.assertEqual(response.data['item_id'], item.id)
+        self.assertEqual(list(item.ingredientes.values_list('id', flat=True)), [self.extra.id])
+
+    def test_pendiente_marcado_en_base(self):
+        self.agregar()
+        carrito = Carrito.objects.get(usuario=self.user)
+        self.assertTrue(carrito.pendiente)
+        # Solo el primer cambio sin persistir escribe la marca
+        with CaptureQueriesContext(connection) as ctx:
+            self.agregar()
+        self.assertFalse([q for q in ctx.captured_queries if 'UPDATE' in q['sql']])
+        CarritoCache().persistir(self.user.id)
+        carrito.refresh_from_db()
+        self.assertFalse(carrito.pendiente)
+        self.assertEqual(CarritoItem.objects.filter(carrito=carrito).count(), 2)
+
+    def test_carrito_sucio_no_expira(self):
+        cache = caches['carritos']
+        with mock.patch.object(cache, 'set', wraps=cache.set) as guardar:
+            self.agregar()
+            self.assertIsNone(guardar.call_args.kwargs['timeout'])
+            CarritoCache().persistir(self.user.id)
+            self.assertEqual(guardar.call_args.kwargs['timeout'], settings.CART_CACHE_TIMEOUT)
+
+    def test_check_cache_que_desaloja(self):
+        caches_config = {**settings.CACHES, 'carritos': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        with override_settings(CACHES=caches_config):
+            ids = {error.id for error in comprobar_cache_carritos(None)}
+        self.assertEqual(ids, {'orders.E001', 'orders.W001'})
+        self.assertEqual({error.id for error in comprobar_cache_carritos(None)}, {'orders.W001'})
+
+    def test_comando_persistir_carritos(self):
+        self.agregar(2)
+        call_command('persistir_carritos', stdout=StringIO())
+        item = CarritoItem.objects.get()
+        self.assertEqual(item.precio_total, Decimal('18.00'))
+        self.assertFalse(Carrito.objects.get(usuario=self.user).pendiente)
+        # Lo persistido sigue sirviéndose desde la caché con sus ids reales
+        self.assertEqual(self.client.get(reverse('view_cart')).data['items'][0]['id'], item.id)
@@ -3,92 +3,113 @@ from rest_framework import viewsets, permissions, status, generics
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from django.db import transaction
 from django.shortcuts import get_object_or_404
-from .models import Carrito, CarritoItem, Pedido, PedidoItem, Estado
+from .models import Pedido, PedidoItem, Estado
+from .carrito import agregar_items, get_backend
+from .checkout import realizar_checkout, CarritoVacio
+from restaurant_api.campos import expandido, incluye
+from restaurant_api.eventos import emitir, grupo_usuario
 from .serializers import (
     PedidoSerializer, 
     PedidoCreateSerializer, 
-    CarritoSerializer, 
-    EstadoSerializer
+    EstadoSerializer,
+    AgregarCarritoSerializer
 )
-from products.models import Producto, Ingrediente
 from decimal import Decimal
+from datetime import datetime, time, timedelta
+from django.db.models import Count, Prefetch, Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+
+def _parse_fecha(valor, fin_de_dia=False):
+    """
+    Convertir un parámetro ISO en datetime con zona horaria.
+
+    Para una fecha sin hora y ``fin_de_dia`` se devuelve el inicio del día
+    siguiente, usado como límite exclusivo.
+    """
+    if not valor:
+        return None
+    fecha = parse_date(valor)
+    if fecha is not None:
+        if fin_de_dia:
+            fecha += timedelta(days=1)
+        fecha_hora = datetime.combine(fecha, time.min)
+    else:
+        fecha_hora = parse_datetime(valor)
+        if fecha_hora is None:
+            raise ValueError(valor)
+    if timezone.is_naive(fecha_hora):
+        fecha_hora = timezone.make_aware(fecha_hora)
+    return fecha_hora
 
 class AgregarCarritoAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
-        user = request.user
-        producto_id = request.data.get('producto_id')
-        ingredientes_ids = request.data.get('ingredientes', [])
-        cantidad = int(request.data.get('cantidad', 1))
-
-        producto = Producto.objects.get(pk=producto_id)
-        carrito, _ = Carrito.objects.get_or_create(usuario=user)
-        item = CarritoItem.objects.create(carrito=carrito, producto=producto, cantidad=cantidad)
-        for ing_id in ingredientes_ids:
-            item.ingredientes.add(Ingrediente.objects.get(pk=ing_id))
-        # calcular precio
-        precio = producto.precio_base
-        for ing in item.ingredientes.all():
-            precio += ing.costo_extra
-        item.precio_total = precio * cantidad
-        item.save()
-        return Response({'ok': True, 'item_id': item.id})
-    
-
-from .models import Carrito, Pedido
+        """
+        Agregar uno o varios items al carrito.
+
+        Acepta ``{"items": [{"producto_id" | "combo_id", "ingredientes", "cantidad"}, ...]}``
+        o, por compatibilidad, un único item en el cuerpo de la petición.
+        """
+        data = request.data
+        if 'items' not in data:
+            if hasattr(data, 'getlist'):
+                data = {**data.dict(), 'ingredientes': data.getlist('ingredientes')}
+            data = {'items': [data]}
+        serializer = AgregarCarritoSerializer(data=data)
+        serializer.is_valid(raise_exception=True)
+
+        ids = agregar_items(request.user, serializer.validated_data['items'])
+        return Response({'ok': True, 'item_id': ids[0], 'item_ids': ids})
+
 
 class CrearPedidoAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
-        user = request.user
-        direccion = request.data.get('direccion')
-        telefono = request.data.get('telefono')
+        serializer = PedidoCreateSerializer(data={
+            'direccion': request.data.get('direccion'),
+            'telefono_contacto': request.data.get('telefono'),
+            'metodo_pago': request.data.get('metodo_pago', 'SIMULADO'),
+        })
+        serializer.is_valid(raise_exception=True)
 
-        carrito = Carrito.objects.filter(usuario=user).first()
-        if not carrito or not carrito.items.exists():
+        try:
+            pedido = realizar_checkout(request.user, **serializer.validated_data)
+        except CarritoVacio:
             return Response({'error': 'Carrito vacío'}, status=400)
 
-        total = sum([it.precio_total for it in carrito.items.all()])
-        pedido = Pedido.objects.create(
-            usuario=user,
-            total=total,
-            direccion=direccion,
-            telefono=telefono,
-            estado='ENVIADO'   # directo como definiste
-        )
-
-        for it in carrito.items.all():
-            pedido.items.add(it)
-
-        pedido.save()
-        carrito.items.all().delete()  # limpiar carrito
-
-        # crear notificación
-        from notifications.models import Notificacion
-        Notificacion.objects.create(
-            usuario=user,
-            mensaje=f"Tu pedido #{pedido.id} ha sido enviado."
-        )
-
         return Response({'ok': True, 'pedido_id': pedido.id})
 
 class CarritoView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        carrito, _ = Carrito.objects.get_or_create(usuario=request.user)
-        serializer = CarritoSerializer(carrito)
-        return Response(serializer.data)
+        return Response(get_backend().representar(request.user, request))
 
 class PedidoViewSet(viewsets.ModelViewSet):
     serializer_class = PedidoSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return Pedido.objects.filter(usuario=self.request.user).order_by('-creado')
+        queryset = (
+            Pedido.objects.filter(usuario=self.request.user)
+            .select_related('usuario', 'estado')
+            .order_by('-creado')
+        )
+        # Solo se precarga lo que va a serializarse según ?fields= y ?expand=
+        if not incluye(self.request, 'items'):
+            return queryset
+        prefetch = [Prefetch('items', queryset=PedidoItem.objects.select_related('producto', 'combo'))]
+        if expandido(self.request, 'items.producto'):
+            prefetch += ['items__producto__ingredientes', 'items__producto__resumen_calificacion']
+        if expandido(self.request, 'items.combo'):
+            prefetch += ['items__combo__productos__ingredientes', 'items__combo__productos__resumen_calificacion']
+        return queryset.prefetch_related(*prefetch)
 
     def get_serializer_class(self):
         if self.action == 'create':
@@ -97,55 +118,15 @@ class PedidoViewSet(viewsets.ModelViewSet):
 
     def create(self, request, *args, **kwargs):
         """Crear pedido desde el carrito"""
-        user = request.user
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        
-        # Verificar que el carrito no esté vacío
-        carrito = Carrito.objects.filter(usuario=user).first()
-        if not carrito or not carrito.items.exists():
-            return Response({'error': 'El carrito está vacío'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Obtener o crear estado "enviado"
-        estado_enviado, _ = Estado.objects.get_or_create(descripcion='Enviado')
-        
-        # Calcular total
-        total = sum(item.precio_total for item in carrito.items.all())
-        
-        # Crear pedido
-        pedido = Pedido.objects.create(
-            usuario=user,
-            estado=estado_enviado,
-            total=total,
-            **serializer.validated_data
-        )
-        
-        # Crear PedidoItems desde CarritoItems
-        for carrito_item in carrito.items.all():
-            PedidoItem.objects.create(
-                pedido=pedido,
-                producto=carrito_item.producto,
-                combo=carrito_item.combo,
-                cantidad=carrito_item.cantidad,
-                precio_unitario=carrito_item.precio_total / carrito_item.cantidad
-            )
-        
-        # Limpiar carrito
-        carrito.items.all().delete()
-        
-        # Crear notificación
         try:
-            from notifications.models import Notificacion
-            estado_no_leido, _ = Estado.objects.get_or_create(descripcion='No Leído')
-            Notificacion.objects.create(
-                usuario=user,
-                mensaje=f"Tu pedido #{pedido.id} ha sido creado y está siendo procesado.",
-                estado=estado_no_leido
-            )
-        except ImportError:
-            pass  # Si no existe la app de notificaciones
-        
-        response_serializer = PedidoSerializer(pedido)
+            pedido = realizar_checkout(request.user, **serializer.validated_data)
+        except CarritoVacio:
+            return Response({'error': 'El carrito está vacío'}, status=status.HTTP_400_BAD_REQUEST)
+
+        response_serializer = PedidoSerializer(self.get_queryset().get(pk=pedido.pk))
         return Response(response_serializer.data, status=status.HTTP_201_CREATED)
 
     @action(detail=True, methods=['patch'])
@@ -168,20 +149,21 @@ class PedidoViewSet(viewsets.ModelViewSet):
         
         try:
             nuevo_estado = Estado.objects.get(id=nuevo_estado_id)
-            pedido.estado = nuevo_estado
-            pedido.save()
-            
-            # Crear notificación al usuario
-            try:
-                from notifications.models import Notificacion
-                estado_no_leido, _ = Estado.objects.get_or_create(descripcion='No Leído')
-                Notificacion.objects.create(
-                    usuario=pedido.usuario,
-                    mensaje=f"El estado de tu pedido #{pedido.id} ha cambiado a: {nuevo_estado.descripcion}",
-                    estado=estado_no_leido
-                )
-            except ImportError:
-                pass
+            # El cambio y su notificación se confirman juntos
+            with transaction.atomic():
+                pedido.estado = nuevo_estado
+                pedido.save()
+                emitir(grupo_usuario(pedido.usuario_id), 'pedido', id=pedido.id, estado=nuevo_estado.descripcion)
+
+                # Crear notificación al usuario
+                try:
+                    from notifications.bandeja import encolar
+                    encolar(
+                        pedido.usuario_id,
+                        f"El estado de tu pedido #{pedido.id} ha cambiado a: {nuevo_estado.descripcion}",
+                    )
+                except ImportError:
+                    pass
             
             serializer = PedidoSerializer(pedido)
             return Response(serializer.data)
@@ -194,19 +176,31 @@ class PedidoViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'])
     def estadisticas(self, request):
-        """Obtener estadísticas de pedidos del usuario"""
-        user = request.user
-        pedidos = self.get_queryset()
-        
-        total_pedidos = pedidos.count()
-        total_gastado = sum(pedido.total for pedido in pedidos)
-        
+        """Obtener estadísticas de pedidos del usuario (opcional: ?desde=&hasta=)"""
+        pedidos = Pedido.objects.filter(usuario=request.user)
+        try:
+            desde = _parse_fecha(request.query_params.get('desde'))
+            hasta = _parse_fecha(request.query_params.get('hasta'), fin_de_dia=True)
+        except ValueError:
+            return Response(
+                {'error': 'Las fechas deben tener formato ISO (AAAA-MM-DD o AAAA-MM-DDTHH:MM)'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if desde:
+            pedidos = pedidos.filter(creado__gte=desde)
+        if hasta:
+            pedidos = pedidos.filter(creado__lt=hasta)
+
+        resumen = pedidos.aggregate(total_pedidos=Count('id'), total_gastado=Sum('total'))
+        total_pedidos = resumen['total_pedidos']
+        total_gastado = resumen['total_gastado'] or Decimal('0')
+
         # Estadísticas por estado
-        estados_stats = {}
-        for pedido in pedidos:
-            estado = pedido.estado.descripcion if pedido.estado else 'Sin estado'
-            estados_stats[estado] = estados_stats.get(estado, 0) + 1
-        
+        estados_stats = {
+            fila['estado__descripcion'] or 'Sin estado': fila['cantidad']
+            for fila in pedidos.order_by().values('estado__descripcion').annotate(cantidad=Count('id'))
+        }
+
         return Response({
             'total_pedidos': total_pedidos,
             'total_gastado': float(total_gastado),
@@ -218,4 +212,5 @@ class EstadoViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Estado.objects.all()
     serializer_class = EstadoSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = None  # catálogo pequeño y acotado de estados
 
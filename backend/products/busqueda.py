@@ -0,0 +1,133 @@
+"""
+Búsqueda de texto en el menú.
+
+Busca en el nombre, la descripción y los ingredientes de cada producto usando
+el índice creado en la migración ``0003_busqueda_texto``: una tabla FTS5 en
+SQLite y un ``tsvector`` con índice GIN en PostgreSQL, ambos mantenidos por
+triggers. Cada palabra de la consulta se trata como prefijo y todas deben
+aparecer; los resultados se ordenan por relevancia (el nombre pesa más que los
+ingredientes y estos más que la descripción). En otros motores se recurre a
+``icontains`` sin ordenar por relevancia.
+"""
+import re
+from decimal import Decimal, InvalidOperation
+
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import Combo, Producto
+
+TABLA_FTS = 'products_producto_fts'
+TABLA_TSVECTOR = 'products_producto_busqueda'
+# Pesos de bm25 en el orden de columnas de la tabla FTS: nombre, descripción, ingredientes
+PESOS_FTS = '10.0, 1.0, 4.0'
+
+VERDADERO = {'1', 'true', 'si', 'sí'}
+FALSO = {'0', 'false', 'no'}
+
+
+def terminos(texto):
+    """Palabras de la consulta, sin signos que el motor pudiera interpretar"""
+    return [palabra.lower() for palabra in re.findall(r'\w+', texto or '')]
+
+
+def _buscar_sqlite(queryset, palabras):
+    consulta = ' '.join(f'"{palabra}"*' for palabra in palabras)
+    tabla = Producto._meta.db_table
+    return queryset.filter(
+        id__in=RawSQL(f'SELECT rowid FROM {TABLA_FTS} WHERE {TABLA_FTS} MATCH %s', (consulta,))
+    ).annotate(rango=RawSQL(
+        f'SELECT -bm25({TABLA_FTS}, {PESOS_FTS}) FROM {TABLA_FTS} '
+        f'WHERE {TABLA_FTS} MATCH %s AND {TABLA_FTS}.rowid = {tabla}.id',
+        (consulta,),
+    ))
+
+
+def _buscar_postgresql(queryset, palabras):
+    consulta = ' & '.join(f'{palabra}:*' for palabra in palabras)
+    tabla = Producto._meta.db_table
+    return queryset.filter(id__in=RawSQL(
+        f"SELECT producto_id FROM {TABLA_TSVECTOR} WHERE documento @@ to_tsquery('simple', %s)",
+        (consulta,),
+    )).annotate(rango=RawSQL(
+        f"SELECT ts_rank(documento, to_tsquery('simple', %s)) FROM {TABLA_TSVECTOR} "
+        f"WHERE producto_id = {tabla}.id",
+        (consulta,),
+    ))
+
+
+def _buscar_icontains(queryset, palabras):
+    for palabra in palabras:
+        queryset = queryset.filter(
+            Q(nombre__icontains=palabra)
+            | Q(descripcion__icontains=palabra)
+            | Q(id__in=Producto.objects.filter(ingredientes__nombre__icontains=palabra).values('id'))
+        )
+    return queryset
+
+
+def buscar_productos(queryset, texto):
+    """
+    Filtrar ``queryset`` por ``texto`` y ordenarlo por relevancia.
+
+    Sin texto se devuelve el catálogo ordenado por nombre.
+    """
+    palabras = terminos(texto)
+    if not palabras:
+        return queryset.order_by('nombre', 'id')
+    vendor = connections[queryset.db].vendor
+    if vendor == 'sqlite':
+        return _buscar_sqlite(queryset, palabras).order_by('-rango', 'id')
+    if vendor == 'postgresql':
+        return _buscar_postgresql(queryset, palabras).order_by('-rango', 'id')
+    return _buscar_icontains(queryset, palabras).order_by('nombre', 'id')
+
+
+def buscar_combos(queryset, texto):
+    """
+    Filtrar combos por nombre, descripción o nombre de sus productos.
+
+    Los combos son pocos y no tienen índice de texto propio.
+    """
+    for palabra in terminos(texto):
+        queryset = queryset.filter(
+            Q(nombre__icontains=palabra)
+            | Q(descripcion__icontains=palabra)
+            | Q(id__in=Combo.objects.filter(productos__nombre__icontains=palabra).values('id'))
+        )
+    return queryset.order_by('nombre', 'id')
+
+
+def _decimal(valor):
+    try:
+        numero = Decimal(valor)
+    except InvalidOperation:
+        raise ValueError(valor)
+    if not numero.is_finite():
+        raise ValueError(valor)
+    return numero
+
+
+def _booleano(valor):
+    valor = valor.strip().lower()
+    if valor in VERDADERO:
+        return True
+    if valor in FALSO:
+        return False
+    raise ValueError(valor)
+
+
+def filtrar_catalogo(queryset, params, campo_precio='precio'):
+    """
+    Aplicar ``?precio_min=``, ``?precio_max=`` y ``?es_personalizable=``.
+
+    Lanza ``ValueError`` si algún valor no es válido.
+    """
+    if params.get('precio_min'):
+        queryset = queryset.filter(**{f'{campo_precio}__gte': _decimal(params['precio_min'])})
+    if params.get('precio_max'):
+        queryset = queryset.filter(**{f'{campo_precio}__lte': _decimal(params['precio_max'])})
+    if params.get('es_personalizable'):
+        queryset = queryset.filter(es_personalizable=_booleano(params['es_personalizable']))
+    return queryset
@@ -0,0 +1,118 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from restaurant_api.campos import incluye, podar
+from restaurant_api.renderers import dumps
+
+CATALOG_VERSION_KEY = 'catalog:version'
+CALIFICACIONES_VERSION_KEY = 'catalog:calificaciones:version'
+SIN_CALIFICACION = {'total_reviews': 0, 'promedio': 0}
+
+
+def _nueva_version():
+    # Basada en el reloj para que un valor perdido (expirado o desalojado)
+    # nunca vuelva a coincidir con una instantánea anterior
+    return int(time.time() * 1000)
+
+
+def _get_version(key):
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _nueva_version(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def _bump_version(key):
+    try:
+        return cache.incr(key)
+    except ValueError:
+        version = _nueva_version()
+        cache.set(key, version, timeout=None)
+        return version
+
+
+def get_catalog_version():
+    """Versión actual del catálogo (productos, ingredientes y combos)"""
+    return _get_version(CATALOG_VERSION_KEY)
+
+
+def bump_catalog_version():
+    """Invalidar todas las instantáneas del catálogo"""
+    return _bump_version(CATALOG_VERSION_KEY)
+
+
+def bump_calificaciones_version():
+    """Invalidar solo las calificaciones que se superponen a las instantáneas"""
+    return _bump_version(CALIFICACIONES_VERSION_KEY)
+
+
+def calificacion(resumen):
+    """Representación de un ``ResumenCalificacion`` en el menú"""
+    if resumen is None:
+        return SIN_CALIFICACION
+    return {'total_reviews': resumen.total_reviews, 'promedio': resumen.promedio}
+
+
+def get_calificaciones():
+    """``(versión, {producto_id: calificación})`` con los resúmenes actuales"""
+    from reviews.models import ResumenCalificacion
+    version = _get_version(CALIFICACIONES_VERSION_KEY)
+    key = f'catalog:calificaciones:{version}'
+    tabla = cache.get(key)
+    if tabla is None:
+        tabla = {resumen.producto_id: calificacion(resumen) for resumen in ResumenCalificacion.objects.all()}
+        cache.set(key, tabla, timeout=settings.CATALOG_SNAPSHOT_TIMEOUT)
+    return version, tabla
+
+
+def _superponer_calificaciones(data, ruta, tabla):
+    for elemento in data:
+        for producto in (elemento.get(ruta, ()) if ruta else (elemento,)):
+            if 'calificacion' in producto:
+                producto['calificacion'] = tabla.get(producto['id'], SIN_CALIFICACION)
+
+
+def get_menu_snapshot(nombre, request, build, campos=frozenset(), expand=frozenset(), calificaciones=None):
+    """
+    Devolver ``(data, etag)`` del listado ``nombre`` para la versión actual.
+
+    ``build(campos)`` solo se llama cuando la instantánea no está en caché y
+    serializa el listado con esos ``?fields=``. La clave incluye el host
+    porque los serializers generan URLs absolutas de imágenes, y ``campos``
+    y ``expand`` porque cambian la representación: deben llegar ya validados
+    contra el serializer, para que la petición no pueda crear claves a voluntad.
+
+    ``calificaciones`` es la ruta de los productos dentro de cada elemento
+    (``''`` para el propio elemento, ``'productos'`` en los combos). Su
+    calificación se superpone desde ``get_calificaciones()`` y forma parte
+    del ETag, así una reseña no invalida la instantánea.
+    """
+    version = get_catalog_version()
+    key = f'catalog:{nombre}:{version}:{request.get_host()}'
+    if campos or expand:
+        variante = f"{','.join(sorted(campos))}|{','.join(sorted(expand))}"
+        key += ':' + hashlib.md5(variante.encode()).hexdigest()
+
+    # La superposición necesita el id de cada producto aunque no se haya pedido
+    ruta_id = '.'.join(filter(None, (calificaciones, 'id')))
+    superponer = calificaciones is not None and incluye(request, '.'.join(filter(None, (calificaciones, 'calificacion'))))
+    falta_id = superponer and not incluye(request, ruta_id)
+
+    snapshot = cache.get(key)
+    if snapshot is None:
+        data = list(build(campos | {ruta_id} if falta_id else campos))
+        digest = hashlib.sha256(dumps(data)).hexdigest()
+        snapshot = (data, digest)
+        cache.set(key, snapshot, timeout=settings.CATALOG_SNAPSHOT_TIMEOUT)
+    data, digest = snapshot
+    if not superponer:
+        return data, f'"{digest}"'
+
+    version_calificaciones, tabla = get_calificaciones()
+    _superponer_calificaciones(data, calificaciones, tabla)
+    if falta_id:
+        data = podar(data, campos)
+    return data, f'"{digest}.{version_calificaciones}"'
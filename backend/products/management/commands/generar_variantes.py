@@ -0,0 +1,22 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from products.models import Producto
+from restaurant_api.imagenes import generar_variantes
+
+
+class Command(BaseCommand):
+    help = 'Genera las variantes (tamaños y WebP) de las imágenes de productos y perfiles ya subidas'
+
+    def handle(self, *args, **options):
+        total, errores = 0, 0
+        for model, campo in ((Producto, 'imagen'), (get_user_model(), 'profile_image')):
+            con_imagen = model.objects.exclude(**{campo: ''}).exclude(**{f'{campo}__isnull': True})
+            for instancia in con_imagen.only('pk', campo).iterator():
+                try:
+                    generar_variantes(getattr(instancia, campo))
+                    total += 1
+                except (OSError, ValueError) as e:
+                    errores += 1
+                    self.stderr.write(f'{model.__name__} {instancia.pk}: {e}')
+        self.stdout.write(self.style.SUCCESS(f'Se generaron las variantes de {total} imágenes ({errores} errores)'))
@@ -0,0 +1,100 @@
+# Generated by Django 5.2.6 on 2026-10-18 13:58
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RenameField(
+            model_name='combo',
+            old_name='precio',
+            new_name='precio_total',
+        ),
+        migrations.RenameField(
+            model_name='ingrediente',
+            old_name='costo_extra',
+            new_name='costos_extras',
+        ),
+        migrations.RenameField(
+            model_name='producto',
+            old_name='precio_base',
+            new_name='precio',
+        ),
+        migrations.AddField(
+            model_name='combo',
+            name='usuario',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='combos_creados', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='producto',
+            name='usuario',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='productos_creados', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.CreateModel(
+            name='ComboPersonalizado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(blank=True, max_length=200, null=True)),
+                ('precio_total', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('creado_en', models.DateTimeField(auto_now_add=True)),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='combos_personalizados', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ComboPersonalizadoProducto',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cantidad', models.PositiveIntegerField(default=1)),
+                ('combo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='products.combopersonalizado')),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='products.producto')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='combopersonalizado',
+            name='productos',
+            field=models.ManyToManyField(related_name='combos_en_personalizados', through='products.ComboPersonalizadoProducto', to='products.producto'),
+        ),
+        migrations.CreateModel(
+            name='ComboProducto',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cantidad', models.PositiveIntegerField(default=1)),
+                ('combo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='products.combo')),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='products.producto')),
+            ],
+        ),
+        migrations.RemoveField(
+            model_name='combo',
+            name='productos',
+        ),
+        migrations.AddField(
+            model_name='combo',
+            name='productos',
+            field=models.ManyToManyField(blank=True, through='products.ComboProducto', to='products.producto'),
+        ),
+        migrations.CreateModel(
+            name='ProductoIngrediente',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ingrediente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='products.ingrediente')),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='products.producto')),
+            ],
+        ),
+        migrations.RemoveField(
+            model_name='producto',
+            name='ingredientes',
+        ),
+        migrations.AddField(
+            model_name='producto',
+            name='ingredientes',
+            field=models.ManyToManyField(blank=True, through='products.ProductoIngrediente', to='products.ingrediente'),
+        ),
+    ]
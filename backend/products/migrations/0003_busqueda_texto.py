@@ -0,0 +1,136 @@
+# Índice de búsqueda de texto del menú (ver products/busqueda.py).
+# Se mantiene con triggers, así cubre también bulk_create y SQL directo.
+from django.db import migrations
+
+SQLITE = [
+    """CREATE VIRTUAL TABLE products_producto_fts USING fts5(
+        nombre, descripcion, ingredientes, tokenize = 'unicode61 remove_diacritics 2'
+    )""",
+    """CREATE TRIGGER products_producto_fts_ai AFTER INSERT ON products_producto BEGIN
+        INSERT INTO products_producto_fts (rowid, nombre, descripcion, ingredientes)
+        VALUES (new.id, new.nombre, new.descripcion, '');
+    END""",
+    """CREATE TRIGGER products_producto_fts_au AFTER UPDATE OF nombre, descripcion ON products_producto BEGIN
+        UPDATE products_producto_fts SET nombre = new.nombre, descripcion = new.descripcion WHERE rowid = new.id;
+    END""",
+    """CREATE TRIGGER products_producto_fts_ad AFTER DELETE ON products_producto BEGIN
+        DELETE FROM products_producto_fts WHERE rowid = old.id;
+    END""",
+    """CREATE TRIGGER products_productoingrediente_fts_ai AFTER INSERT ON products_productoingrediente BEGIN
+        UPDATE products_producto_fts SET ingredientes = (
+            SELECT coalesce(group_concat(i.nombre, ' '), '')
+            FROM products_productoingrediente pi JOIN products_ingrediente i ON i.id = pi.ingrediente_id
+            WHERE pi.producto_id = new.producto_id
+        ) WHERE rowid = new.producto_id;
+    END""",
+    """CREATE TRIGGER products_productoingrediente_fts_ad AFTER DELETE ON products_productoingrediente BEGIN
+        UPDATE products_producto_fts SET ingredientes = (
+            SELECT coalesce(group_concat(i.nombre, ' '), '')
+            FROM products_productoingrediente pi JOIN products_ingrediente i ON i.id = pi.ingrediente_id
+            WHERE pi.producto_id = old.producto_id
+        ) WHERE rowid = old.producto_id;
+    END""",
+    """CREATE TRIGGER products_ingrediente_fts_au AFTER UPDATE OF nombre ON products_ingrediente BEGIN
+        UPDATE products_producto_fts SET ingredientes = (
+            SELECT coalesce(group_concat(i.nombre, ' '), '')
+            FROM products_productoingrediente pi JOIN products_ingrediente i ON i.id = pi.ingrediente_id
+            WHERE pi.producto_id = products_producto_fts.rowid
+        ) WHERE rowid IN (SELECT producto_id FROM products_productoingrediente WHERE ingrediente_id = new.id);
+    END""",
+    """INSERT INTO products_producto_fts (rowid, nombre, descripcion, ingredientes)
+    SELECT p.id, p.nombre, p.descripcion, coalesce((
+        SELECT group_concat(i.nombre, ' ')
+        FROM products_productoingrediente pi JOIN products_ingrediente i ON i.id = pi.ingrediente_id
+        WHERE pi.producto_id = p.id
+    ), '')
+    FROM products_producto p""",
+]
+
+SQLITE_REVERSA = [
+    'DROP TRIGGER IF EXISTS products_ingrediente_fts_au',
+    'DROP TRIGGER IF EXISTS products_productoingrediente_fts_ad',
+    'DROP TRIGGER IF EXISTS products_productoingrediente_fts_ai',
+    'DROP TRIGGER IF EXISTS products_producto_fts_ad',
+    'DROP TRIGGER IF EXISTS products_producto_fts_au',
+    'DROP TRIGGER IF EXISTS products_producto_fts_ai',
+    'DROP TABLE IF EXISTS products_producto_fts',
+]
+
+# Pesos: nombre (A) > ingredientes (B) > descripción (C)
+POSTGRESQL = [
+    """CREATE TABLE products_producto_busqueda (
+        producto_id bigint PRIMARY KEY
+            REFERENCES products_producto (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED,
+        documento tsvector NOT NULL
+    )""",
+    'CREATE INDEX products_producto_busqueda_gin ON products_producto_busqueda USING GIN (documento)',
+    """CREATE FUNCTION products_producto_busqueda_actualizar(pid bigint) RETURNS void AS $$
+        INSERT INTO products_producto_busqueda (producto_id, documento)
+        SELECT p.id,
+            setweight(to_tsvector('simple', p.nombre), 'A')
+            || setweight(to_tsvector('simple', coalesce((
+                SELECT string_agg(i.nombre, ' ')
+                FROM products_productoingrediente pi JOIN products_ingrediente i ON i.id = pi.ingrediente_id
+                WHERE pi.producto_id = p.id
+            ), '')), 'B')
+            || setweight(to_tsvector('simple', p.descripcion), 'C')
+        FROM products_producto p WHERE p.id = pid
+        ON CONFLICT (producto_id) DO UPDATE SET documento = EXCLUDED.documento;
+    $$ LANGUAGE sql""",
+    """CREATE FUNCTION products_producto_busqueda_tg() RETURNS trigger AS $$
+    BEGIN
+        IF TG_TABLE_NAME = 'products_producto' THEN
+            PERFORM products_producto_busqueda_actualizar(NEW.id);
+        ELSIF TG_TABLE_NAME = 'products_productoingrediente' AND TG_OP = 'DELETE' THEN
+            PERFORM products_producto_busqueda_actualizar(OLD.producto_id);
+        ELSIF TG_TABLE_NAME = 'products_productoingrediente' THEN
+            PERFORM products_producto_busqueda_actualizar(NEW.producto_id);
+        ELSE
+            PERFORM products_producto_busqueda_actualizar(pi.producto_id)
+            FROM products_productoingrediente pi WHERE pi.ingrediente_id = NEW.id;
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql""",
+    """CREATE TRIGGER products_producto_busqueda_producto
+        AFTER INSERT OR UPDATE OF nombre, descripcion ON products_producto
+        FOR EACH ROW EXECUTE FUNCTION products_producto_busqueda_tg()""",
+    """CREATE TRIGGER products_producto_busqueda_relacion
+        AFTER INSERT OR DELETE ON products_productoingrediente
+        FOR EACH ROW EXECUTE FUNCTION products_producto_busqueda_tg()""",
+    """CREATE TRIGGER products_producto_busqueda_ingrediente
+        AFTER UPDATE OF nombre ON products_ingrediente
+        FOR EACH ROW EXECUTE FUNCTION products_producto_busqueda_tg()""",
+    'SELECT products_producto_busqueda_actualizar(id) FROM products_producto',
+]
+
+POSTGRESQL_REVERSA = [
+    'DROP TRIGGER IF EXISTS products_producto_busqueda_ingrediente ON products_ingrediente',
+    'DROP TRIGGER IF EXISTS products_producto_busqueda_relacion ON products_productoingrediente',
+    'DROP TRIGGER IF EXISTS products_producto_busqueda_producto ON products_producto',
+    'DROP FUNCTION IF EXISTS products_producto_busqueda_tg()',
+    'DROP FUNCTION IF EXISTS products_producto_busqueda_actualizar(bigint)',
+    'DROP TABLE IF EXISTS products_producto_busqueda',
+]
+
+
+def ejecutar(sentencias_por_motor):
+    def aplicar(apps, schema_editor):
+        # Otros motores usan la búsqueda con icontains, sin índice propio
+        for sql in sentencias_por_motor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(sql, params=None)
+    return aplicar
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0002_rename_precio_combo_precio_total_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            ejecutar({'sqlite': SQLITE, 'postgresql': POSTGRESQL}),
+            ejecutar({'sqlite': SQLITE_REVERSA, 'postgresql': POSTGRESQL_REVERSA}),
+        ),
+    ]
@@ -0,0 +1,144 @@
+"""
+Motor de precios del catálogo.
+
+Todos los totales (items del carrito, combos personalizados y pedidos) se
+calculan aquí a partir de una tabla en memoria con el precio de cada
+``Producto``, el costo extra de cada ``Ingrediente`` y el precio de cada
+``Combo``. La tabla se construye con tres consultas, se comparte por la caché
+y se guarda además en cada hilo del proceso. Va ligada a la versión del
+catálogo (``products.cache``), así que cualquier cambio la invalida.
+
+Con la caché en memoria de cada proceso (``CACHE_BACKEND`` sin configurar)
+los demás procesos no ven el cambio de versión hasta que su tabla expira. Por
+eso el checkout no usa esta tabla sino ``TablaPrecios.desde_base`` con los ids
+del carrito, y una línea con ids que la tabla no conoce se vuelve a tasar
+contra la base antes de rechazarla.
+"""
+import threading
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.exceptions import ValidationError
+
+from .cache import get_catalog_version
+from .models import Combo, Ingrediente, Producto
+
+CERO = Decimal('0')
+
+
+def _ids(lineas):
+    """Ids de productos, combos e ingredientes que usan ``lineas``"""
+    return (
+        {l['producto_id'] for l in lineas if l.get('producto_id')},
+        {l['combo_id'] for l in lineas if l.get('combo_id')},
+        {i for l in lineas for i in l.get('ingredientes', ())},
+    )
+
+
+class TablaPrecios:
+    def __init__(self, version, productos, ingredientes, combos):
+        self.version = version
+        self.construida = time.time()
+        self.productos = productos
+        self.ingredientes = ingredientes
+        self.combos = combos
+
+    @classmethod
+    def construir(cls, version):
+        return cls(
+            version,
+            dict(Producto.objects.values_list('id', 'precio')),
+            dict(Ingrediente.objects.values_list('id', 'costos_extras')),
+            dict(Combo.objects.values_list('id', 'precio_total')),
+        )
+
+    @classmethod
+    def desde_base(cls, lineas, version=None):
+        """Tabla leída de la base con solo los ids que usan ``lineas`` (hasta tres consultas)"""
+        def leer(modelo, campo, ids):
+            return dict(modelo.objects.filter(id__in=ids).values_list('id', campo)) if ids else {}
+
+        productos, combos, ingredientes = _ids(lineas)
+        return cls(
+            version,
+            leer(Producto, 'precio', productos),
+            leer(Ingrediente, 'costos_extras', ingredientes),
+            leer(Combo, 'precio_total', combos),
+        )
+
+    def validar(self, lineas):
+        """Lanzar ``ValidationError`` si alguna línea usa ids que no existen"""
+        productos, combos, ingredientes = _ids(lineas)
+        for campo, tabla, ids in (
+            ('producto_id', self.productos, productos),
+            ('combo_id', self.combos, combos),
+            ('ingredientes', self.ingredientes, ingredientes),
+        ):
+            faltantes = sorted(ids - tabla.keys())
+            if faltantes:
+                raise ValidationError({campo: f'No existen: {faltantes}'})
+
+    def precio_unitario(self, producto_id=None, combo_id=None, ingredientes=()):
+        """Precio del producto o combo más los extras (cada ingrediente suma una vez por aparición)"""
+        base = self.combos[combo_id] if combo_id else self.productos[producto_id]
+        return base + sum((self.ingredientes[i] for i in ingredientes), CERO)
+
+    def tasar(self, lineas):
+        """
+        Devolver ``[(precio_unitario, precio_total), ...]`` para ``lineas``.
+
+        Cada línea es un dict con ``producto_id`` o ``combo_id`` y opcionalmente
+        ``ingredientes`` (ids) y ``cantidad`` (1 por defecto).
+        """
+        self.validar(lineas)
+        precios = []
+        for linea in lineas:
+            unitario = self.precio_unitario(
+                linea.get('producto_id'), linea.get('combo_id'), linea.get('ingredientes', ())
+            )
+            precios.append((unitario, unitario * linea.get('cantidad', 1)))
+        return precios
+
+    def total(self, lineas):
+        return sum((total for _, total in self.tasar(lineas)), CERO)
+
+
+_local = threading.local()
+
+
+def get_tabla():
+    """Tabla de precios de la versión actual del catálogo"""
+    version = get_catalog_version()
+    tabla = getattr(_local, 'tabla', None)
+    # La copia del hilo caduca como la de la caché: con la caché de cada
+    # proceso la versión no cambia por lo que hagan otros workers
+    vigente = tabla is not None and time.time() - tabla.construida < settings.CATALOG_SNAPSHOT_TIMEOUT
+    if vigente and tabla.version == version:
+        return tabla
+    key = f'catalog:precios:{version}'
+    tabla = cache.get(key)
+    if tabla is None:
+        tabla = TablaPrecios.construir(version)
+        cache.set(key, tabla, timeout=settings.CATALOG_SNAPSHOT_TIMEOUT)
+    _local.tabla = tabla
+    return tabla
+
+
+def tasar(lineas):
+    """
+    Precio unitario y total de cada línea con la tabla actual.
+
+    Si la tabla no conoce algún id (puede venir de otro proceso con una versión
+    anterior), las líneas se tasan con los precios de la base.
+    """
+    try:
+        return get_tabla().tasar(lineas)
+    except ValidationError:
+        return TablaPrecios.desde_base(lineas).tasar(lineas)
+
+
+def total(lineas):
+    """Suma de todas las líneas con la tabla actual"""
+    return sum((total for _, total in tasar(lineas)), CERO)
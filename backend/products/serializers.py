@@ -1,49 +1,125 @@
+from django.db import transaction
 from rest_framework import serializers
+from restaurant_api.campos import CamposDinamicosMixin
+from restaurant_api.imagenes import urls_variantes
+from restaurant_api.instrumentation import MetricasSerializerMixin
+from . import precios
+from .cache import calificacion
 from .models import ComboPersonalizadoProducto, Producto, Ingrediente, Combo
 from rest_framework import serializers
 from .models import ComboPersonalizado, ComboPersonalizadoProducto, Producto
 
-class IngredienteSerializer(serializers.ModelSerializer):
+class IngredienteSerializer(CamposDinamicosMixin, MetricasSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Ingrediente
         fields = '__all__'
 
-class ProductoSerializer(serializers.ModelSerializer):
+class ProductoSerializer(CamposDinamicosMixin, MetricasSerializerMixin, serializers.ModelSerializer):
     ingredientes = IngredienteSerializer(many=True, read_only=True)
+    calificacion = serializers.SerializerMethodField()
+    imagen_variantes = serializers.SerializerMethodField()
     class Meta:
         model = Producto
         fields = '__all__'
 
-class ComboSerializer(serializers.ModelSerializer):
+    def get_imagen_variantes(self, obj):
+        return urls_variantes(obj.imagen, self.context.get('request'))
+
+    def get_calificacion(self, obj):
+        # Resumen mantenido por la app de reseñas; conviene select_related('resumen_calificacion')
+        return calificacion(getattr(obj, 'resumen_calificacion', None))
+
+class ComboSerializer(CamposDinamicosMixin, MetricasSerializerMixin, serializers.ModelSerializer):
     productos = ProductoSerializer(many=True, read_only=True)
     class Meta:
         model = Combo
         fields = '__all__'
 
+class ProductoResumenSerializer(CamposDinamicosMixin, MetricasSerializerMixin, serializers.ModelSerializer):
+    """Producto anidado en pedidos y carritos (?expand= da el completo)"""
+    imagen_variantes = serializers.SerializerMethodField()
+    class Meta:
+        model = Producto
+        fields = ['id', 'nombre', 'precio', 'imagen', 'imagen_variantes']
+
+    def get_imagen_variantes(self, obj):
+        return urls_variantes(obj.imagen, self.context.get('request'))
+
+class ComboResumenSerializer(CamposDinamicosMixin, MetricasSerializerMixin, serializers.ModelSerializer):
+    """Combo anidado en pedidos y carritos (?expand= da el completo)"""
+    class Meta:
+        model = Combo
+        fields = ['id', 'nombre', 'precio_total']
+
 class ComboPersonalizadoProductoSerializer(serializers.ModelSerializer):
+    # Solo el id: los productos se resuelven juntos en validate_productos
+    producto = serializers.IntegerField(source='producto_id', min_value=1)
+    nombre = serializers.CharField(source='producto.nombre', read_only=True)
+    precio = serializers.DecimalField(source='producto.precio', max_digits=7, decimal_places=2, read_only=True)
+
     class Meta:
         model = ComboPersonalizadoProducto
-        fields = ["producto", "cantidad"]
+        fields = ["producto", "cantidad", "nombre", "precio"]
+
+class ComboPersonalizadoSerializer(CamposDinamicosMixin, MetricasSerializerMixin, serializers.ModelSerializer):
+    """
+    Combo armado por el usuario.
 
-class ComboPersonalizadoSerializer(serializers.ModelSerializer):
-    productos = ComboPersonalizadoProductoSerializer(many=True, write_only=True)
+    Los productos se validan con una sola consulta y las filas intermedias se
+    insertan con un bulk_create; conviene listar con
+    ``prefetch_related('combopersonalizadoproducto_set__producto')``.
+    """
+    productos = ComboPersonalizadoProductoSerializer(source="combopersonalizadoproducto_set", many=True)
 
     class Meta:
         model = ComboPersonalizado
         fields = ["id", "usuario", "nombre", "precio_total", "creado_en", "productos"]
         read_only_fields = ["usuario", "precio_total", "creado_en"]
 
-    def create(self, validated_data):
-        productos_data = validated_data.pop("productos")
-        combo = ComboPersonalizado.objects.create(**validated_data)
-        total = 0
-        for prod_data in productos_data:
-            producto = prod_data["producto"]
-            cantidad = prod_data.get("cantidad", 1)
-            ComboPersonalizadoProducto.objects.create(
-                combo=combo, producto=producto, cantidad=cantidad
+    def validate_productos(self, items):
+        ids = {item["producto_id"] for item in items}
+        productos = Producto.objects.in_bulk(ids)
+        faltantes = sorted(ids - productos.keys())
+        if faltantes:
+            raise serializers.ValidationError(
+                f"Productos inexistentes: {', '.join(str(pk) for pk in faltantes)}"
             )
-            total += producto.precio_base * cantidad
-        combo.precio_total = total
-        combo.save()
+        for item in items:
+            item["producto"] = productos[item.pop("producto_id")]
+        return items
+
+    def _guardar_productos(self, combo, items):
+        filas = ComboPersonalizadoProducto.objects.bulk_create([
+            ComboPersonalizadoProducto(combo=combo, producto=item["producto"], cantidad=item.get("cantidad", 1))
+            for item in items
+        ])
+        return filas
+
+    @staticmethod
+    def _total(items):
+        # Con los productos que validate_productos acaba de leer, como el checkout:
+        # la tabla en caché de este proceso puede estar desactualizada
+        tabla = precios.TablaPrecios(None, {item["producto"].id: item["producto"].precio for item in items}, {}, {})
+        return tabla.total([
+            {"producto_id": item["producto"].id, "cantidad": item.get("cantidad", 1)} for item in items
+        ])
+
+    def create(self, validated_data):
+        items = validated_data.pop("combopersonalizadoproducto_set")
+        with transaction.atomic():
+            combo = ComboPersonalizado.objects.create(precio_total=self._total(items), **validated_data)
+            filas = self._guardar_productos(combo, items)
+        # La respuesta se serializa sin volver a consultar las filas recién creadas
+        combo._prefetched_objects_cache = {"combopersonalizadoproducto_set": filas}
         return combo
+
+    def update(self, instance, validated_data):
+        items = validated_data.pop("combopersonalizadoproducto_set", None)
+        with transaction.atomic():
+            if items is not None:
+                ComboPersonalizadoProducto.objects.filter(combo=instance).delete()
+                instance.precio_total = self._total(items)
+            instance = super().update(instance, validated_data)
+            if items is not None:
+                self._guardar_productos(instance, items)
+        return instance
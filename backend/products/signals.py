@@ -0,0 +1,35 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from restaurant_api.imagenes import procesar_al_subir
+from .cache import bump_catalog_version
+from .models import Producto, Ingrediente, Combo, ProductoIngrediente, ComboProducto
+
+CATALOG_MODELS = (Producto, Ingrediente, Combo, ProductoIngrediente, ComboProducto)
+
+
+def invalidar_catalogo():
+    # Se invalida de inmediato y otra vez al confirmar la transacción, para
+    # descartar instantáneas construidas por otra petición con datos previos
+    bump_catalog_version()
+    transaction.on_commit(bump_catalog_version)
+
+
+def catalogo_modificado(sender, **kwargs):
+    invalidar_catalogo()
+
+
+for model in CATALOG_MODELS:
+    post_save.connect(catalogo_modificado, sender=model, dispatch_uid=f'catalog_save_{model.__name__}')
+    post_delete.connect(catalogo_modificado, sender=model, dispatch_uid=f'catalog_delete_{model.__name__}')
+
+
+procesar_al_subir(Producto, 'imagen')
+
+
+@receiver(m2m_changed, sender=Producto.ingredientes.through)
+@receiver(m2m_changed, sender=Combo.productos.through)
+def relacion_catalogo_modificada(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidar_catalogo()
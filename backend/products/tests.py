@@ -1,3 +1,399 @@
-from django.test import TestCase
+import tempfile
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APITestCase
+
+from restaurant_api.imagenes import nombre_variante
+from restaurant_api.media import servir_media
+
+from .models import Ingrediente, Producto, Combo, ProductoIngrediente, ComboProducto
+from .precios import get_tabla
+
+
+def crear_menu(n_productos, n_combos, ingredientes_por_producto=3):
+    """Crear un catálogo de prueba con ingredientes y combos"""
+    ingredientes = [
+        Ingrediente.objects.create(nombre=f'Ingrediente {i}', costos_extras=Decimal('0.50'))
+        for i in range(ingredientes_por_producto * 2)
+    ]
+    productos = []
+    for i in range(n_productos):
+        producto = Producto.objects.create(nombre=f'Producto {i}', precio=Decimal('10.00'))
+        for ingrediente in ingredientes[:ingredientes_por_producto]:
+            ProductoIngrediente.objects.create(producto=producto, ingrediente=ingrediente)
+        productos.append(producto)
+    for i in range(n_combos):
+        combo = Combo.objects.create(nombre=f'Combo {i}', precio_total=Decimal('25.00'))
+        for producto in productos[:3]:
+            ComboProducto.objects.create(combo=combo, producto=producto)
+    return productos
+
+
+class MenuQueryCountTests(APITestCase):
+    """El número de consultas del menú no debe crecer con el tamaño del catálogo"""
+
+    def setUp(self):
+        cache.clear()
+
+    def contar_consultas(self, url):
+        # Medir la construcción del listado, no la instantánea cacheada
+        cache.clear()
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_productos_consultas_constantes(self):
+        url = reverse('producto-list')
+        crear_menu(n_productos=2, n_combos=0)
+        pocos = self.contar_consultas(url)
+        crear_menu(n_productos=20, n_combos=0)
+        muchos = self.contar_consultas(url)
+        self.assertEqual(pocos, muchos)
+        # Listado y tabla de calificaciones que se superpone a la instantánea
+        self.assertLessEqual(muchos, 3)
+
+    def test_combos_consultas_constantes(self):
+        url = reverse('combo-list')
+        crear_menu(n_productos=3, n_combos=2)
+        pocos = self.contar_consultas(url)
+        crear_menu(n_productos=6, n_combos=15)
+        muchos = self.contar_consultas(url)
+        self.assertEqual(pocos, muchos)
+        self.assertLessEqual(muchos, 4)
+
+    def test_combo_incluye_ingredientes_de_productos(self):
+        crear_menu(n_productos=3, n_combos=1)
+        response = self.client.get(reverse('combo-list'))
+        productos = response.data[0]['productos']
+        self.assertEqual(len(productos), 3)
+        self.assertEqual(len(productos[0]['ingredientes']), 3)
+
+
+class MenuSnapshotTests(APITestCase):
+    """Instantánea versionada del catálogo con soporte de ETag"""
+
+    def setUp(self):
+        cache.clear()
+        crear_menu(n_productos=3, n_combos=1)
+        self.url = reverse('producto-list')
+
+    def test_segunda_lectura_sin_consultas(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(len(response.data), 3)
+
+    def test_etag_devuelve_304(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_cambio_en_catalogo_invalida_snapshot(self):
+        etag = self.client.get(self.url)['ETag']
+        Producto.objects.create(nombre='Nuevo', precio=Decimal('5.00'))
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(len(response.data), 4)
+
+    def test_cambio_en_relacion_invalida_combos(self):
+        url = reverse('combo-list')
+        etag = self.client.get(url)['ETag']
+        combo = Combo.objects.first()
+        combo.productos.remove(Producto.objects.first())
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data[0]['productos']), 2)
+
+
+class CatalogoCamposTests(APITestCase):
+    """?fields= en el catálogo, con una instantánea por variante"""
+
+    def setUp(self):
+        cache.clear()
+        crear_menu(n_productos=2, n_combos=1)
+
+    def test_fields_productos(self):
+        url = reverse('producto-list')
+        completo = self.client.get(url).data
+        recortado = self.client.get(url + '?fields=id,nombre').data
+        self.assertIn('ingredientes', completo[0])
+        self.assertEqual(set(recortado[0]), {'id', 'nombre'})
+        self.assertNotEqual(self.client.get(url)['ETag'], self.client.get(url + '?fields=id,nombre')['ETag'])
+
+    def test_fields_desconocidos(self):
+        url = reverse('producto-list')
+        response = self.client.get(url + '?fields=id,no_existe,ingredientes.tampoco')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('ingredientes.tampoco, no_existe', response.data['error'])
+
+    def test_expand_sin_efecto_no_crea_variantes(self):
+        url = reverse('producto-list')
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url + '?expand=ingredientes,cualquier.cosa')
+        self.assertEqual(response['ETag'], self.client.get(url)['ETag'])
+
+    def test_fields_anidados_en_combos(self):
+        data = self.client.get(reverse('combo-list') + '?fields=nombre,productos.nombre').data
+        self.assertEqual(data[0], {'nombre': 'Combo 0', 'productos': [
+            {'nombre': 'Producto 0'}, {'nombre': 'Producto 1'},
+        ]})
+
+
+def imagen_de_prueba(nombre='foto.jpg', tamano=(2000, 1000), formato='JPEG'):
+    contenido = BytesIO()
+    Image.new('RGB', tamano, 'orange').save(contenido, formato)
+    return SimpleUploadedFile(nombre, contenido.getvalue(), content_type=f'image/{formato.lower()}')
+
+
+class VariantesImagenTests(APITestCase):
+    """Miniaturas y WebP generados al subir la imagen de un producto"""
+
+    def setUp(self):
+        cache.clear()
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        ajustes = override_settings(MEDIA_ROOT=directorio.name)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.producto = Producto.objects.create(nombre='Pizza', precio=Decimal('12.00'), imagen=imagen_de_prueba())
+
+    def test_variantes_generadas(self):
+        storage = self.producto.imagen.storage
+        for variante, lado in settings.IMAGE_VARIANTS.items():
+            for extension in ('jpg', 'webp'):
+                nombre = nombre_variante(self.producto.imagen.name, variante, extension)
+                with storage.open(nombre) as archivo, Image.open(archivo) as imagen:
+                    self.assertEqual(imagen.size, (lado, lado // 2))
+                    self.assertEqual(imagen.format, 'WEBP' if extension == 'webp' else 'JPEG')
+
+    def test_comando_regenera_las_variantes(self):
+        storage = self.producto.imagen.storage
+        nombre = nombre_variante(self.producto.imagen.name, 'large', 'webp')
+        storage.delete(nombre)
+        call_command('generar_variantes', stdout=StringIO())
+        self.assertTrue(storage.exists(nombre))
+
+    def test_variantes_distintas_por_extension(self):
+        nombres = {
+            nombre_variante(original, 'thumb', extension)
+            for original in ('productos/pizza.jpg', 'productos/pizza.png', 'productos/pizza.jpeg')
+            for extension in ('jpg', 'webp')
+        }
+        self.assertEqual(len(nombres), 6)
+
+    def test_no_sobrescribe_variantes_publicadas(self):
+        storage = self.producto.imagen.storage
+        nombre = nombre_variante(self.producto.imagen.name, 'thumb', 'webp')
+        with storage.open(nombre) as archivo:
+            publicada = archivo.read()
+        with mock.patch('restaurant_api.imagenes._guardar') as guardar:
+            call_command('generar_variantes', stdout=StringIO())
+        guardar.assert_not_called()
+        with storage.open(nombre) as archivo:
+            self.assertEqual(archivo.read(), publicada)
+
+    def test_guardar_sin_cambiar_la_imagen_no_regenera(self):
+        with mock.patch('restaurant_api.imagenes.generar_variantes') as generar:
+            self.producto.nombre = 'Pizza grande'
+            self.producto.save()
+        generar.assert_not_called()
+
+    def test_serializer_expone_las_urls(self):
+        data = self.client.get(reverse('producto-list')).data[0]
+        thumb = data['imagen_variantes']['thumb']
+        self.assertTrue(thumb['webp'].startswith('http://testserver/media/productos/variantes/'))
+        self.assertTrue(thumb['webp'].endswith(f'{self.producto.imagen.name.rsplit("/", 1)[1]}.thumb.webp'))
+
+    def test_media_con_cache_inmutable(self):
+        nombre = nombre_variante(self.producto.imagen.name, 'thumb', 'webp')
+        response = servir_media(RequestFactory().get(f'/media/{nombre}'), nombre)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], f'public, max-age={settings.MEDIA_CACHE_MAX_AGE}, immutable')
+
+
+class BusquedaTests(APITestCase):
+    """Búsqueda de texto en el menú, con filtros y paginación"""
+
+    def setUp(self):
+        self.url = reverse('producto-buscar')
+        queso = Ingrediente.objects.create(nombre='Queso', costos_extras=Decimal('1.00'))
+        self.jamon = Ingrediente.objects.create(nombre='Jamón', costos_extras=Decimal('1.50'))
+        self.hawaiana = Producto.objects.create(
+            nombre='Pizza hawaiana', descripcion='Con piña', precio=Decimal('14.00'), es_personalizable=True
+        )
+        self.margarita = Producto.objects.create(
+            nombre='Pizza margarita', descripcion='Albahaca fresca', precio=Decimal('11.00'), es_personalizable=False
+        )
+        self.calzone = Producto.objects.create(
+            nombre='Calzone', descripcion='Horneado, como una pizza cerrada', precio=Decimal('12.00')
+        )
+        self.ensalada = Producto.objects.create(nombre='Ensalada', precio=Decimal('8.00'))
+        ProductoIngrediente.objects.create(producto=self.hawaiana, ingrediente=self.jamon)
+        ProductoIngrediente.objects.create(producto=self.hawaiana, ingrediente=queso)
+        ProductoIngrediente.objects.create(producto=self.calzone, ingrediente=self.jamon)
+
+    def buscar(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return [producto['nombre'] for producto in response.data['results']]
+
+    def test_nombre_pesa_mas_que_la_descripcion(self):
+        resultados = self.buscar(q='pizza')
+        self.assertCountEqual(resultados[:2], ['Pizza hawaiana', 'Pizza margarita'])
+        self.assertEqual(resultados[2:], ['Calzone'])
+
+    def test_busca_en_ingredientes_prefijos_y_sin_tildes(self):
+        self.assertCountEqual(self.buscar(q='jamon'), ['Calzone', 'Pizza hawaiana'])
+        self.assertEqual(self.buscar(q='piz jam'), ['Pizza hawaiana', 'Calzone'])
+        self.assertEqual(self.buscar(q='"albahaca" OR'), [])
+
+    def test_indice_sigue_a_los_cambios(self):
+        self.jamon.nombre = 'Pepperoni'
+        self.jamon.save()
+        self.assertEqual(self.buscar(q='jamon'), [])
+        self.assertCountEqual(self.buscar(q='pepperoni'), ['Calzone', 'Pizza hawaiana'])
+        self.calzone.delete()
+        self.assertEqual(self.buscar(q='pepperoni'), ['Pizza hawaiana'])
+
+    def test_filtros_de_precio_y_personalizable(self):
+        self.assertEqual(self.buscar(q='pizza', precio_max='12'), ['Pizza margarita', 'Calzone'])
+        self.assertEqual(self.buscar(precio_min='9', es_personalizable='false'), ['Pizza margarita'])
+        response = self.client.get(self.url, {'precio_min': 'barato'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_paginado(self):
+        response = self.client.get(self.url, {'page_size': 3})
+        self.assertEqual(response.data['count'], 4)
+        self.assertEqual(len(response.data['results']), 3)
+        self.assertIsNotNone(response.data['next'])
+        self.assertIn('ingredientes', response.data['results'][0])
+
+    def test_buscar_combos(self):
+        combo = Combo.objects.create(nombre='Combo familiar', precio_total=Decimal('30.00'))
+        ComboProducto.objects.create(combo=combo, producto=self.hawaiana)
+        Combo.objects.create(nombre='Combo ligero', precio_total=Decimal('15.00'))
+        response = self.client.get(reverse('combo-buscar'), {'q': 'hawaiana', 'precio_min': '20'})
+        self.assertEqual([c['nombre'] for c in response.data['results']], ['Combo familiar'])
+
+
+class ComboPersonalizadoTests(APITestCase):
+    """Combos armados por el usuario: creación en bloque y listado precargado"""
+
+    def setUp(self):
+        self.usuario = get_user_model().objects.create_user(
+            username='cliente', email='cliente@example.com', password='clave-segura-123'
+        )
+        self.client.force_authenticate(self.usuario)
+        self.url = reverse('combo-personalizado-list')
+        self.productos = crear_menu(n_productos=5, n_combos=0, ingredientes_por_producto=0)
+
+    def crear(self, productos):
+        return self.client.post(self.url, {'nombre': 'Mi combo', 'productos': productos}, format='json')
+
+    def test_crear_en_consultas_constantes(self):
+        items = [{'producto': p.id, 'cantidad': 2} for p in self.productos]
+        get_tabla()
+        # Autenticación forzada: SELECT de productos, SAVEPOINT, INSERT combo, INSERT filas, RELEASE
+        with self.assertNumQueries(5):
+            response = self.crear(items)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['precio_total'], '100.00')
+        self.assertEqual(response.data['productos'][0], {
+            'producto': self.productos[0].id, 'cantidad': 2, 'nombre': 'Producto 0', 'precio': '10.00',
+        })
+
+    def test_total_con_tabla_de_precios_desactualizada(self):
+        get_tabla()
+        # Como un cambio hecho en otro proceso: la versión de esta caché no cambia
+        Producto.objects.filter(pk=self.productos[0].pk).update(precio=Decimal('12.50'))
+        response = self.crear([{'producto': self.productos[0].id, 'cantidad': 2}])
+        self.assertEqual(response.data['precio_total'], '25.00')
+
+    def test_producto_inexistente(self):
+        response = self.crear([{'producto': self.productos[0].id}, {'producto': 999}])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('999', str(response.data['productos']))
+        self.assertFalse(self.usuario.combos_personalizados.exists())
+
+    def test_listado_precargado(self):
+        for _ in range(3):
+            self.crear([{'producto': p.id} for p in self.productos])
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url)
+        self.assertEqual(len(response.data['results']), 3)
+        self.assertEqual(len(response.data['results'][0]['productos']), 5)
+
+    def test_actualizar_contenido(self):
+        combo_id = self.crear([{'producto': self.productos[0].id}]).data['id']
+        response = self.client.patch(
+            reverse('combo-personalizado-detail', args=[combo_id]),
+            {'productos': [{'producto': self.productos[1].id, 'cantidad': 3}]}, format='json',
+        )
+        self.assertEqual(response.data['precio_total'], '30.00')
+        self.assertEqual([p['producto'] for p in response.data['productos']], [self.productos[1].id])
+
+    def test_actualizar_en_consultas_constantes(self):
+        combo_id = self.crear([{'producto': self.productos[0].id}]).data['id']
+        get_tabla()
+        # Combo y filas, SELECT de productos, SAVEPOINT, DELETE, UPDATE, INSERT,
+        # RELEASE y de nuevo combo y filas (con sus productos) para la respuesta
+        with self.assertNumQueries(10):
+            response = self.client.put(
+                reverse('combo-personalizado-detail', args=[combo_id]),
+                {'nombre': 'Otro combo', 'productos': [{'producto': p.id} for p in self.productos]},
+                format='json',
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([p['nombre'] for p in response.data['productos']], [p.nombre for p in self.productos])
+
+
+class PreciosTests(APITestCase):
+    """Tabla de precios en memoria, invalidada con el catálogo"""
+
+    def setUp(self):
+        self.producto = Producto.objects.create(nombre='Hamburguesa', precio=Decimal('8.00'))
+        self.combo = Combo.objects.create(nombre='Combo', precio_total=Decimal('20.00'))
+        self.extra = Ingrediente.objects.create(nombre='Queso', costos_extras=Decimal('1.25'))
+
+    def test_tasar_sin_consultas(self):
+        get_tabla()
+        with self.assertNumQueries(0):
+            lineas = get_tabla().tasar([
+                {'producto_id': self.producto.id, 'ingredientes': [self.extra.id], 'cantidad': 2},
+                {'combo_id': self.combo.id},
+            ])
+        self.assertEqual(lineas, [(Decimal('9.25'), Decimal('18.50')), (Decimal('20.00'), Decimal('20.00'))])
+
+    def test_cambio_de_precio_invalida_la_tabla(self):
+        self.assertEqual(get_tabla().total([{'producto_id': self.producto.id}]), Decimal('8.00'))
+        self.producto.precio = Decimal('9.50')
+        self.producto.save()
+        self.assertEqual(get_tabla().total([{'producto_id': self.producto.id}]), Decimal('9.50'))
+
+    @override_settings(CATALOG_SNAPSHOT_TIMEOUT=0)
+    def test_tabla_del_hilo_caduca(self):
+        get_tabla()
+        # Como un cambio hecho en otro proceso: la versión de esta caché no cambia
+        Producto.objects.filter(pk=self.producto.pk).update(precio=Decimal('9.50'))
+        self.assertEqual(get_tabla().total([{'producto_id': self.producto.id}]), Decimal('9.50'))
+
+    def test_ids_inexistentes(self):
+        with self.assertRaises(ValidationError):
+            get_tabla().tasar([{'producto_id': self.producto.id, 'ingredientes': [9999]}])
@@ -1,33 +1,127 @@
-from rest_framework import viewsets, permissions, generics
-from .models import Producto, Ingrediente, Combo, ComboPersonalizado
+from rest_framework import viewsets, permissions, generics, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from django.db.models import Prefetch
+from django.utils.http import parse_etags
+from restaurant_api.campos import campos_desconocidos, campos_solicitados, expansiones, expansiones_validas
+from restaurant_api.pagination import BusquedaPagination, CreadoEnCursorPagination
+from restaurant_api.throttling import CatalogoThrottle
+from .busqueda import buscar_combos, buscar_productos, filtrar_catalogo
+from .cache import get_menu_snapshot
+from .models import Producto, Ingrediente, Combo, ComboPersonalizado, ComboPersonalizadoProducto
 from .serializers import ProductoSerializer, IngredienteSerializer, ComboSerializer, ComboPersonalizadoSerializer
 
-class ProductoViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = Producto.objects.all()
+class CatalogoSnapshotMixin:
+    """Servir el listado desde la instantánea cacheada del catálogo, con ETag"""
+    snapshot_nombre = None
+    # Ruta de los productos cuya calificación se superpone a la instantánea
+    # ('' los propios elementos; None si el listado no tiene calificaciones)
+    snapshot_calificaciones = None
+    # El menú completo se sirve desde la instantánea, sin paginar
+    pagination_class = None
+    throttle_classes = [CatalogoThrottle]
+
+    def list(self, request, *args, **kwargs):
+        # Solo nombres que existen: cada variante es una instantánea distinta en caché
+        serializer = self.get_serializer_class()()
+        campos = campos_solicitados(request)
+        desconocidos = campos_desconocidos(serializer, campos)
+        if desconocidos:
+            return Response(
+                {'error': f"Campos desconocidos en fields: {', '.join(sorted(desconocidos))}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        expand = expansiones_validas(serializer, expansiones(request))
+
+        def build(campos):
+            context = {**self.get_serializer_context(), 'fields': campos, 'expand': expand}
+            return self.get_serializer(self.filter_queryset(self.get_queryset()), many=True, context=context).data
+
+        data, etag = get_menu_snapshot(
+            self.snapshot_nombre, request, build, campos, expand, self.snapshot_calificaciones
+        )
+        # Comparación débil: la compresión convierte el ETag en W/"..."
+        etags_cliente = {e.removeprefix('W/') for e in parse_etags(request.headers.get('If-None-Match', ''))}
+        if etag in etags_cliente or '*' in etags_cliente:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(data)
+        response['ETag'] = etag
+        return response
+
+class BusquedaCatalogoMixin:
+    """Acción ``buscar/`` con texto, filtros de precio y de personalización, paginada"""
+    campo_precio = 'precio'
+    # Función (queryset, texto) -> queryset que aplica la búsqueda de texto
+    buscar_texto = None
+
+    @action(detail=False, methods=['get'], pagination_class=BusquedaPagination)
+    def buscar(self, request):
+        """Buscar en el catálogo (?q=&precio_min=&precio_max=&es_personalizable=)"""
+        try:
+            queryset = filtrar_catalogo(self.get_queryset(), request.query_params, self.campo_precio)
+        except ValueError:
+            return Response(
+                {'error': 'precio_min y precio_max deben ser números y es_personalizable true o false'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        queryset = self.buscar_texto(queryset, request.query_params.get('q', ''))
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+class ProductoViewSet(BusquedaCatalogoMixin, CatalogoSnapshotMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = Producto.objects.select_related('resumen_calificacion').prefetch_related('ingredientes')
+    snapshot_nombre = 'productos'
+    snapshot_calificaciones = ''
     serializer_class = ProductoSerializer
     permission_classes = [permissions.AllowAny]
+    buscar_texto = staticmethod(buscar_productos)
 
-class IngredienteViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredienteViewSet(CatalogoSnapshotMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Ingrediente.objects.all()
+    snapshot_nombre = 'ingredientes'
     serializer_class = IngredienteSerializer
 
-class ComboViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = Combo.objects.all()
+class ComboViewSet(BusquedaCatalogoMixin, CatalogoSnapshotMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = Combo.objects.prefetch_related(
+        Prefetch('productos', queryset=Producto.objects.select_related('resumen_calificacion')),
+        'productos__ingredientes',
+    )
+    snapshot_nombre = 'combos'
+    snapshot_calificaciones = 'productos'
     serializer_class = ComboSerializer
     permission_classes = [permissions.AllowAny]
+    campo_precio = 'precio_total'
+    buscar_texto = staticmethod(buscar_combos)
 
 
 
+def combos_personalizados(usuario):
+    """Combos del usuario con su contenido precargado en una sola consulta adicional"""
+    return ComboPersonalizado.objects.filter(usuario=usuario).prefetch_related(
+        Prefetch(
+            'combopersonalizadoproducto_set',
+            queryset=ComboPersonalizadoProducto.objects.select_related('producto').order_by('id'),
+        )
+    )
+
 class ComboPersonalizadoViewSet(viewsets.ModelViewSet):
     serializer_class = ComboPersonalizadoSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = CreadoEnCursorPagination
 
     def get_queryset(self):
-        return ComboPersonalizado.objects.filter(usuario=self.request.user)
+        return combos_personalizados(self.request.user)
 
     def perform_create(self, serializer):
         serializer.save(usuario=self.request.user)
 
+    def perform_update(self, serializer):
+        combo = serializer.save()
+        # UpdateModelMixin vacía la precarga del combo editado: la respuesta usa uno releído
+        serializer.instance = self.get_queryset().get(pk=combo.pk)
+
 class ComboPersonalizadoCreateView(generics.CreateAPIView):
     serializer_class = ComboPersonalizadoSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -38,7 +132,8 @@ class ComboPersonalizadoCreateView(generics.CreateAPIView):
 class ComboPersonalizadoListView(generics.ListAPIView):
     serializer_class = ComboPersonalizadoSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = CreadoEnCursorPagination
 
     def get_queryset(self):
-        return ComboPersonalizado.objects.filter(usuario=self.request.user)
+        return combos_personalizados(self.request.user)
 
@@ -2,6 +2,8 @@
 ASGI config for restaurant_api project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+The Server-Sent Events endpoint (/api/eventos/) needs an ASGI server, e.g.
+``uvicorn restaurant_api.asgi:application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -0,0 +1,79 @@
+"""
+Autenticación JWT con el usuario en caché.
+
+``JWTAuthentication`` consulta ``users.User`` en cada petición autenticada.
+``JWTAuthenticationCacheada`` guarda el usuario en la caché por defecto
+durante ``AUTH_USER_CACHE_TIMEOUT`` segundos, bajo una clave con el id del
+usuario, el ``iat`` del token y la versión del usuario. Cualquier cambio en el
+usuario (perfil, contraseña, desactivación...) cambia la versión, así que una
+petición que leyó el usuario antes del cambio nunca deja en caché datos viejos
+con la clave nueva.
+
+La versión se borra en la caché del proceso que hace el cambio; con la caché
+en memoria de cada proceso (``CACHE_BACKEND`` sin configurar) los demás no lo
+ven hasta que su entrada expira. Por eso solo las lecturas (GET, HEAD,
+OPTIONS) usan la caché: las escrituras cargan el usuario de la base, así un
+usuario desactivado o con otra contraseña no puede modificar nada y las vistas
+guardan ``request.user`` sin deshacer cambios de otro proceso.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+
+def _clave_version(user_id):
+    return f'auth:usuario:{user_id}:version'
+
+
+def _version(user_id):
+    clave = _clave_version(user_id)
+    version = cache.get(clave)
+    if version is None:
+        # Basada en el reloj, como la versión del catálogo, para no reutilizar
+        # una versión anterior si la clave se pierde
+        cache.add(clave, time.time_ns(), timeout=None)
+        version = cache.get(clave)
+    return version
+
+
+def invalidar_usuario(user_id):
+    """Descartar el usuario cacheado, ahora y otra vez al confirmar la transacción"""
+    cache.delete(_clave_version(user_id))
+    transaction.on_commit(lambda: cache.delete(_clave_version(user_id)))
+
+
+class JWTAuthenticationCacheada(JWTAuthentication):
+    """``JWTAuthentication`` que resuelve el usuario desde la caché en las lecturas"""
+    # DRF crea una instancia por petición
+    lectura = False
+
+    def authenticate(self, request):
+        self.lectura = request.method in SAFE_METHODS
+        return super().authenticate(request)
+
+    def get_user(self, validated_token):
+        timeout = settings.AUTH_USER_CACHE_TIMEOUT
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if not timeout or user_id is None:
+            return super().get_user(validated_token)
+
+        clave = f"auth:usuario:{user_id}:{validated_token.get('iat')}:{_version(user_id)}"
+        user = cache.get(clave) if self.lectura else None
+        if user is None:
+            # Solo se cachean usuarios que pasaron todas las comprobaciones
+            user = super().get_user(validated_token)
+            cache.set(clave, user, timeout=timeout)
+        elif api_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+            api_settings.REVOKE_TOKEN_CLAIM
+        ) != get_md5_hash_password(user.password):
+            # Depende del token, así que se comprueba también con el usuario cacheado
+            raise AuthenticationFailed(_("The user's password has been changed."), code='password_changed')
+        return user
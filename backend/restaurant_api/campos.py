@@ -0,0 +1,142 @@
+"""
+Selección de campos en las respuestas de la API.
+
+``?fields=id,total,items.cantidad`` limita los campos devueltos; un nombre con
+punto se aplica al serializer anidado y conserva el campo padre.
+``?expand=items.producto`` sustituye la representación compacta de un objeto
+anidado por la completa, en los campos declarados en ``Meta.expandibles``.
+
+Solo afecta a las lecturas (GET/HEAD): en las escrituras los serializers
+conservan todos sus campos para validar.
+"""
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.serializers import ListSerializer
+
+
+def _lista(valor):
+    return frozenset(parte.strip() for parte in valor.split(',') if parte.strip())
+
+
+def _parametro(request, nombre):
+    if request is None or request.method not in SAFE_METHODS:
+        return frozenset()
+    params = getattr(request, 'query_params', request.GET)
+    return _lista(params.get(nombre, ''))
+
+
+def campos_solicitados(request):
+    return _parametro(request, 'fields')
+
+
+def expansiones(request):
+    return _parametro(request, 'expand')
+
+
+def _unir(prefijo, nombre):
+    return f'{prefijo}.{nombre}' if prefijo else nombre
+
+
+def _hijos(rutas, prefijo):
+    """Primer segmento de cada ruta que cuelga de ``prefijo``"""
+    if prefijo:
+        rutas = [ruta[len(prefijo) + 1:] for ruta in rutas if ruta.startswith(prefijo + '.')]
+    return {ruta.split('.', 1)[0] for ruta in rutas}
+
+
+def incluye(request, ruta):
+    """Si la respuesta incluirá el campo ``ruta`` (``'items'``, ``'items.producto'``...)"""
+    campos = campos_solicitados(request)
+    partes = ruta.split('.')
+    for i, parte in enumerate(partes):
+        permitidos = _hijos(campos, '.'.join(partes[:i]))
+        if permitidos and parte not in permitidos:
+            return False
+    return True
+
+
+def expandido(request, ruta):
+    """Si la respuesta incluirá ``ruta`` con su representación completa"""
+    return ruta in expansiones(request) and incluye(request, ruta)
+
+
+def podar(data, campos, prefijo=''):
+    """Aplicar ``?fields=`` a datos ya serializados (dicts y listas)"""
+    if isinstance(data, list):
+        return [podar(elemento, campos, prefijo) for elemento in data]
+    if not isinstance(data, dict):
+        return data
+    permitidos = _hijos(campos, prefijo)
+    return {
+        nombre: podar(valor, campos, _unir(prefijo, nombre))
+        for nombre, valor in data.items()
+        if not permitidos or nombre in permitidos
+    }
+
+
+def _recorrer(serializer, ruta, expand):
+    """Campo de ``serializer`` en ``ruta``, o ``None`` si no existe"""
+    campo, actual = serializer, ''
+    for parte in ruta.split('.'):
+        padre = campo.child if isinstance(campo, ListSerializer) else campo
+        campos = getattr(padre, 'fields', {})
+        if parte not in campos:
+            return None
+        actual = _unir(actual, parte)
+        completo = getattr(getattr(padre, 'Meta', None), 'expandibles', {}).get(parte)
+        campo = completo() if completo and actual in expand else campos[parte]
+    return campo
+
+
+def campos_desconocidos(serializer, campos, expand=frozenset()):
+    """Rutas de ``?fields=`` que no existen en ``serializer`` (sin filtrar)"""
+    return {ruta for ruta in campos if _recorrer(serializer, ruta, expand) is None}
+
+
+def expansiones_validas(serializer, expand):
+    """Rutas de ``?expand=`` que ``serializer`` sabe expandir; el resto no tiene efecto"""
+    validas = set()
+    for ruta in expand:
+        padre, _, nombre = ruta.rpartition('.')
+        campo = _recorrer(serializer, padre, expand) if padre else serializer
+        campo = campo.child if isinstance(campo, ListSerializer) else campo
+        if nombre in getattr(getattr(campo, 'Meta', None), 'expandibles', {}):
+            validas.add(ruta)
+    return frozenset(validas)
+
+
+class CamposDinamicosMixin:
+    """
+    Aplica ``?fields=`` y ``?expand=`` de la petición del contexto.
+
+    ``Meta.expandibles`` asocia cada campo anidado compacto con el serializer
+    de su representación completa. El contexto puede fijar ``'fields'`` o
+    ``'expand'`` (conjuntos de rutas) en lugar de leerlos de la petición.
+    """
+
+    def _ruta(self):
+        partes = []
+        campo = self
+        while campo.parent is not None:
+            if campo.field_name:
+                partes.append(campo.field_name)
+            campo = campo.parent
+        return '.'.join(reversed(partes))
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        campos = self.context.get('fields', campos_solicitados(request))
+        expand = self.context.get('expand', expansiones(request))
+        if not campos and not expand:
+            return fields
+
+        ruta = self._ruta()
+        for nombre, completo in getattr(self.Meta, 'expandibles', {}).items():
+            if nombre in fields and _unir(ruta, nombre) in expand:
+                fields[nombre] = completo(many=isinstance(fields[nombre], ListSerializer), read_only=True)
+
+        permitidos = _hijos(campos, ruta)
+        if permitidos:
+            for nombre in set(fields) - permitidos:
+                del fields[nombre]
+        return fields
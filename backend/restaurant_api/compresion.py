@@ -0,0 +1,104 @@
+"""
+Compresión de respuestas negociada con ``Accept-Encoding``.
+
+Como ``GZipMiddleware`` de Django, pero con brotli cuando el cliente lo acepta
+y el módulo ``brotli`` está instalado (``requirements-opcional.txt``), respetando los
+valores ``q`` y solo a partir de ``COMPRESSION_MIN_SIZE`` bytes: por debajo
+el ahorro no compensa la CPU. Las respuestas en streaming (eventos SSE,
+archivos de media) se envían tal cual.
+
+gzip añade bytes aleatorios a la cabecera contra BREACH, igual que Django;
+brotli no tiene esa defensa, así que solo se usa con respuestas sin secretos
+que puedan ir junto a datos del atacante. Las páginas HTML (admin, API
+navegable), las que fijan cookies y las que usan el token CSRF se comprimen
+siempre con gzip. Las respuestas de ``/api/token/`` quedan por debajo del
+umbral por defecto.
+"""
+import re
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_string
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - dependencia opcional
+    brotli = None
+
+_CODIFICACION = re.compile(r'^\s*([\w*-]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?\s*$')
+
+
+def codificaciones_aceptadas(cabecera):
+    """``{codificación: q}`` de una cabecera ``Accept-Encoding``"""
+    aceptadas = {}
+    for parte in cabecera.lower().split(','):
+        coincidencia = _CODIFICACION.match(parte)
+        if coincidencia:
+            try:
+                q = float(coincidencia.group(2) or 1)
+            except ValueError:
+                continue
+            aceptadas[coincidencia.group(1)] = q
+    return aceptadas
+
+
+def elegir_codificacion(cabecera, permitir_brotli=True):
+    """Mejor codificación disponible para ``cabecera``, o ``None``"""
+    aceptadas = codificaciones_aceptadas(cabecera)
+    comodin = aceptadas.get('*', 0)
+    disponibles = ['br', 'gzip'] if brotli is not None and permitir_brotli else ['gzip']
+    # A igual q se prefiere brotli, que comprime más el JSON
+    mejor, mejor_q = None, 0
+    for codificacion in disponibles:
+        q = aceptadas.get(codificacion, comodin)
+        if q > mejor_q:
+            mejor, mejor_q = codificacion, q
+    return mejor
+
+
+def puede_llevar_secretos(request, response):
+    """Respuestas donde BREACH podría extraer un token: sin brotli"""
+    return (
+        response.get('Content-Type', '').startswith('text/html')
+        or bool(response.cookies)
+        or request.META.get('CSRF_COOKIE_NEEDS_UPDATE', False)
+    )
+
+
+def comprimir(contenido, codificacion):
+    if codificacion == 'br':
+        return brotli.compress(contenido, quality=settings.COMPRESSION_BROTLI_QUALITY)
+    return compress_string(contenido, max_random_bytes=100)
+
+
+class CompresionMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (
+            response.streaming
+            or response.has_header('Content-Encoding')
+            or len(response.content) < settings.COMPRESSION_MIN_SIZE
+        ):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        codificacion = elegir_codificacion(
+            request.META.get('HTTP_ACCEPT_ENCODING', ''),
+            permitir_brotli=not puede_llevar_secretos(request, response),
+        )
+        if codificacion is None:
+            return response
+        comprimido = comprimir(response.content, codificacion)
+        if len(comprimido) >= len(response.content):
+            return response
+        response.content = comprimido
+        response.headers['Content-Length'] = str(len(comprimido))
+        response.headers['Content-Encoding'] = codificacion
+        # La representación cambia: un ETag fuerte pasa a débil (RFC 9110 8.8.1)
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        return response
@@ -0,0 +1,118 @@
+"""
+Canal de eventos en tiempo real (cambios de pedidos, notificaciones nuevas).
+
+El código síncrono publica con ``emitir()``, que entrega el evento al
+confirmar la transacción. El endpoint SSE de notificaciones se suscribe a los
+grupos ``usuario:<id>`` y ``todos``.
+
+``EVENTS_CHANNEL_BACKEND`` elige la implementación. ``CanalMemoria`` solo
+llega a los clientes conectados al mismo proceso; con varios procesos o
+servidores hace falta un backend con la misma interfaz sobre un broker
+compartido (Redis pub/sub, LISTEN/NOTIFY de PostgreSQL...).
+"""
+import asyncio
+import logging
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+GRUPO_TODOS = 'todos'
+
+
+def grupo_usuario(usuario_id):
+    return f'usuario:{usuario_id}'
+
+
+class SuscripcionMemoria:
+    def __init__(self, canal, grupos, capacidad):
+        self.canal = canal
+        self.grupos = grupos
+        self.loop = asyncio.get_running_loop()
+        self.cola = asyncio.Queue(maxsize=capacidad)
+
+    def entregar(self, evento):
+        # Puede llamarse desde cualquier hilo: la cola solo se toca en su loop
+        try:
+            self.loop.call_soon_threadsafe(self._poner, evento)
+        except RuntimeError:
+            self.cerrar()  # El loop ya terminó
+
+    def _poner(self, evento):
+        if self.cola.full():
+            # Cliente lento: se descarta el evento más antiguo
+            self.cola.get_nowait()
+        self.cola.put_nowait(evento)
+
+    async def recibir(self, timeout):
+        """Siguiente evento, o ``None`` si no llega ninguno en ``timeout`` segundos"""
+        try:
+            return await asyncio.wait_for(self.cola.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def cerrar(self):
+        self.canal.desuscribir(self)
+
+
+class CanalMemoria:
+    """Canal en memoria del proceso"""
+
+    def __init__(self, capacidad=100):
+        self.capacidad = capacidad
+        self._suscripciones = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def publicar(self, grupo, evento):
+        with self._lock:
+            destinos = list(self._suscripciones.get(grupo, ()))
+        for suscripcion in destinos:
+            suscripcion.entregar(evento)
+
+    def suscribir(self, grupos):
+        """Crear una suscripción; debe llamarse desde un contexto async"""
+        suscripcion = SuscripcionMemoria(self, grupos, self.capacidad)
+        with self._lock:
+            for grupo in grupos:
+                self._suscripciones[grupo].add(suscripcion)
+        return suscripcion
+
+    def desuscribir(self, suscripcion):
+        with self._lock:
+            for grupo in suscripcion.grupos:
+                miembros = self._suscripciones.get(grupo)
+                if miembros is not None:
+                    miembros.discard(suscripcion)
+                    if not miembros:
+                        del self._suscripciones[grupo]
+
+
+_canal = None
+_canal_lock = threading.Lock()
+
+
+def get_canal():
+    global _canal
+    if _canal is None:
+        with _canal_lock:
+            if _canal is None:
+                _canal = import_string(settings.EVENTS_CHANNEL_BACKEND)()
+    return _canal
+
+
+def emitir(grupo, tipo, **datos):
+    """Publicar ``{'tipo': tipo, **datos}`` en ``grupo`` al confirmar la transacción"""
+    evento = {'tipo': tipo, **datos}
+
+    def publicar():
+        try:
+            get_canal().publicar(grupo, evento)
+        except Exception:
+            # Un fallo del canal no debe afectar a la petición que emitió
+            logger.exception('No se pudo publicar el evento %s', tipo)
+
+    transaction.on_commit(publicar)
@@ -0,0 +1,123 @@
+"""
+Variantes de las imágenes subidas (productos y perfiles).
+
+Al guardar una imagen nueva se generan, para cada tamaño de
+``IMAGE_VARIANTS``, una copia reducida en el formato original (JPEG, o PNG si
+tiene transparencia) y otra en WebP, junto al archivo original:
+
+    productos/pizza.jpg -> productos/variantes/pizza.jpg.thumb.jpg
+                           productos/variantes/pizza.jpg.thumb.webp
+
+Los nombres se derivan del nombre completo del original, extensión incluida
+(``pizza.png`` y ``pizza.jpeg`` tienen variantes distintas), así los
+serializers construyen las URLs sin consultar el almacenamiento. Como Django
+no reutiliza el nombre de un archivo que existe, todos los archivos de media
+pueden cachearse como inmutables; por lo mismo, una variante ya publicada
+nunca se sobrescribe. Cambiar la calidad o los tamaños solo afecta a las
+imágenes nuevas y a las variantes que falten.
+"""
+import posixpath
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db.models.signals import post_save, pre_save
+from PIL import Image, ImageOps
+
+FORMATOS = {'JPEG': 'jpg', 'PNG': 'png', 'WEBP': 'webp'}
+
+
+def _tiene_transparencia(imagen):
+    return imagen.mode in ('RGBA', 'LA', 'PA') or (imagen.mode == 'P' and 'transparency' in imagen.info)
+
+
+def nombre_variante(nombre, variante, extension):
+    directorio, archivo = posixpath.split(nombre)
+    # Ni la variante ni la extensión llevan puntos: el nombre identifica al original
+    return posixpath.join(directorio, 'variantes', f'{archivo}.{variante}.{extension}')
+
+
+def _formato_original(nombre):
+    # Se deduce del nombre para no abrir el archivo al serializar
+    return 'PNG' if nombre.lower().endswith('.png') else 'JPEG'
+
+
+def _guardar(storage, nombre, imagen, formato):
+    contenido = BytesIO()
+    opciones = {'JPEG': {'quality': 82, 'optimize': True, 'progressive': True},
+                'WEBP': {'quality': 80, 'method': 4},
+                'PNG': {'optimize': True}}[formato]
+    imagen.save(contenido, formato, **opciones)
+    storage.save(nombre, ContentFile(contenido.getvalue()))
+
+
+def generar_variantes(archivo):
+    """Generar las variantes de ``archivo`` (un FieldFile guardado) que aún no existen"""
+    storage = archivo.storage
+    formato = _formato_original(archivo.name)
+    pendientes = [
+        (variante, lado, nombre, fmt)
+        for variante, lado in settings.IMAGE_VARIANTS.items()
+        for nombre, fmt in (
+            (nombre_variante(archivo.name, variante, FORMATOS[formato]), formato),
+            (nombre_variante(archivo.name, variante, 'webp'), 'WEBP'),
+        )
+        if not storage.exists(nombre)
+    ]
+    if not pendientes:
+        return
+    with storage.open(archivo.name, 'rb') as origen:
+        imagen = ImageOps.exif_transpose(Image.open(origen))
+        imagen.load()
+    if formato == 'PNG' or _tiene_transparencia(imagen):
+        imagen = imagen.convert('RGBA')
+    else:
+        imagen = imagen.convert('RGB')
+
+    reducidas = {}
+    for variante, lado, nombre, fmt in pendientes:
+        if variante not in reducidas:
+            reducidas[variante] = imagen.copy()
+            # thumbnail() conserva la proporción y nunca amplía
+            reducidas[variante].thumbnail((lado, lado), Image.Resampling.LANCZOS)
+        reducida = reducidas[variante]
+        if fmt == 'JPEG' and reducida.mode == 'RGBA':
+            reducida = reducida.convert('RGB')
+        _guardar(storage, nombre, reducida, fmt)
+
+
+def urls_variantes(archivo, request=None):
+    """``{variante: {'original': url, 'webp': url}}``, o ``None`` sin imagen"""
+    if not archivo:
+        return None
+
+    def url(nombre):
+        ruta = archivo.storage.url(nombre)
+        return request.build_absolute_uri(ruta) if request is not None else ruta
+
+    extension = FORMATOS[_formato_original(archivo.name)]
+    return {
+        variante: {
+            'original': url(nombre_variante(archivo.name, variante, extension)),
+            'webp': url(nombre_variante(archivo.name, variante, 'webp')),
+        }
+        for variante in settings.IMAGE_VARIANTS
+    }
+
+
+def procesar_al_subir(model, campo):
+    """Generar las variantes cada vez que se guarda un archivo nuevo en ``model.campo``"""
+
+    def marcar(sender, instance, **kwargs):
+        archivo = getattr(instance, campo)
+        # Un archivo recién asignado aún no se ha escrito en el almacenamiento
+        instance._imagen_subida = bool(archivo) and not getattr(archivo, '_committed', True)
+
+    def generar(sender, instance, **kwargs):
+        if getattr(instance, '_imagen_subida', False):
+            instance._imagen_subida = False
+            generar_variantes(getattr(instance, campo))
+
+    uid = f'imagenes_{model._meta.label_lower}_{campo}'
+    pre_save.connect(marcar, sender=model, weak=False, dispatch_uid=f'{uid}_pre')
+    post_save.connect(generar, sender=model, weak=False, dispatch_uid=f'{uid}_post')
@@ -0,0 +1,129 @@
+"""
+Métricas por petición: consultas SQL, tiempo en base de datos, tiempo de
+serialización y vista atendida.
+
+Se publican en la cabecera ``Server-Timing`` y en una línea de log
+estructurada. Las peticiones que repiten la misma consulta
+``QUERY_DUPLICATE_THRESHOLD`` veces o más (patrón N+1) se registran como
+warning.
+"""
+import json
+import logging
+import time
+from collections import Counter
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger('restaurant_api.metrics')
+
+_metricas_actuales = ContextVar('metricas_actuales', default=None)
+
+
+class MetricasPeticion:
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.vista = None
+        self.consultas = 0
+        self.tiempo_db = 0.0
+        self.tiempo_serializer = 0.0
+        self.sql = Counter()
+        self._serializando = False
+
+    def __call__(self, execute, sql, params, many, context):
+        # Wrapper de connection.execute_wrapper(): mide cada consulta
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.tiempo_db += time.perf_counter() - inicio
+            self.consultas += 1
+            self.sql[sql] += 1
+
+    def duplicadas(self, umbral):
+        """Consultas (con parámetros sin sustituir) repetidas al menos ``umbral`` veces"""
+        return [(sql, veces) for sql, veces in self.sql.most_common() if veces >= umbral]
+
+    def server_timing(self, total):
+        return ', '.join([
+            f'db;dur={self.tiempo_db * 1000:.1f};desc="{self.consultas} queries"',
+            f'serializer;dur={self.tiempo_serializer * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ])
+
+
+def nombre_vista(view_func, method):
+    """``Clase.accion`` para vistas DRF, o el nombre calificado de la función"""
+    cls = getattr(view_func, 'cls', None)
+    if cls is None:
+        return getattr(view_func, '__qualname__', repr(view_func))
+    accion = (getattr(view_func, 'actions', None) or {}).get(method.lower())
+    return f'{cls.__name__}.{accion}' if accion else cls.__name__
+
+
+class MetricasMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metricas = MetricasPeticion()
+        token = _metricas_actuales.set(metricas)
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(metricas))
+                response = self.get_response(request)
+        finally:
+            _metricas_actuales.reset(token)
+
+        total = time.perf_counter() - metricas.inicio
+        if settings.REQUEST_METRICS_HEADERS:
+            response['Server-Timing'] = metricas.server_timing(total)
+        self.registrar(request, response, metricas, total)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        metricas = _metricas_actuales.get()
+        if metricas is not None:
+            metricas.vista = nombre_vista(view_func, request.method)
+
+    def registrar(self, request, response, metricas, total):
+        datos = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'view': metricas.vista,
+            'queries': metricas.consultas,
+            'db_ms': round(metricas.tiempo_db * 1000, 2),
+            'serializer_ms': round(metricas.tiempo_serializer * 1000, 2),
+            'total_ms': round(total * 1000, 2),
+        }
+        duplicadas = metricas.duplicadas(settings.QUERY_DUPLICATE_THRESHOLD)
+        if duplicadas:
+            datos['duplicate_queries'] = [{'sql': sql[:300], 'count': veces} for sql, veces in duplicadas]
+            logger.warning(json.dumps(datos), extra={'metricas': datos})
+        else:
+            logger.info(json.dumps(datos), extra={'metricas': datos})
+
+
+class MetricasSerializerMixin:
+    """
+    Mide el tiempo de ``to_representation`` del serializer más externo.
+
+    Los serializers anidados o los hijos de un ``many=True`` que también usen
+    el mixin no se cuentan dos veces.
+    """
+
+    def to_representation(self, instance):
+        metricas = _metricas_actuales.get()
+        if metricas is None or metricas._serializando:
+            return super().to_representation(instance)
+        metricas._serializando = True
+        inicio = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            metricas.tiempo_serializer += time.perf_counter() - inicio
+            metricas._serializando = False
@@ -0,0 +1,14 @@
+from django.conf import settings
+from django.views.static import serve
+
+
+def servir_media(request, path):
+    """
+    Servir un archivo de MEDIA_ROOT con caché de larga duración.
+
+    Los nombres de los archivos subidos y de sus variantes nunca se reutilizan,
+    así que el navegador puede conservarlos sin volver a validarlos.
+    """
+    response = serve(request, path, document_root=settings.MEDIA_ROOT)
+    response['Cache-Control'] = f'public, max-age={settings.MEDIA_CACHE_MAX_AGE}, immutable'
+    return response
@@ -0,0 +1,23 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class CreadoCursorPagination(CursorPagination):
+    """Paginación por cursor sobre la fecha de creación, desempatando por id"""
+    ordering = ('-creado', '-id')
+    page_size_query_param = 'page_size'
+    max_page_size = settings.API_MAX_PAGE_SIZE
+
+
+class CreadoEnCursorPagination(CreadoCursorPagination):
+    ordering = ('-creado_en', '-id')
+
+
+class UserCursorPagination(CreadoCursorPagination):
+    ordering = ('-date_joined', '-id')
+
+
+class BusquedaPagination(PageNumberPagination):
+    """Resultados de búsqueda: el orden depende de la relevancia, así que se pagina por número"""
+    page_size_query_param = 'page_size'
+    max_page_size = settings.API_MAX_PAGE_SIZE
@@ -0,0 +1,62 @@
+"""
+JSON rápido para la API.
+
+Con ``orjson`` instalado (está en ``requirements.txt``) y ``FAST_JSON`` activo, las
+respuestas se codifican y los cuerpos se decodifican en C. La salida es la
+misma que la de ``JSONRenderer`` de DRF con ``COMPACT_JSON`` y
+``UNICODE_JSON``: lo que orjson no conoce (``Decimal``, textos traducibles,
+``timedelta``...) pasa por el encoder de DRF, y las fechas con zona UTC
+terminan en ``Z``. Sin orjson, o si se pide indentación, se usan las clases de
+DRF sin cambios.
+"""
+from django.conf import settings
+from rest_framework import renderers
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dependencia opcional
+    orjson = None
+
+# Igual que DRF: escapar los separadores de línea para poder incrustar el JSON en <script>
+SEPARADORES = ((b'\xe2\x80\xa8', b'\\u2028'), (b'\xe2\x80\xa9', b'\\u2029'))
+
+
+def disponible():
+    return orjson is not None and settings.FAST_JSON
+
+
+def _default(obj):
+    return encoders.JSONEncoder().default(obj)
+
+
+def dumps(data):
+    """``data`` en JSON compacto (bytes), con orjson si está disponible"""
+    if not disponible():
+        return renderers.JSONRenderer().render(data)
+    contenido = orjson.dumps(data, default=_default, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
+    if b'\xe2\x80' in contenido:
+        for separador, escapado in SEPARADORES:
+            contenido = contenido.replace(separador, escapado)
+    return contenido
+
+
+class RapidoJSONRenderer(renderers.JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None or not disponible() or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        return dumps(data)
+
+
+class RapidoJSONParser(JSONParser):
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', settings.DEFAULT_CHARSET)
+        if not disponible() or encoding.lower().replace('_', '-') not in ('utf-8', 'utf8'):
+            return super().parse(stream, media_type, parser_context)
+        try:
+            # Como el parser de DRF con STRICT_JSON, rechaza NaN e Infinity
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
@@ -10,22 +10,41 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 '''
 
+import os
+import sys
+import tempfile
 from pathlib import Path
 
+from dotenv import load_dotenv
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# Variables de entorno locales (ver .env.example)
+load_dotenv(BASE_DIR / '.env')
+
+
+def env_bool(nombre, default=False):
+    return os.environ.get(nombre, str(default)).strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def env_list(nombre, default=''):
+    return [valor.strip() for valor in os.environ.get(nombre, default).split(',') if valor.strip()]
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
 
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = 'django-insecure-6y5%)9^%p5cae!$old!9u@za2=_!gc&v@p!z0ccddoh79w4way'
+SECRET_KEY = os.environ.get(
+    'DJANGO_SECRET_KEY',
+    'django-insecure-6y5%)9^%p5cae!$old!9u@za2=_!gc&v@p!z0ccddoh79w4way',
+)
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = env_bool('DJANGO_DEBUG', True)
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = env_list('DJANGO_ALLOWED_HOSTS')
 
 
 # Application definition
@@ -47,6 +66,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'restaurant_api.instrumentation.MetricasMiddleware',
+    # Lo más arriba posible para comprimir la respuesta final
+    'restaurant_api.compresion.CompresionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -80,12 +102,69 @@ WSGI_APPLICATION = 'restaurant_api.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# DB_ENGINE=postgresql para producción; SQLite queda para desarrollo y
+# despliegues pequeños.
+
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite')
+
+if DB_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DB_NAME', 'restaurant'),
+            'USER': os.environ.get('DB_USER', 'postgres'),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', 'localhost'),
+            'PORT': os.environ.get('DB_PORT', '5432'),
+            # Conexiones persistentes, verificadas antes de reutilizarse
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {},
+        }
     }
-}
+    if env_bool('DB_POOL'):
+        # Pool nativo de Django; requiere psycopg 3 (requirements-opcional.txt)
+        # y es incompatible con las conexiones persistentes
+        try:
+            import psycopg_pool  # noqa: F401
+        except ImportError:
+            # Con psycopg2 la opción 'pool' llegaría al driver como parámetro de conexión
+            from django.core.exceptions import ImproperlyConfigured
+            raise ImproperlyConfigured(
+                'DB_POOL=True requiere psycopg 3 con el pool: '
+                'pip install -r requirements-opcional.txt'
+            )
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+            'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+        }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DB_NAME', BASE_DIR / 'db.sqlite3'),
+            'OPTIONS': {
+                # Las transacciones toman el bloqueo de escritura al empezar,
+                # en lugar de fallar con "database is locked" al escribir
+                'transaction_mode': 'IMMEDIATE',
+                'timeout': int(os.environ.get('SQLITE_TIMEOUT', 20)),
+            },
+            # Base de pruebas en archivo: la de memoria compartida responde
+            # "table is locked" a las transacciones concurrentes en vez de esperar
+            'TEST': {'NAME': os.path.join(tempfile.gettempdir(), f'restaurant-test-{os.getpid()}.sqlite3')},
+        }
+    }
+    if env_bool('SQLITE_WAL', True):
+        # WAL permite lecturas concurrentes con una escritura en curso
+        DATABASES['default']['OPTIONS']['init_command'] = (
+            'PRAGMA journal_mode=WAL;'
+            'PRAGMA synchronous=NORMAL;'
+            'PRAGMA temp_store=MEMORY;'
+            'PRAGMA mmap_size=134217728;'
+            'PRAGMA journal_size_limit=67108864;'
+            'PRAGMA cache_size=-20000;'
+        )
 
 
 # Password validation
@@ -109,17 +188,154 @@ AUTH_PASSWORD_VALIDATORS = [
 CORS_ALLOW_ALL_ORIGINS = True
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'restaurant_api.autenticacion.JWTAuthenticationCacheada',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
-    )
+    ),
+    # orjson si está instalado (ver restaurant_api/renderers.py)
+    'DEFAULT_RENDERER_CLASSES': (
+        'restaurant_api.renderers.RapidoJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'restaurant_api.renderers.RapidoJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
+    'DEFAULT_PAGINATION_CLASS': 'restaurant_api.pagination.CreadoCursorPagination',
+    'PAGE_SIZE': 20,
+    # Cubetas de fichas por IP (anónimos) o por usuario (ver restaurant_api/throttling.py)
+    'DEFAULT_THROTTLE_RATES': {
+        'catalogo_anon': os.environ.get('THROTTLE_CATALOG_ANON', '300/min'),
+        'catalogo_user': os.environ.get('THROTTLE_CATALOG_USER', '600/min'),
+        'reviews_anon': os.environ.get('THROTTLE_REVIEWS_ANON', '120/min'),
+        'reviews_user': os.environ.get('THROTTLE_REVIEWS_USER', '300/min'),
+        'registro': os.environ.get('THROTTLE_REGISTER', '10/hour'),
+        'login': os.environ.get('THROTTLE_LOGIN', '20/min'),
+        'login_cuenta': os.environ.get('THROTTLE_LOGIN_ACCOUNT', '10/min'),
+    },
+    # Proxies de confianza delante de la aplicación: la IP del cliente se toma
+    # de X-Forwarded-For solo si hay alguno (0 = siempre REMOTE_ADDR)
+    'NUM_PROXIES': int(os.environ.get('THROTTLE_NUM_PROXIES', 0)),
+}
+# Tope para ?page_size= en los listados paginados
+API_MAX_PAGE_SIZE = 100
+# Segundos que se reutiliza el usuario de un JWT sin consultar la base
+# (ver restaurant_api/autenticacion.py; 0 = consultar en cada petición)
+AUTH_USER_CACHE_TIMEOUT = int(os.environ.get('AUTH_USER_CACHE_TIMEOUT', 60))
+
+# JSON con orjson cuando está instalado; False fuerza el de la biblioteca estándar
+FAST_JSON = env_bool('FAST_JSON', True)
+# Compresión gzip/brotli (restaurant_api/compresion.py): tamaño mínimo en bytes
+# y calidad de brotli (0-11; 4-5 equilibra CPU y tamaño en respuestas dinámicas)
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))
+COMPRESSION_BROTLI_QUALITY = int(os.environ.get('COMPRESSION_BROTLI_QUALITY', 4))
+
+# Métricas por petición (restaurant_api.instrumentation)
+REQUEST_METRICS_HEADERS = env_bool('REQUEST_METRICS_HEADERS', DEBUG)
+QUERY_DUPLICATE_THRESHOLD = int(os.environ.get('QUERY_DUPLICATE_THRESHOLD', 5))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'restaurant_api.metrics': {
+            'handlers': ['console'],
+            # Durante `manage.py test` solo se muestran los avisos de N+1
+            'level': os.environ.get('REQUEST_METRICS_LOG_LEVEL', 'WARNING' if 'test' in sys.argv[1:2] else 'INFO'),
+            'propagate': False,
+        },
+    },
 }
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:5173",  # puerto Vite
 ]
+CACHES = {
+    # Instantáneas del menú, usuarios de los JWT, contadores de notificaciones.
+    # En memoria es propia de cada proceso: con varios workers, o con el de
+    # 'procesar_notificaciones', use una compartida (requiere redis, ver requirements-opcional.txt)
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'redis://127.0.0.1:6379/0'),
+    } if os.environ.get('CACHE_BACKEND', 'locmem') == 'redis' else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'restaurant-api',
+    },
+    # Carritos activos con CART_BACKEND=cache. En disco se comparten entre
+    # procesos y sobreviven a reinicios; en memoria solo sirven con un worker.
+    # Guardan cambios sin persistir: sin límite de entradas, nunca se desaloja
+    # nada (ver orders/checks.py)
+    'carritos': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('CART_CACHE_LOCATION', str(BASE_DIR / '.cache' / 'carritos')),
+        'OPTIONS': {'MAX_ENTRIES': sys.maxsize},
+    } if os.environ.get('CART_CACHE_BACKEND', 'locmem') == 'file' else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'carritos',
+        'OPTIONS': {'MAX_ENTRIES': sys.maxsize},
+    },
+    # Cubetas de los límites de peticiones: en memoria, sin ida y vuelta por red
+    'throttle': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'throttle',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+# Límites de peticiones (ver restaurant_api/throttling.py). Las pruebas los
+# desactivan en restaurant_api/test_runner.py
+THROTTLE_ENABLED = env_bool('THROTTLE_ENABLED', True)
+THROTTLE_CACHE_ALIAS = 'throttle'
+TEST_RUNNER = 'restaurant_api.test_runner.TestRunner'
+# Segundos que se conservan las instantáneas del menú y la tabla de precios.
+# Con una caché compartida se invalidan por versión al cambiar el catálogo; con
+# la de cada proceso los demás workers no ven el cambio y sirven la copia vieja
+# hasta que expira, así que por defecto duran un minuto
+CATALOG_SNAPSHOT_TIMEOUT = int(os.environ.get(
+    'CATALOG_SNAPSHOT_TIMEOUT',
+    60 if CACHES['default']['BACKEND'] == 'django.core.cache.backends.locmem.LocMemCache' else 60 * 60 * 24,
+))
+
+# Almacenamiento del carrito: 'db' escribe cada cambio, 'cache' los agrupa
+# y los persiste de forma diferida (ver orders/carrito.py)
+CART_BACKEND = os.environ.get('CART_BACKEND', 'db')
+CART_CACHE_ALIAS = 'carritos'
+CART_CACHE_TIMEOUT = int(os.environ.get('CART_CACHE_TIMEOUT', 60 * 60 * 24 * 7))
+# Segundos como máximo entre escrituras en base de un carrito que sigue
+# cambiando; los que dejan de cambiar los persiste 'manage.py persistir_carritos'
+CART_FLUSH_INTERVAL = int(os.environ.get('CART_FLUSH_INTERVAL', 300))
+
+# Bandeja de salida de notificaciones (ver notifications/bandeja.py).
+# NOTIFICATIONS_INLINE las crea al confirmar cada transacción, dentro de la
+# petición; desactivado (por defecto sin DEBUG) hace falta el worker
+# 'manage.py procesar_notificaciones' (ver README.md)
+NOTIFICATIONS_INLINE = env_bool('NOTIFICATIONS_INLINE', DEBUG)
+NOTIFICATIONS_BATCH_SIZE = int(os.environ.get('NOTIFICATIONS_BATCH_SIZE', 500))
+# Vida máxima del contador de no leídas en caché (ver notifications/contadores.py)
+NOTIFICATIONS_COUNTER_TIMEOUT = int(os.environ.get('NOTIFICATIONS_COUNTER_TIMEOUT', 300))
+# Retención para 'manage.py purgar_notificaciones', en días (0 = conservar):
+# las leídas y todas las demás
+NOTIFICATIONS_RETENTION_READ_DAYS = int(os.environ.get('NOTIFICATIONS_RETENTION_READ_DAYS', 30))
+NOTIFICATIONS_RETENTION_DAYS = int(os.environ.get('NOTIFICATIONS_RETENTION_DAYS', 180))
+NOTIFICATIONS_PURGE_BATCH_SIZE = int(os.environ.get('NOTIFICATIONS_PURGE_BATCH_SIZE', 1000))
+
+# Eventos en tiempo real por SSE (ver restaurant_api/eventos.py)
+EVENTS_CHANNEL_BACKEND = os.environ.get('EVENTS_CHANNEL_BACKEND', 'restaurant_api.eventos.CanalMemoria')
+# Segundos entre comentarios keep-alive y espera de reconexión del cliente
+EVENTS_KEEPALIVE = int(os.environ.get('EVENTS_KEEPALIVE', 15))
+EVENTS_RETRY_MS = 3000
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+# Lado máximo en píxeles de cada variante generada al subir una imagen
+# (ver restaurant_api/imagenes.py)
+IMAGE_VARIANTS = {'thumb': 160, 'medium': 480, 'large': 1200}
+# Servir MEDIA_ROOT desde Django (en producción lo hace el servidor web con
+# las mismas cabeceras: Cache-Control "public, max-age=31536000, immutable")
+SERVE_MEDIA = env_bool('SERVE_MEDIA', DEBUG)
+MEDIA_CACHE_MAX_AGE = 60 * 60 * 24 * 365
 AUTH_USER_MODEL = 'users.User'
 
 
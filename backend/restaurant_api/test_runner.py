@@ -0,0 +1,23 @@
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+    """``DiscoverRunner`` que aplica los ajustes propios de las pruebas"""
+    ajustes = {
+        # Todas las peticiones del cliente de pruebas salen de la misma IP; las
+        # pruebas de los límites los activan con override_settings
+        'THROTTLE_ENABLED': False,
+        # Sin worker de la bandeja, con o sin DJANGO_DEBUG (y sin notifications.E001
+        # con la caché en memoria); las pruebas del worker lo desactivan
+        'NOTIFICATIONS_INLINE': True,
+    }
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._ajustes = override_settings(**self.ajustes)
+        self._ajustes.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._ajustes.disable()
+        super().teardown_test_environment(**kwargs)
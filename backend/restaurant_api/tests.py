@@ -0,0 +1,309 @@
+import gzip
+import json
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from io import BytesIO
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connection
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.test import RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+
+from notifications.models import Notificacion
+from notifications.retencion import purgar
+from orders.models import Carrito, Pedido
+from products.models import Producto
+from reviews.models import Review
+from . import compresion
+from .instrumentation import MetricasMiddleware, MetricasPeticion
+from .renderers import RapidoJSONParser, RapidoJSONRenderer, orjson
+
+User = get_user_model()
+
+
+@skipUnless(connection.vendor == 'sqlite', 'El análisis de planes usa EXPLAIN QUERY PLAN de SQLite')
+class PlanesDeConsultaTests(APITestCase):
+    """Las consultas principales de cada endpoint deben resolverse con índices"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='cliente', email='cliente@example.com', password='clave-segura-123')
+        otro = User.objects.create_user(username='otro', email='otro@example.com', password='clave-segura-123')
+        self.producto = Producto.objects.create(nombre='Pizza', precio=Decimal('12.00'))
+        for usuario in (self.user, otro):
+            Carrito.objects.create(usuario=usuario)
+            for i in range(3):
+                Pedido.objects.create(usuario=usuario, total=Decimal('10.00'), direccion='Calle 1', telefono_contacto='555')
+                Notificacion.objects.create(usuario=usuario, mensaje=f'Aviso {i}')
+                Review.objects.create(usuario=usuario, producto=self.producto, calificacion=4)
+        self.client.force_authenticate(self.user)
+
+    def planes(self, method, url, tabla, **params):
+        """Ejecutar la petición y devolver el plan de cada SELECT sobre ``tabla``"""
+        with CaptureQueriesContext(connection) as ctx:
+            response = getattr(self.client, method)(url, params)
+        self.assertLess(response.status_code, 400)
+        return self.planes_capturados(ctx, tabla)
+
+    def planes_capturados(self, ctx, tabla):
+        planes = []
+        for query in ctx.captured_queries:
+            sql = query['sql']
+            if sql.startswith('SELECT') and f'FROM "{tabla}"' in sql:
+                with connection.cursor() as cursor:
+                    cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+                    planes.append((sql, [fila[-1] for fila in cursor.fetchall()]))
+        self.assertTrue(planes, f'No se encontraron consultas sobre {tabla}')
+        return planes
+
+    def assertUsaIndice(self, method, url, tabla, **params):
+        self.assertPlanesConIndice(self.planes(method, url, tabla, **params), tabla)
+
+    def assertPlanesConIndice(self, planes, tabla):
+        for sql, plan in planes:
+            detalle = '\n'.join(plan)
+            for paso in plan:
+                if paso.startswith('SCAN ') and tabla in paso:
+                    self.fail(f'Recorrido completo de {tabla}:\n{sql}\n{detalle}')
+                if 'TEMP B-TREE' in paso and 'ORDER BY' in paso:
+                    self.fail(f'Ordenamiento en memoria:\n{sql}\n{detalle}')
+
+    def test_listado_de_pedidos(self):
+        self.assertUsaIndice('get', reverse('pedido-list'), 'orders_pedido')
+
+    def test_estadisticas_de_pedidos(self):
+        self.assertUsaIndice('get', reverse('pedido-estadisticas'), 'orders_pedido', desde='2020-01-01')
+
+    def test_listado_de_notificaciones(self):
+        self.assertUsaIndice('get', reverse('notification-list'), 'notifications_notificacion')
+
+    def test_notificaciones_no_leidas(self):
+        self.assertUsaIndice('get', reverse('notification-no-leidas'), 'notifications_notificacion')
+
+    def test_reviews_de_un_producto(self):
+        self.assertUsaIndice('get', reverse('review-list'), 'reviews_review', producto=self.producto.id)
+
+    def test_mis_reviews(self):
+        self.assertUsaIndice('get', reverse('review-mis-reviews'), 'reviews_review')
+
+    def test_carrito(self):
+        self.assertUsaIndice('get', reverse('view_cart'), 'orders_carrito')
+
+    def test_purga_de_notificaciones(self):
+        with CaptureQueriesContext(connection) as ctx:
+            purgar(dias_leidas=30, dias=180, simular=True)
+            purgar(dias_leidas=30, dias=180)
+        self.assertPlanesConIndice(self.planes_capturados(ctx, 'notifications_notificacion'),
+                                   'notifications_notificacion')
+
+
+class MetricasMiddlewareTests(APITestCase):
+    """Instrumentación de consultas y tiempos por petición"""
+
+    def test_cabecera_server_timing(self):
+        Producto.objects.create(nombre='Pizza', precio=Decimal('12.00'))
+        with self.settings(REQUEST_METRICS_HEADERS=True), \
+                self.assertLogs('restaurant_api.metrics', level='INFO') as logs:
+            response = self.client.get(reverse('producto-list'))
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertIn('serializer;dur=', response['Server-Timing'])
+        datos = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(datos['view'], 'ProductoViewSet.list')
+        self.assertEqual(datos['status'], 200)
+
+    def test_detecta_consultas_duplicadas(self):
+        def vista_n_mas_1(request):
+            for producto_id in range(6):
+                list(Producto.objects.filter(pk=producto_id))
+            return HttpResponse('ok')
+
+        middleware = MetricasMiddleware(vista_n_mas_1)
+        with self.settings(QUERY_DUPLICATE_THRESHOLD=5), \
+                self.assertLogs('restaurant_api.metrics', level='WARNING') as logs:
+            middleware(RequestFactory().get('/'))
+        datos = json.loads(logs.records[0].getMessage())
+        self.assertEqual(datos['queries'], 6)
+        self.assertEqual(datos['duplicate_queries'][0]['count'], 6)
+
+    def test_umbral_de_duplicadas_incluye_el_limite(self):
+        metricas = MetricasPeticion()
+        metricas.sql.update(['SELECT a'] * 5 + ['SELECT b'] * 4)
+        self.assertEqual(metricas.duplicadas(5), [('SELECT a', 5)])
+
+
+def tasas(**rates):
+    return {**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': rates}
+
+
+@override_settings(THROTTLE_ENABLED=True)
+class CubetaThrottleTests(APITestCase):
+    """Límites por cubeta de fichas en los endpoints públicos"""
+
+    def setUp(self):
+        caches[settings.THROTTLE_CACHE_ALIAS].clear()
+        self.ahora = 1000.0
+        reloj = mock.patch('restaurant_api.throttling.time.time', side_effect=lambda: self.ahora)
+        reloj.start()
+        self.addCleanup(reloj.stop)
+
+    @override_settings(REST_FRAMEWORK=tasas(catalogo_anon='3/min', catalogo_user='6/min'))
+    def test_rafaga_y_relleno(self):
+        url = reverse('ingrediente-list')
+        self.assertEqual([self.client.get(url).status_code for _ in range(4)], [200, 200, 200, 429])
+        response = self.client.get(url)
+        self.assertEqual(response['Retry-After'], '20')
+        # Se recupera una ficha cada 20 segundos
+        self.ahora += 20
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertEqual(self.client.get(url).status_code, 429)
+
+    @override_settings(REST_FRAMEWORK=tasas(catalogo_anon='1/min', catalogo_user='6/min'))
+    def test_autenticados_por_usuario_con_otra_tasa(self):
+        url = reverse('ingrediente-list')
+        self.client.get(url)
+        self.assertEqual(self.client.get(url).status_code, 429)
+        self.client.force_authenticate(get_user_model().objects.create_user(
+            username='ana', email='ana@example.com', password='clave-segura-123'
+        ))
+        self.assertEqual([self.client.get(url).status_code for _ in range(7)], [200] * 6 + [429])
+
+    @override_settings(REST_FRAMEWORK=tasas(reviews_anon='1/min'))
+    def test_reviews_solo_limita_lecturas(self):
+        url = reverse('review-list')
+        self.client.get(url)
+        self.assertEqual(self.client.get(url).status_code, 429)
+        self.assertEqual(self.client.post(url, {}).status_code, 401)
+
+    @override_settings(REST_FRAMEWORK=tasas(login='100/min', login_cuenta='2/min'))
+    def test_login_por_cuenta(self):
+        url = reverse('token_obtain_pair')
+        intentos = [self.client.post(url, {'email': 'Ana@example.com', 'password': 'x'}).status_code
+                    for _ in range(3)]
+        self.assertEqual(intentos, [401, 401, 429])
+        otra = self.client.post(url, {'email': 'luis@example.com', 'password': 'x'})
+        self.assertEqual(otra.status_code, 401)
+
+    @override_settings(REST_FRAMEWORK=tasas(catalogo_anon='1/min'))
+    def test_x_forwarded_for_sin_proxies(self):
+        url = reverse('ingrediente-list')
+        codigos = [self.client.get(url, HTTP_X_FORWARDED_FOR=f'10.0.0.{i}').status_code for i in range(2)]
+        self.assertEqual(codigos, [200, 429])
+
+    @override_settings(REST_FRAMEWORK={**tasas(catalogo_anon='1/min'), 'NUM_PROXIES': 1})
+    def test_x_forwarded_for_con_un_proxy(self):
+        url = reverse('ingrediente-list')
+        codigos = [self.client.get(url, HTTP_X_FORWARDED_FOR=f'10.0.0.{i}').status_code for i in range(2)]
+        self.assertEqual(codigos, [200, 200])
+
+    @override_settings(THROTTLE_ENABLED=False, REST_FRAMEWORK=tasas(registro='1/hour'))
+    def test_desactivado(self):
+        url = reverse('user_register')
+        self.assertEqual([self.client.post(url, {}).status_code for _ in range(3)], [400] * 3)
+
+
+@skipUnless(orjson is not None, 'orjson no está instalado')
+class RapidoJSONTests(APITestCase):
+    """orjson produce los mismos bytes que el JSONRenderer de DRF"""
+
+    def test_misma_salida_que_drf(self):
+        data = {
+            'total': Decimal('12.50'),
+            'creado': datetime(2025, 1, 2, 3, 4, 5, 123456, tzinfo=dt_timezone.utc),
+            'espera': timedelta(minutes=2),
+            'mensaje': gettext_lazy('Hola'),
+            'texto': 'ñandú \u2028 fin',
+            'por_estado': {1: 3, None: 0},
+            'items': [{'id': 1, 'precio': None, 'activo': True, 'peso': 0.5}],
+        }
+        self.assertEqual(RapidoJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_parser_rechaza_json_invalido(self):
+        self.assertEqual(RapidoJSONParser().parse(BytesIO(b'{"a": [1, 2.5]}')), {'a': [1, 2.5]})
+        self.client.force_authenticate(get_user_model().objects.create_user(
+            username='ana', email='ana@example.com', password='clave-segura-123'
+        ))
+        for cuerpo in (b'{"items": [', b'{"cantidad": NaN}'):
+            response = self.client.post(reverse('add_to_cart'), cuerpo, content_type='application/json')
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('JSON parse error', response.data['detail'])
+
+
+class CompresionTests(APITestCase):
+    """Compresión negociada con umbral de tamaño"""
+
+    def setUp(self):
+        from products.tests import crear_menu
+        crear_menu(n_productos=10, n_combos=2)
+
+    def test_negociacion(self):
+        self.assertEqual(compresion.elegir_codificacion('gzip, deflate'), 'gzip')
+        self.assertEqual(compresion.elegir_codificacion('*'), 'gzip')
+        self.assertIsNone(compresion.elegir_codificacion('gzip;q=0, identity'))
+        self.assertIsNone(compresion.elegir_codificacion(''))
+
+    def test_gzip_sobre_el_umbral(self):
+        url = reverse('combo-list')
+        plano = self.client.get(url)
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip, br;q=0')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertLess(len(response.content), len(plano.content) / 3)
+        self.assertEqual(gzip.decompress(response.content), plano.content)
+        self.assertEqual(response['ETag'], 'W/' + plano['ETag'])
+        # El ETag débil sigue sirviendo para la revalidación
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_respuestas_pequenas_sin_comprimir(self):
+        url = reverse('producto-list') + '?fields=id'
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertLess(len(response.content), settings.COMPRESSION_MIN_SIZE)
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    @skipUnless(compresion.brotli is not None, 'brotli no está instalado')
+    def test_brotli_preferido(self):
+        response = self.client.get(reverse('combo-list'), HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+
+    def comprimir_con_brotli_simulado(self, vista, tipo='application/json'):
+        """Pasar ``vista`` por el middleware como si brotli estuviera instalado"""
+        brotli = mock.Mock(compress=lambda contenido, quality: b'br')
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip, br')
+        with mock.patch.object(compresion, 'brotli', brotli):
+            return compresion.CompresionMiddleware(lambda request: vista(request, tipo))(request)
+
+    @staticmethod
+    def respuesta_grande(request, tipo):
+        return HttpResponse('a' * 2000, content_type=tipo)
+
+    def test_brotli_en_json_sin_secretos(self):
+        response = self.comprimir_con_brotli_simulado(self.respuesta_grande)
+        self.assertEqual(response['Content-Encoding'], 'br')
+
+    def test_html_solo_con_gzip(self):
+        response = self.comprimir_con_brotli_simulado(self.respuesta_grande, 'text/html; charset=utf-8')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+
+    def test_cookies_solo_con_gzip(self):
+        def vista(request, tipo):
+            response = self.respuesta_grande(request, tipo)
+            response.set_cookie('sessionid', 'secreto')
+            return response
+
+        response = self.comprimir_con_brotli_simulado(vista)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+
+    def test_token_csrf_solo_con_gzip(self):
+        def vista(request, tipo):
+            return HttpResponse(get_token(request) + 'a' * 2000, content_type=tipo)
+
+        response = self.comprimir_con_brotli_simulado(vista)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
@@ -0,0 +1,108 @@
+"""
+Límites de peticiones con cubetas de fichas (token bucket).
+
+Cada cliente tiene una cubeta por ámbito con capacidad para ``N`` peticiones
+que se rellena de forma continua a ``N`` fichas por periodo, según la tasa
+``'N/periodo'`` de ``REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']``. A diferencia
+del historial de ``SimpleRateThrottle``, el estado es un par (fichas,
+instante) de tamaño fijo, y una ráfaga solo gasta lo acumulado.
+
+Los anónimos se identifican por IP y los autenticados por usuario, con la
+tasa ``<ámbito>_anon`` o ``<ámbito>_user`` (o ``<ámbito>`` para ambos). Las
+cubetas viven en la caché ``THROTTLE_CACHE_ALIAS``; en memoria son exactas por
+proceso, y con varios workers cada uno aplica su propio límite salvo que la
+caché sea compartida.
+"""
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+_lock = threading.Lock()
+
+
+class CubetaThrottle(SimpleRateThrottle):
+    """Límite por cubeta de fichas; las subclases definen ``scope``"""
+    # Con True solo se limitan GET/HEAD/OPTIONS
+    solo_lectura = False
+
+    def __init__(self):
+        # La tasa depende de la petición (anónima o autenticada), ver allow_request
+        self.espera = None
+
+    @property
+    def cache(self):
+        return caches[settings.THROTTLE_CACHE_ALIAS]
+
+    def tasa(self, request):
+        rates = api_settings.DEFAULT_THROTTLE_RATES
+        nivel = 'user' if request.user and request.user.is_authenticated else 'anon'
+        return rates.get(f'{self.scope}_{nivel}', rates.get(self.scope))
+
+    def identificador(self, request):
+        if request.user and request.user.is_authenticated:
+            return f'user:{request.user.pk}'
+        return f'ip:{self.get_ident(request)}'
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope, 'ident': self.identificador(request)}
+
+    def allow_request(self, request, view):
+        if not settings.THROTTLE_ENABLED or (self.solo_lectura and request.method not in SAFE_METHODS):
+            return True
+        rate = self.tasa(request)
+        key = self.get_cache_key(request, view) if rate else None
+        if key is None:
+            return True
+        capacidad, duracion = self.parse_rate(rate)
+        por_segundo = capacidad / duracion
+        ahora = time.time()
+        with _lock:
+            fichas, instante = self.cache.get(key, (capacidad, ahora))
+            fichas = min(capacidad, fichas + (ahora - instante) * por_segundo)
+            permitida = fichas >= 1
+            if permitida:
+                fichas -= 1
+            # Pasada la duración la cubeta estaría llena: no hace falta conservarla
+            self.cache.set(key, (fichas, ahora), timeout=duracion)
+        self.espera = None if permitida else (1 - fichas) / por_segundo
+        return permitida
+
+    def wait(self):
+        return self.espera
+
+
+class CatalogoThrottle(CubetaThrottle):
+    """Lecturas del menú: baratas, con límites altos"""
+    scope = 'catalogo'
+
+
+class ReviewsThrottle(CubetaThrottle):
+    """Lecturas públicas de reseñas; crear o editar ya exige autenticación"""
+    scope = 'reviews'
+    solo_lectura = True
+
+
+class RegistroThrottle(CubetaThrottle):
+    scope = 'registro'
+
+
+class LoginThrottle(CubetaThrottle):
+    """Intentos de login por IP (cada intento calcula un hash PBKDF2)"""
+    scope = 'login'
+
+
+class LoginCuentaThrottle(CubetaThrottle):
+    """Intentos de login por cuenta, aunque lleguen desde muchas IP"""
+    scope = 'login_cuenta'
+
+    def identificador(self, request):
+        email = request.data.get('email') if hasattr(request.data, 'get') else None
+        if not isinstance(email, str) or not email:
+            return f'ip:{self.get_ident(request)}'
+        return 'email:' + hashlib.md5(email.strip().lower().encode()).hexdigest()
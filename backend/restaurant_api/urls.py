@@ -14,18 +14,21 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
 )
+from .throttling import LoginCuentaThrottle, LoginThrottle
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     
     # Rutas de autenticación
-    path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
+    path('api/token/', TokenObtainPairView.as_view(throttle_classes=[LoginThrottle, LoginCuentaThrottle]),
+         name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     
     # Rutas de la API
@@ -36,3 +39,9 @@ urlpatterns = [
     path('api/orders/', include('orders.urls')),
 ]
 
+if settings.SERVE_MEDIA:
+    from .media import servir_media
+    urlpatterns += [
+        re_path(rf"^{settings.MEDIA_URL.strip('/')}/(?P<path>.*)$", servir_media, name='media'),
+    ]
+
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from reviews.resumen import reconstruir_resumenes
+
+
+class Command(BaseCommand):
+    help = 'Recalcula desde cero el resumen de calificaciones de cada producto'
+
+    def handle(self, *args, **options):
+        total = reconstruir_resumenes()
+        self.stdout.write(self.style.SUCCESS(f'Se reconstruyeron {total} resúmenes de calificación'))
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0002_rename_precio_combo_precio_total_and_more'),
+        ('reviews', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenCalificacion',
+            fields=[
+                ('producto', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='resumen_calificacion', serialize=False, to='products.producto')),
+                ('total_reviews', models.PositiveIntegerField(default=0)),
+                ('suma_calificaciones', models.PositiveIntegerField(default=0)),
+                ('estrellas_1', models.PositiveIntegerField(default=0)),
+                ('estrellas_2', models.PositiveIntegerField(default=0)),
+                ('estrellas_3', models.PositiveIntegerField(default=0)),
+                ('estrellas_4', models.PositiveIntegerField(default=0)),
+                ('estrellas_5', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+    ]
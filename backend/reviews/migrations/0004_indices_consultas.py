@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:05
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0002_rename_precio_combo_precio_total_and_more'),
+        ('reviews', '0003_resumencalificacion'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['producto', 'creado'], name='review_producto_creado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['usuario', 'creado'], name='review_usuario_creado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['creado'], name='review_creado_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+from django.db import migrations
+
+
+def rellenar_resumenes(apps, schema_editor):
+    """Contar las reseñas que ya existían al crear ResumenCalificacion"""
+    from reviews.resumen import agregados
+
+    Review = apps.get_model('reviews', 'Review')
+    ResumenCalificacion = apps.get_model('reviews', 'ResumenCalificacion')
+    ResumenCalificacion.objects.all().delete()
+    ResumenCalificacion.objects.bulk_create(
+        [ResumenCalificacion(**fila) for fila in agregados(Review.objects.all())],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0004_indices_consultas'),
+    ]
+
+    operations = [
+        migrations.RunPython(rellenar_resumenes, migrations.RunPython.noop),
+    ]
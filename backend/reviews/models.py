@@ -8,3 +8,33 @@ class Review(models.Model):
     texto = models.TextField(blank=True)
     calificacion = models.IntegerField()  # 1-5
     creado = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['producto', 'creado'], name='review_producto_creado_idx'),
+            models.Index(fields=['usuario', 'creado'], name='review_usuario_creado_idx'),
+            models.Index(fields=['creado'], name='review_creado_idx'),
+        ]
+
+class ResumenCalificacion(models.Model):
+    """Resumen desnormalizado de las reseñas de un producto"""
+    producto = models.OneToOneField(Producto, on_delete=models.CASCADE, primary_key=True, related_name='resumen_calificacion')
+    total_reviews = models.PositiveIntegerField(default=0)
+    suma_calificaciones = models.PositiveIntegerField(default=0)
+    estrellas_1 = models.PositiveIntegerField(default=0)
+    estrellas_2 = models.PositiveIntegerField(default=0)
+    estrellas_3 = models.PositiveIntegerField(default=0)
+    estrellas_4 = models.PositiveIntegerField(default=0)
+    estrellas_5 = models.PositiveIntegerField(default=0)
+
+    @property
+    def promedio(self):
+        if not self.total_reviews:
+            return 0
+        return round(self.suma_calificaciones / self.total_reviews, 2)
+
+    def distribucion(self):
+        return {i: getattr(self, f'estrellas_{i}') for i in range(1, 6)}
+
+    def __str__(self):
+        return f"{self.producto_id}: {self.promedio} ({self.total_reviews})"
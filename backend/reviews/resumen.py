@@ -0,0 +1,87 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+
+from products.cache import bump_calificaciones_version
+from .models import Review, ResumenCalificacion
+
+CALIFICACIONES = range(1, 6)
+
+
+def invalidar_calificaciones():
+    # Como invalidar_catalogo: de inmediato y al confirmar la transacción
+    bump_calificaciones_version()
+    transaction.on_commit(bump_calificaciones_version)
+
+
+def agregados(reviews):
+    """Filas de ``ResumenCalificacion`` (como dicts) calculadas desde ``reviews``"""
+    conteos = {f'estrellas_{i}': Count('id', filter=Q(calificacion=i)) for i in CALIFICACIONES}
+    return (
+        reviews.filter(calificacion__in=CALIFICACIONES)
+        .order_by()
+        .values('producto_id')
+        .annotate(total_reviews=Count('id'), suma_calificaciones=Sum('calificacion'), **conteos)
+    )
+
+
+def reconstruir_resumen(producto_id):
+    """Recalcular el resumen de un producto desde la tabla de reseñas"""
+    fila = next(iter(agregados(Review.objects.filter(producto_id=producto_id))), None)
+    if fila is None:
+        ResumenCalificacion.objects.filter(producto_id=producto_id).delete()
+    else:
+        ResumenCalificacion.objects.update_or_create(producto_id=fila.pop('producto_id'), defaults=fila)
+
+
+def aplicar_calificacion(producto_id, calificacion, signo):
+    """
+    Sumar (``signo=1``) o restar (``signo=-1``) una calificación al resumen
+    del producto con un UPDATE atómico, creando la fila si hace falta.
+
+    Una resta que dejaría el contador en negativo (una reseña que el resumen
+    no contaba) reconstruye el resumen del producto desde la base y devuelve
+    False: ya refleja las reseñas tal como están guardadas.
+    """
+    if calificacion not in CALIFICACIONES:
+        return True
+    campo = f'estrellas_{calificacion}'
+    cambios = {
+        'total_reviews': F('total_reviews') + signo,
+        'suma_calificaciones': F('suma_calificaciones') + signo * calificacion,
+        campo: F(campo) + signo,
+    }
+    filtro = {} if signo > 0 else {f'{campo}__gte': 1}
+    actualizados = ResumenCalificacion.objects.filter(producto_id=producto_id, **filtro).update(**cambios)
+    incremental = True
+    if not actualizados and signo < 0:
+        reconstruir_resumen(producto_id)
+        incremental = False
+    elif not actualizados:
+        try:
+            with transaction.atomic():
+                ResumenCalificacion.objects.create(
+                    producto_id=producto_id,
+                    total_reviews=1,
+                    suma_calificaciones=calificacion,
+                    **{campo: 1}
+                )
+        except IntegrityError:
+            # Otra petición creó la fila entre el UPDATE y el INSERT
+            ResumenCalificacion.objects.filter(producto_id=producto_id).update(**cambios)
+    # El menú superpone las calificaciones a sus instantáneas: basta con
+    # invalidarlas a ellas, sin descartar el resto del catálogo
+    invalidar_calificaciones()
+    return incremental
+
+
+def reconstruir_resumenes():
+    """Recalcular todos los resúmenes desde la tabla de reseñas"""
+    filas = agregados(Review.objects.all())
+    with transaction.atomic():
+        ResumenCalificacion.objects.all().delete()
+        resumenes = ResumenCalificacion.objects.bulk_create(
+            [ResumenCalificacion(**fila) for fila in filas],
+            batch_size=500,
+        )
+    invalidar_calificaciones()
+    return len(resumenes)
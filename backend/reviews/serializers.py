@@ -1,8 +1,10 @@
 from rest_framework import serializers
+from restaurant_api.campos import CamposDinamicosMixin
+from restaurant_api.instrumentation import MetricasSerializerMixin
 from .models import Review
 from products.models import Producto
 
-class ReviewSerializer(serializers.ModelSerializer):
+class ReviewSerializer(CamposDinamicosMixin, MetricasSerializerMixin, serializers.ModelSerializer):
     usuario_email = serializers.CharField(source='usuario.email', read_only=True)
     producto_nombre = serializers.CharField(source='producto.nombre', read_only=True)
 
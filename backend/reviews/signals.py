@@ -0,0 +1,30 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Review
+from .resumen import aplicar_calificacion
+
+
+@receiver(pre_save, sender=Review)
+def recordar_calificacion_anterior(sender, instance, **kwargs):
+    instance._calificacion_anterior = None
+    if instance.pk:
+        instance._calificacion_anterior = (
+            Review.objects.filter(pk=instance.pk).values_list('producto_id', 'calificacion').first()
+        )
+
+
+@receiver(post_save, sender=Review)
+def review_guardada(sender, instance, created, **kwargs):
+    anterior = getattr(instance, '_calificacion_anterior', None)
+    if anterior == (instance.producto_id, instance.calificacion):
+        return
+    if anterior and not aplicar_calificacion(*anterior, signo=-1) and anterior[0] == instance.producto_id:
+        # El resumen se reconstruyó desde la base y ya cuenta la calificación nueva
+        return
+    aplicar_calificacion(instance.producto_id, instance.calificacion, signo=1)
+
+
+@receiver(post_delete, sender=Review)
+def review_eliminada(sender, instance, **kwargs):
+    aplicar_calificacion(instance.producto_id, instance.calificacion, signo=-1)
@@ -1,3 +1,126 @@
-from django.test import TestCase
+from decimal import Decimal
+from importlib import import_module
+from io import StringIO
 
-# Create your tests here.
+from django.apps import apps
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from products.cache import get_catalog_version
+from products.models import Combo, Producto
+from .models import Review, ResumenCalificacion
+
+User = get_user_model()
+
+
+class ResumenCalificacionTests(APITestCase):
+    """Resumen de calificaciones mantenido de forma incremental"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='cliente', email='cliente@example.com', password='clave-segura-123')
+        self.producto = Producto.objects.create(nombre='Pizza', precio=Decimal('12.00'))
+
+    def resumen(self):
+        return ResumenCalificacion.objects.get(producto=self.producto)
+
+    def test_crear_actualizar_y_eliminar(self):
+        review = Review.objects.create(usuario=self.user, producto=self.producto, calificacion=5)
+        Review.objects.create(usuario=self.user, producto=self.producto, calificacion=3)
+        self.assertEqual(self.resumen().distribucion(), {1: 0, 2: 0, 3: 1, 4: 0, 5: 1})
+        self.assertEqual(self.resumen().promedio, 4)
+
+        review.calificacion = 1
+        review.save()
+        resumen = self.resumen()
+        self.assertEqual((resumen.total_reviews, resumen.suma_calificaciones), (2, 4))
+        self.assertEqual(resumen.distribucion(), {1: 1, 2: 0, 3: 1, 4: 0, 5: 0})
+
+        review.delete()
+        resumen = self.resumen()
+        self.assertEqual((resumen.total_reviews, resumen.suma_calificaciones), (1, 3))
+
+    def test_estadisticas_en_una_consulta(self):
+        Review.objects.create(usuario=self.user, producto=self.producto, calificacion=4)
+        Review.objects.create(usuario=self.user, producto=self.producto, calificacion=5)
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('review-estadisticas-producto'), {'producto': self.producto.id})
+        self.assertEqual(response.data['total_reviews'], 2)
+        self.assertEqual(response.data['promedio_calificacion'], 4.5)
+        self.assertEqual(response.data['distribucion_calificaciones'][5], 1)
+
+    def test_menu_expone_calificacion(self):
+        Review.objects.create(usuario=self.user, producto=self.producto, calificacion=2)
+        response = self.client.get(reverse('producto-list'))
+        self.assertEqual(response.data[0]['calificacion'], {'total_reviews': 1, 'promedio': 2})
+
+    def test_resena_no_invalida_instantanea(self):
+        url = reverse('producto-list')
+        etag = self.client.get(url)['ETag']
+        version = get_catalog_version()
+        Review.objects.create(usuario=self.user, producto=self.producto, calificacion=4)
+        self.assertEqual(get_catalog_version(), version)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data[0]['calificacion'], {'total_reviews': 1, 'promedio': 4})
+
+    def test_calificacion_en_combos(self):
+        combo = Combo.objects.create(nombre='Combo', precio_total=Decimal('20.00'))
+        combo.productos.add(self.producto)
+        url = reverse('combo-list') + '?fields=nombre,productos.calificacion'
+        self.client.get(url)
+        Review.objects.create(usuario=self.user, producto=self.producto, calificacion=5)
+        data = self.client.get(url).data
+        self.assertEqual(data, [{'nombre': 'Combo', 'productos': [{'calificacion': {'total_reviews': 1, 'promedio': 5}}]}])
+
+    def test_calificacion_sin_id_en_fields(self):
+        self.client.get(reverse('producto-list') + '?fields=calificacion')
+        Review.objects.create(usuario=self.user, producto=self.producto, calificacion=3)
+        data = self.client.get(reverse('producto-list') + '?fields=calificacion').data
+        self.assertEqual(data, [{'calificacion': {'total_reviews': 1, 'promedio': 3}}])
+
+    def test_reconstruir_desde_cero(self):
+        Review.objects.create(usuario=self.user, producto=self.producto, calificacion=4)
+        Review.objects.create(usuario=self.user, producto=self.producto, calificacion=2)
+        ResumenCalificacion.objects.all().delete()
+        call_command('reconstruir_calificaciones', stdout=StringIO())
+        resumen = self.resumen()
+        self.assertEqual((resumen.total_reviews, resumen.suma_calificaciones), (2, 6))
+        self.assertEqual(resumen.distribucion(), {1: 0, 2: 1, 3: 0, 4: 1, 5: 0})
+
+    def crear_anteriores(self, *calificaciones):
+        """Reseñas guardadas antes de existir el resumen (sin señales)"""
+        return Review.objects.bulk_create([
+            Review(usuario=self.user, producto=self.producto, calificacion=c) for c in calificaciones
+        ])
+
+    def test_eliminar_resena_anterior_al_resumen(self):
+        anterior, = self.crear_anteriores(3)
+        Review.objects.create(usuario=self.user, producto=self.producto, calificacion=5)
+        self.client.force_authenticate(self.user)
+        response = self.client.delete(reverse('review-detail', args=[anterior.pk]))
+        self.assertEqual(response.status_code, 204)
+        resumen = self.resumen()
+        self.assertEqual((resumen.total_reviews, resumen.suma_calificaciones), (1, 5))
+        self.assertEqual(resumen.distribucion(), {1: 0, 2: 0, 3: 0, 4: 0, 5: 1})
+
+    def test_editar_resena_anterior_al_resumen(self):
+        anterior, _ = self.crear_anteriores(3, 4)
+        Review.objects.create(usuario=self.user, producto=self.producto, calificacion=5)
+        anterior.calificacion = 1
+        anterior.save()
+        resumen = self.resumen()
+        self.assertEqual((resumen.total_reviews, resumen.suma_calificaciones), (3, 10))
+        self.assertEqual(resumen.distribucion(), {1: 1, 2: 0, 3: 0, 4: 1, 5: 1})
+
+    def test_migracion_rellena_los_resumenes(self):
+        self.crear_anteriores(2, 4, 4)
+        migracion = import_module('reviews.migrations.0005_rellenar_resumenes')
+        migracion.rellenar_resumenes(apps, None)
+        resumen = self.resumen()
+        self.assertEqual((resumen.total_reviews, resumen.suma_calificaciones), (3, 10))
+        self.assertEqual(resumen.distribucion(), {1: 0, 2: 1, 3: 0, 4: 2, 5: 0})
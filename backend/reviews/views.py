@@ -1,17 +1,18 @@
 from rest_framework import viewsets, permissions, generics
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.db.models import Avg
-from .models import Review
+from restaurant_api.throttling import ReviewsThrottle
+from .models import Review, ResumenCalificacion
 from .serializers import ReviewSerializer, ReviewCreateSerializer
 from products.models import Producto
 
 class ReviewViewSet(viewsets.ModelViewSet):
     serializer_class = ReviewSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    throttle_classes = [ReviewsThrottle]
 
     def get_queryset(self):
-        queryset = Review.objects.all()
+        queryset = Review.objects.select_related('usuario', 'producto')
         producto_id = self.request.query_params.get('producto', None)
         if producto_id is not None:
             queryset = queryset.filter(producto=producto_id)
@@ -54,9 +55,10 @@ class ReviewViewSet(viewsets.ModelViewSet):
         if not request.user.is_authenticated:
             return Response({'error': 'Debes estar autenticado'}, status=401)
         
-        reviews = Review.objects.filter(usuario=request.user).order_by('-creado')
-        serializer = self.get_serializer(reviews, many=True)
-        return Response(serializer.data)
+        reviews = Review.objects.filter(usuario=request.user).select_related('usuario', 'producto').order_by('-creado')
+        page = self.paginate_queryset(reviews)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
     @action(detail=False, methods=['get'])
     def estadisticas_producto(self, request):
@@ -66,33 +68,15 @@ class ReviewViewSet(viewsets.ModelViewSet):
             return Response({'error': 'Debes especificar un producto'}, status=400)
         
         try:
-            producto = Producto.objects.get(id=producto_id)
-        except Producto.DoesNotExist:
+            producto = Producto.objects.select_related('resumen_calificacion').get(id=producto_id)
+        except (Producto.DoesNotExist, ValueError):
             return Response({'error': 'Producto no encontrado'}, status=404)
-        
-        reviews = Review.objects.filter(producto=producto)
-        total_reviews = reviews.count()
-        
-        if total_reviews == 0:
-            return Response({
-                'producto_id': producto_id,
-                'producto_nombre': producto.nombre,
-                'total_reviews': 0,
-                'promedio_calificacion': 0,
-                'distribucion_calificaciones': {1: 0, 2: 0, 3: 0, 4: 0, 5: 0}
-            })
-        
-        promedio = reviews.aggregate(Avg('calificacion'))['calificacion__avg']
-        
-        # Distribuición de calificaciones
-        distribucion = {}
-        for i in range(1, 6):
-            distribucion[i] = reviews.filter(calificacion=i).count()
-        
+
+        resumen = getattr(producto, 'resumen_calificacion', None) or ResumenCalificacion(producto=producto)
         return Response({
             'producto_id': producto_id,
             'producto_nombre': producto.nombre,
-            'total_reviews': total_reviews,
-            'promedio_calificacion': round(promedio, 2),
-            'distribucion_calificaciones': distribucion
+            'total_reviews': resumen.total_reviews,
+            'promedio_calificacion': resumen.promedio,
+            'distribucion_calificaciones': resumen.distribucion()
         })
@@ -1,15 +1,24 @@
 from rest_framework import serializers
+from restaurant_api.campos import CamposDinamicosMixin
+from restaurant_api.imagenes import urls_variantes
+from restaurant_api.instrumentation import MetricasSerializerMixin
 from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
 
 User = get_user_model()
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(CamposDinamicosMixin, MetricasSerializerMixin, serializers.ModelSerializer):
+    profile_image_variantes = serializers.SerializerMethodField()
+
     class Meta:
         model = User
-        fields = ['id', 'username', 'email', 'first_name', 'last_name', 'phone_number', 'points', 'profile_image', 'date_joined']
+        fields = ['id', 'username', 'email', 'first_name', 'last_name', 'phone_number', 'points', 'profile_image',
+                  'profile_image_variantes', 'date_joined']
         read_only_fields = ['id', 'date_joined', 'points']
 
+    def get_profile_image_variantes(self, obj):
+        return urls_variantes(obj.profile_image, self.context.get('request'))
+
 class UserRegistrationSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, validators=[validate_password])
     password_confirm = serializers.CharField(write_only=True)
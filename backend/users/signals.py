@@ -0,0 +1,19 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+
+from restaurant_api.autenticacion import invalidar_usuario
+from restaurant_api.imagenes import procesar_al_subir
+
+User = get_user_model()
+
+
+def usuario_modificado(sender, instance, **kwargs):
+    # Perfil, contraseña, desactivación o reactivación: la autenticación no
+    # debe seguir sirviendo el usuario anterior desde la caché
+    invalidar_usuario(instance.pk)
+
+
+post_save.connect(usuario_modificado, sender=User, dispatch_uid='auth_usuario_save')
+post_delete.connect(usuario_modificado, sender=User, dispatch_uid='auth_usuario_delete')
+
+procesar_al_subir(User, 'profile_image')
@@ -1,3 +1,110 @@
-from django.test import TestCase
+import tempfile
+from io import BytesIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from restaurant_api.imagenes import nombre_variante
+from .serializers import UserSerializer
+
+User = get_user_model()
+
+
+class FotoPerfilTests(TestCase):
+    """Variantes de la foto de perfil"""
+
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        ajustes = override_settings(MEDIA_ROOT=directorio.name)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+    def test_foto_png_con_transparencia(self):
+        contenido = BytesIO()
+        Image.new('RGBA', (600, 600), (255, 0, 0, 128)).save(contenido, 'PNG')
+        user = User.objects.create_user(username='ana', email='ana@example.com', password='clave-segura-123')
+        user.profile_image = SimpleUploadedFile('ana.png', contenido.getvalue(), content_type='image/png')
+        user.save()
+
+        variantes = UserSerializer(user).data['profile_image_variantes']
+        self.assertTrue(variantes['medium']['original'].endswith('ana.png.medium.png'))
+        with user.profile_image.storage.open(nombre_variante(user.profile_image.name, 'thumb', 'png')) as archivo:
+            imagen = Image.open(archivo)
+            self.assertEqual((imagen.mode, imagen.size), ('RGBA', (160, 160)))
+
+    def test_sin_foto(self):
+        user = User.objects.create_user(username='luis', email='luis@example.com', password='clave-segura-123')
+        self.assertIsNone(UserSerializer(user).data['profile_image_variantes'])
+
+
+class AutenticacionCacheadaTests(APITestCase):
+    """Usuario del JWT resuelto desde la caché e invalidado con cada cambio"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='ana', email='ana@example.com', password='clave-segura-123')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+        self.url = reverse('user-me')
+
+    def test_segunda_peticion_sin_consultas(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response.data['email'], 'ana@example.com')
+
+    def test_cambio_de_perfil_invalida(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(reverse('user_profile'), {'first_name': 'Ana María'}, format='json')
+        self.assertEqual(self.client.get(self.url).data['first_name'], 'Ana María')
+
+    def test_usuario_desactivado_pierde_el_acceso(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.delete(reverse('user-delete-me')).status_code, 200)
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+    def test_cambios_de_otro_proceso_no_se_deshacen(self):
+        # Cambio hecho en otro proceso: la caché de este no se invalida
+        self.client.get(self.url)
+        User.objects.filter(pk=self.user.pk).update(last_name='Pérez')
+        self.client.patch(reverse('user_profile'), {'first_name': 'Ana María'}, format='json')
+        self.user.refresh_from_db()
+        self.assertEqual((self.user.first_name, self.user.last_name), ('Ana María', 'Pérez'))
+
+    def test_desactivado_en_otro_proceso_no_puede_escribir(self):
+        self.client.get(self.url)
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        response = self.client.put(reverse('change_password'), {
+            'old_password': 'clave-segura-123', 'new_password': 'otra-clave-456', 'confirm_password': 'otra-clave-456',
+        }, format='json')
+        self.assertEqual(response.status_code, 401)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('clave-segura-123'))
+
+    def test_escrituras_leen_el_usuario_de_la_base(self):
+        self.client.get(self.url)
+        # SELECT del usuario (sin caché) y UPDATE del perfil
+        with self.assertNumQueries(2):
+            self.client.patch(reverse('user_profile'), {}, format='json')
+
+    def test_fallo_al_encolar_no_desactiva_la_cuenta(self):
+        with mock.patch('notifications.bandeja.encolar', side_effect=RuntimeError('caído')):
+            with self.assertRaises(RuntimeError):
+                self.client.delete(reverse('user-delete-me'))
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.is_active)
+
+    @override_settings(AUTH_USER_CACHE_TIMEOUT=0)
+    def test_cache_desactivada(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(1):
+            self.client.get(self.url)
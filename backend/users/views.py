@@ -3,6 +3,9 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.contrib.auth import get_user_model, authenticate
 from django.contrib.auth.hashers import check_password
+from django.db import transaction
+from restaurant_api.pagination import UserCursorPagination
+from restaurant_api.throttling import RegistroThrottle
 from .serializers import (
     UserSerializer, 
     UserRegistrationSerializer, 
@@ -16,6 +19,7 @@ class UserRegistrationView(generics.CreateAPIView):
     queryset = User.objects.all()
     serializer_class = UserRegistrationSerializer
     permission_classes = [permissions.AllowAny]
+    throttle_classes = [RegistroThrottle]
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -59,21 +63,22 @@ class UserProfileView(generics.RetrieveUpdateDestroyAPIView):
         user = self.get_object()
         
         # Por seguridad, desactivar en lugar de eliminar
-        user.is_active = False
-        user.save()
-        
-        # Crear notificación
-        try:
-            from notifications.models import Notificacion
-            from orders.models import Estado
-            estado_info, _ = Estado.objects.get_or_create(descripcion='Información')
-            Notificacion.objects.create(
-                usuario=user,
-                mensaje="Has desactivado tu cuenta. Contacta al soporte si deseas reactivarla.",
-                estado=estado_info
-            )
-        except ImportError:
-            pass
+        # El cambio y su notificación se confirman juntos
+        with transaction.atomic():
+            user.is_active = False
+            user.save(update_fields=['is_active'])
+
+            # Crear notificación
+            try:
+                from notifications.bandeja import encolar
+                from orders import estados
+                encolar(
+                    user,
+                    "Has desactivado tu cuenta. Contacta al soporte si deseas reactivarla.",
+                    estado=estados.INFORMACION
+                )
+            except ImportError:
+                pass
         
         return Response({
             'message': 'Tu cuenta ha sido desactivada exitosamente',
@@ -101,7 +106,7 @@ class ChangePasswordView(generics.UpdateAPIView):
             
             # Cambiar contraseña
             user.set_password(serializer.validated_data['new_password'])
-            user.save()
+            user.save(update_fields=['password'])
             
             return Response({
                 'message': 'Contraseña cambiada exitosamente'
@@ -113,6 +118,7 @@ class UserViewSet(viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = UserCursorPagination
 
     def get_permissions(self):
         """Permisos específicos por acción"""
@@ -149,21 +155,22 @@ class UserViewSet(viewsets.ModelViewSet):
             )
         
         # Por seguridad, desactivar en lugar de eliminar permanentemente
-        user.is_active = False
-        user.save()
-        
-        # Crear notificación de cuenta desactivada
-        try:
-            from notifications.models import Notificacion
-            from orders.models import Estado
-            estado_info, _ = Estado.objects.get_or_create(descripcion='Información')
-            Notificacion.objects.create(
-                usuario=user,
-                mensaje="Tu cuenta ha sido desactivada. Contacta al soporte si necesitas reactivarla.",
-                estado=estado_info
-            )
-        except ImportError:
-            pass
+        # El cambio y su notificación se confirman juntos
+        with transaction.atomic():
+            user.is_active = False
+            user.save(update_fields=['is_active'])
+
+            # Crear notificación de cuenta desactivada
+            try:
+                from notifications.bandeja import encolar
+                from orders import estados
+                encolar(
+                    user,
+                    "Tu cuenta ha sido desactivada. Contacta al soporte si necesitas reactivarla.",
+                    estado=estados.INFORMACION
+                )
+            except ImportError:
+                pass
         
         return Response({
             'message': 'Cuenta desactivada exitosamente',
@@ -182,21 +189,22 @@ class UserViewSet(viewsets.ModelViewSet):
         user = request.user
         
         # Desactivar cuenta
-        user.is_active = False
-        user.save()
-        
-        # Crear notificación
-        try:
-            from notifications.models import Notificacion
-            from orders.models import Estado
-            estado_info, _ = Estado.objects.get_or_create(descripcion='Información')
-            Notificacion.objects.create(
-                usuario=user,
-                mensaje="Has desactivado tu cuenta exitosamente. Contacta al soporte si deseas reactivarla.",
-                estado=estado_info
-            )
-        except ImportError:
-            pass
+        # El cambio y su notificación se confirman juntos
+        with transaction.atomic():
+            user.is_active = False
+            user.save(update_fields=['is_active'])
+
+            # Crear notificación
+            try:
+                from notifications.bandeja import encolar
+                from orders import estados
+                encolar(
+                    user,
+                    "Has desactivado tu cuenta exitosamente. Contacta al soporte si deseas reactivarla.",
+                    estado=estados.INFORMACION
+                )
+            except ImportError:
+                pass
         
         return Response({
             'message': 'Tu cuenta ha sido desactivada exitosamente',
@@ -213,21 +221,22 @@ class UserViewSet(viewsets.ModelViewSet):
             )
         
         user = self.get_object()
-        user.is_active = True
-        user.save()
-        
-        # Crear notificación
-        try:
-            from notifications.models import Notificacion
-            from orders.models import Estado
-            estado_info, _ = Estado.objects.get_or_create(descripcion='Información')
-            Notificacion.objects.create(
-                usuario=user,
-                mensaje="Tu cuenta ha sido reactivada por el personal de soporte.",
-                estado=estado_info
-            )
-        except ImportError:
-            pass
+        # El cambio y su notificación se confirman juntos
+        with transaction.atomic():
+            user.is_active = True
+            user.save(update_fields=['is_active'])
+
+            # Crear notificación
+            try:
+                from notifications.bandeja import encolar
+                from orders import estados
+                encolar(
+                    user,
+                    "Tu cuenta ha sido reactivada por el personal de soporte.",
+                    estado=estados.INFORMACION
+                )
+            except ImportError:
+                pass
         
         return Response({
             'message': f'Cuenta de {user.email} reactivada exitosamente'